@@ -0,0 +1,263 @@
+import argparse
+import datetime
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = os.path.join("session_logs", "analytics.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    candidate TEXT NOT NULL,
+    email TEXT,
+    started TEXT,
+    ended TEXT,
+    outcome TEXT,
+    report_path TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    candidate TEXT NOT NULL,
+    time TEXT NOT NULL,
+    type TEXT NOT NULL,
+    message TEXT,
+    image TEXT,
+    clip TEXT,
+    fields TEXT,
+    PRIMARY KEY (session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    session_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (session_id, name)
+);
+CREATE INDEX IF NOT EXISTS events_candidate_time ON events (candidate, time);
+CREATE INDEX IF NOT EXISTS events_type_time ON events (type, time, candidate);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE INDEX IF NOT EXISTS sessions_candidate ON sessions (candidate, started);
+"""
+
+# Journal entry keys that get their own column; everything else goes into fields as JSON
+_EVENT_COLUMNS = {"seq", "time", "type", "message", "image", "clip"}
+
+
+def _time_text(value):
+    # Journal timestamps are "YYYY-MM-DD HH:MM:SS" strings, which sort in time order
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# Local SQLite store of every session's events, metrics and evidence paths,
+# for examiners' questions across a whole cohort ("all phone detections this
+# week"). The proctoring loop never touches the database: rows are queued and
+# a writer thread inserts them in batches, one transaction per batch. The
+# database runs in WAL mode so queries from other processes never block it.
+# Events are keyed by (session, journal seq), so a resumed session that
+# replays part of its journal overwrites rows instead of duplicating them.
+class AnalyticsStore:
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=500, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self.pending = queue.Queue()
+        self.failed_batches = 0
+        self.thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    # ----------------- Writes, queued for the writer thread ------------------
+
+    def start_session(self, session_id, candidate, email=None, started=None):
+        started = _time_text(started or datetime.datetime.now())
+        self.pending.put(("INSERT OR IGNORE INTO sessions (session_id, candidate, email, started) VALUES (?, ?, ?, ?)",
+                          (session_id, candidate, email, started)))
+
+    def end_session(self, session_id, outcome=None, report_path=None, ended=None):
+        ended = _time_text(ended or datetime.datetime.now())
+        self.pending.put(("UPDATE sessions SET ended = ?, outcome = ?, report_path = ? WHERE session_id = ?",
+                          (ended, outcome, report_path, session_id)))
+
+    def record_event(self, session_id, candidate, entry):
+        # entry is an EventJournal line
+        fields = {k: v for k, v in entry.items() if k not in _EVENT_COLUMNS}
+        self.pending.put(("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          (session_id, entry["seq"], candidate, entry["time"], entry["type"], entry.get("message"),
+                           entry.get("image"), entry.get("clip"), json.dumps(fields, default=str) if fields else None)))
+
+    def journal_listener(self, session_id, candidate):
+        # Callable for EventJournal(listener=...) mirroring every entry into the store
+        return lambda entry: self.record_event(session_id, candidate, entry)
+
+    def record_metrics(self, session_id, metrics):
+        for name, value in metrics.items():
+            self.pending.put(("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?)", (session_id, name, value)))
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self.pending.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+            try:
+                self._write(conn, [item for item in batch if item is not None])
+            except Exception as e:
+                # A bad batch is lost, but the writer carries on and flush() still returns
+                self.failed_batches += 1
+                print("[Analytics]: batch of", len(batch), "rows not written:", e)
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+        conn.close()
+
+    def _write(self, conn, batch):
+        # Consecutive rows for the same statement go through one executemany
+        with conn:
+            start = 0
+            for i in range(1, len(batch) + 1):
+                if i == len(batch) or batch[i][0] != batch[start][0]:
+                    conn.executemany(batch[start][0], [params for _, params in batch[start:i]])
+                    start = i
+
+    def flush(self):
+        # Blocks until everything queued so far is committed
+        if self.thread:
+            self.pending.join()
+
+    def close(self):
+        if self.thread:
+            self.pending.put(None)
+            self.thread.join()
+            self.thread = None
+
+    # ----------------- Queries ------------------
+
+    def _query(self, sql, params):
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def events(self, event_type=None, candidate=None, session_id=None, since=None, until=None, contains=None,
+               limit=1000):
+        # Events matching every given filter, oldest first; contains matches the message text
+        clauses, params = [], []
+        for column, value in (("type", event_type), ("candidate", candidate), ("session_id", session_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("time >= ?")
+            params.append(_time_text(since))
+        if until is not None:
+            clauses.append("time < ?")
+            params.append(_time_text(until))
+        if contains:
+            clauses.append("message LIKE ?")
+            params.append(f"%{contains}%")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(f"SELECT * FROM events {where} ORDER BY time, session_id, seq LIMIT ?", params + [limit])
+        for row in rows:
+            row.update(json.loads(row.pop("fields") or "{}"))
+        return rows
+
+    def top_candidates(self, event_type, since=None, until=None, limit=10):
+        # [(candidate, count)] with the most events of this type
+        params = [event_type, _time_text(since) or "", _time_text(until) or "9999"]
+        rows = self._query("SELECT candidate, COUNT(*) AS n FROM events WHERE type = ? AND time >= ? AND time < ? "
+                           "GROUP BY candidate ORDER BY n DESC, candidate LIMIT ?", params + [limit])
+        return [(row["candidate"], row["n"]) for row in rows]
+
+    def sessions(self, candidate=None, since=None):
+        clauses, params = [], []
+        if candidate is not None:
+            clauses.append("candidate = ?")
+            params.append(candidate)
+        if since is not None:
+            clauses.append("started >= ?")
+            params.append(_time_text(since))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query(f"SELECT * FROM sessions {where} ORDER BY started", params)
+
+    def session_metrics(self, session_id):
+        return {row["name"]: row["value"] for row in
+                self._query("SELECT name, value FROM metrics WHERE session_id = ?", [session_id])}
+
+
+def perf_metrics(snapshot):
+    # Flat metric names for a PerfMonitor snapshot, e.g. "gaze.p95_ms"
+    metrics = {}
+    for stage, stats in snapshot["stages"].items():
+        for key in ("count", "dropped", "skipped", "p50_ms", "p95_ms", "max_ms"):
+            metrics[f"{stage}.{key}"] = stats[key]
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the session analytics database.")
+    parser.add_argument("--db", default=os.environ.get("KANSEL_ANALYTICS_DB", DEFAULT_DB_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+    events = commands.add_parser("events", help="List events")
+    events.add_argument("--type")
+    events.add_argument("--candidate")
+    events.add_argument("--session")
+    events.add_argument("--contains", help="Text in the event message, e.g. 'cell phone'")
+    events.add_argument("--days", type=float, help="Only the last N days")
+    events.add_argument("--limit", type=int, default=100)
+    top = commands.add_parser("top", help="Candidates with the most events of a type")
+    top.add_argument("--type", required=True)
+    top.add_argument("--days", type=float)
+    top.add_argument("--limit", type=int, default=10)
+    commands.add_parser("sessions", help="List sessions")
+    args = parser.parse_args()
+
+    store = AnalyticsStore(args.db)
+    since = None
+    if getattr(args, "days", None):
+        since = datetime.datetime.now() - datetime.timedelta(days=args.days)
+    if args.command == "events":
+        for row in store.events(args.type, args.candidate, args.session, since, contains=args.contains,
+                                limit=args.limit):
+            print(f"{row['time']}  {row['candidate']:<20} {row['type']:<12} {row['message']}")
+    elif args.command == "top":
+        for candidate, count in store.top_candidates(args.type, since, limit=args.limit):
+            print(f"{count:>6}  {candidate}")
+    else:
+        for row in store.sessions():
+            print(f"{row['started']}  {row['session_id']:<40} {row['outcome'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
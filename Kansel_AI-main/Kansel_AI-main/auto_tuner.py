@@ -0,0 +1,203 @@
+import os
+import time
+
+import numpy as np
+
+# Model variants we know how to load, heaviest first. Variants whose files are
+# missing on the machine are left out of calibration.
+YOLO_MODELS = {
+    "yolov4": ("yolov4.weights", "yolov4.cfg"),
+    "yolov4-tiny": ("yolov4-tiny.weights", "yolov4-tiny.cfg"),
+}
+
+
+class TuningProfile:
+    def __init__(self, level, capture_width, capture_height, yolo_model, yolo_input_size,
+                 detection_interval, face_roi_scale):
+        self.level = level
+        self.capture_width = capture_width
+        self.capture_height = capture_height
+        self.yolo_model = yolo_model
+        self.yolo_input_size = yolo_input_size
+        self.detection_interval = detection_interval  # run YOLO on every n-th frame
+        self.face_roi_scale = face_roi_scale  # FaceMesh ROI side as a multiple of the last face box, None = full frame
+
+    def copy(self, **changes):
+        values = self.as_dict()
+        values.update(changes)
+        return TuningProfile(**values)
+
+    def as_dict(self):
+        return {
+            "level": self.level,
+            "capture_width": self.capture_width,
+            "capture_height": self.capture_height,
+            "yolo_model": self.yolo_model,
+            "yolo_input_size": self.yolo_input_size,
+            "detection_interval": self.detection_interval,
+            "face_roi_scale": self.face_roi_scale,
+        }
+
+    def describe(self):
+        roi = f"ROI x{self.face_roi_scale}" if self.face_roi_scale else "full frame"
+        return (f"{self.capture_width}x{self.capture_height}, {self.yolo_model}@{self.yolo_input_size} "
+                f"every {self.detection_interval} frame(s), FaceMesh {roi}")
+
+
+# Heaviest to lightest. The first entry is what the app always did before tuning.
+LEVELS = [
+    TuningProfile(0, 640, 480, "yolov4", 416, 1, None),
+    TuningProfile(1, 640, 480, "yolov4", 416, 2, 2.0),
+    TuningProfile(2, 640, 480, "yolov4", 320, 3, 2.0),
+    TuningProfile(3, 640, 480, "yolov4-tiny", 416, 2, 2.0),
+    TuningProfile(4, 480, 360, "yolov4-tiny", 320, 3, 1.8),
+    TuningProfile(5, 320, 240, "yolov4-tiny", 256, 5, 1.8),
+]
+
+DEFAULT_PROFILE = LEVELS[0]
+
+
+def available_models():
+    return [name for name, paths in YOLO_MODELS.items() if all(os.path.exists(p) for p in paths)]
+
+
+def _time_call(func, frames, repeats):
+    func(frames[0])  # first call pays for lazy initialisation
+    started = time.perf_counter()
+    for i in range(repeats):
+        func(frames[i % len(frames)])
+    return (time.perf_counter() - started) / repeats
+
+
+def _face_box(results, width, height):
+    # (centre x, centre y, side) in pixels of the face FaceMesh found, or of a
+    # typical centred webcam face a quarter of the frame wide
+    if not results.multi_face_landmarks:
+        return width // 2, height // 2, width / 4
+    xs = [landmark.x for landmark in results.multi_face_landmarks[0].landmark]
+    ys = [landmark.y for landmark in results.multi_face_landmarks[0].landmark]
+    side = max((max(xs) - min(xs)) * width, (max(ys) - min(ys)) * height)
+    return int((min(xs) + max(xs)) / 2 * width), int((min(ys) + max(ys)) / 2 * height), side
+
+
+# Startup calibration: micro-benchmarks the detectors on this machine and picks
+# the heaviest level whose estimated per-frame cost fits the frame budget.
+class HardwareCalibrator:
+    def __init__(self, target_fps=10.0, cpu_budget=0.7, repeats=3):
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget  # share of each frame interval the detectors may use
+        self.repeats = repeats
+        self.measurements = {}
+
+    def frame_budget(self):
+        return self.cpu_budget / self.target_fps
+
+    def calibrate(self, sample_frame):
+        import cv2
+        from yolo_detector import YOLODetector
+        from face_recognition_utils import detect_gaze_deviation, FACE_MESH, roi_face_mesh
+
+        models = available_models()
+        levels = [level for level in LEVELS if level.yolo_model in models]
+        if not levels:
+            return DEFAULT_PROFILE
+
+        # One detector per model; input size is just a blob parameter
+        yolo_cost = {}
+        for model in models:
+            weights, config = YOLO_MODELS[model]
+            detector = YOLODetector(weights, config)
+            for size in sorted({level.yolo_input_size for level in levels if level.yolo_model == model}):
+                detector.input_size = size
+                yolo_cost[(model, size)] = _time_call(detector.detect, [sample_frame], self.repeats)
+
+        face_cost = {}
+        for width, height in sorted({(l.capture_width, l.capture_height) for l in levels}):
+            frame = cv2.resize(sample_frame, (width, height))
+            face_cost[(width, height, None)] = _time_call(detect_gaze_deviation, [frame], self.repeats)
+            # With an ROI only the FaceMesh pass changes: time it on the crop the loop would use
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            mesh_full = _time_call(FACE_MESH.process, [rgb], self.repeats)
+            cx, cy, face_side = _face_box(FACE_MESH.process(rgb), width, height)
+            for scale in {l.face_roi_scale for l in levels if l.face_roi_scale}:
+                half = int(face_side * scale / 2)
+                crop = np.ascontiguousarray(rgb[max(0, cy - half):cy + half, max(0, cx - half):cx + half])
+                mesh_roi = _time_call(roi_face_mesh().process, [crop], self.repeats)
+                face_cost[(width, height, scale)] = max(0.0, face_cost[(width, height, None)] - mesh_full) + mesh_roi
+
+        budget = self.frame_budget()
+        chosen = levels[-1]
+        for level in levels:
+            cost = (yolo_cost[(level.yolo_model, level.yolo_input_size)] / level.detection_interval
+                    + face_cost[(level.capture_width, level.capture_height, level.face_roi_scale)])
+            self.measurements[level.level] = round(cost * 1000, 1)
+            if cost <= budget:
+                chosen = level
+                break
+
+        self.measurements["yolo_ms"] = {f"{m}@{s}": round(c * 1000, 1) for (m, s), c in yolo_cost.items()}
+        self.measurements["budget_ms"] = round(budget * 1000, 1)
+        return chosen
+
+
+# Watches the running loop and steps the profile down when the machine cannot
+# keep up (thermal throttling, background load) and back up once it recovers.
+# Only settings that can change without reopening the camera or reloading the
+# model are adjusted at runtime.
+class RuntimeAdjuster:
+    def __init__(self, profile, target_fps=10.0, cpu_budget=0.7, check_interval=10.0, cooldown=30.0):
+        self.base = profile
+        self.profile = profile
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.check_interval = check_interval
+        self.cooldown = cooldown
+        self.steps = [
+            {},
+            {"detection_interval": profile.detection_interval + 1},
+            {"detection_interval": profile.detection_interval + 2, "yolo_input_size": min(profile.yolo_input_size, 320)},
+            {"detection_interval": profile.detection_interval + 4, "yolo_input_size": min(profile.yolo_input_size, 256),
+             "face_roi_scale": profile.face_roi_scale or 2.0},
+        ]
+        self.step = 0
+        self.frames = 0
+        self.window_started = time.monotonic()
+        self.cpu_started = time.process_time()
+        self.last_change = float("-inf")
+        self.last_reading = None
+
+    def observe(self, now=None):
+        # Call once per processed frame; returns the new profile when it changes
+        self.frames += 1
+        now = time.monotonic() if now is None else now
+        elapsed = now - self.window_started
+        if elapsed < self.check_interval:
+            return None
+
+        fps = self.frames / elapsed
+        cpu = (time.process_time() - self.cpu_started) / elapsed / (os.cpu_count() or 1)
+        self.frames = 0
+        self.window_started = now
+        self.cpu_started = time.process_time()
+
+        if now - self.last_change < self.cooldown:
+            return None
+        if (fps < self.target_fps * 0.8 or cpu > self.cpu_budget) and self.step < len(self.steps) - 1:
+            self.step += 1
+        elif fps >= self.target_fps and cpu < self.cpu_budget * 0.5 and self.step > 0:
+            self.step -= 1
+        else:
+            return None
+
+        self.last_change = now
+        self.profile = self.base.copy(**self.steps[self.step])
+        self.last_reading = {"fps": round(fps, 1), "cpu": round(float(np.clip(cpu, 0, 1)), 2)}
+        return self.profile
+
+    def retarget(self, target_fps, now=None):
+        # New frame rate goal, e.g. while the loop is capped to save power; the
+        # frames of the current window were measured against the old goal
+        self.target_fps = target_fps
+        self.frames = 0
+        self.window_started = time.monotonic() if now is None else now
+        self.cpu_started = time.process_time()
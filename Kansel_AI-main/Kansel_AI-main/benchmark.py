@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from synthetic_sources import synthetic_frames, SyntheticAudioStream
+
+
+# Headless benchmark of every detection stage. Frames and audio are either
+# synthetic (seeded, so runs are repeatable) or read from a recording, and the
+# JSON output can be diffed between commits with --compare.
+
+def load_video_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise IOError(f"No frames could be read from {path}")
+    return frames
+
+
+def peak_rss_mb():
+    # Process-wide high-water mark; ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb():
+    # Resident set size right now (ru_maxrss is only the peak)
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func, inputs, warmup, iterations):
+    for i in range(warmup):
+        func(inputs[i % len(inputs)])
+
+    latencies = np.empty(iterations)
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        func(inputs[i % len(inputs)])
+        latencies[i] = time.perf_counter() - t0
+    total = time.perf_counter() - started
+
+    # Allocations are sampled in a separate pass so tracing does not skew the timings
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    for i in range(min(iterations, 10)):
+        func(inputs[i % len(inputs)])
+    _, traced_peak = tracemalloc.get_traced_memory()
+    allocations = sum(stat.count_diff for stat in
+                      tracemalloc.take_snapshot().compare_to(snapshot_before, "filename") if stat.count_diff > 0)
+    tracemalloc.stop()
+
+    ms = latencies * 1000
+    return {
+        "iterations": iterations,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_per_s": round(iterations / total, 2) if total else None,
+        "alloc_peak_kb": round(traced_peak / 1024, 1),
+        "retained_blocks": allocations,
+    }
+
+
+def build_stages(frames, workdir, reference_path):
+    # Each stage is (name, setup) where setup returns (func, inputs); setup may raise to skip the stage
+    def yolo_stage():
+        from yolo_detector import YOLODetector
+        yolo = YOLODetector()
+        return yolo.detect, frames
+
+    def gaze_deviation_stage():
+        from face_recognition_utils import detect_gaze_deviation
+        return detect_gaze_deviation, frames
+
+    def gaze_direction_stage():
+        from gaze_detection import GazeDetector
+        return GazeDetector().get_gaze_direction, frames
+
+    def voice_stage():
+        from voice_activity_detector import VoiceActivityDetector
+        stream = SyntheticAudioStream()
+        detector = VoiceActivityDetector(stream=stream)
+        # The fake stream never blocks, so drive the VAD on the stream's own clock
+        return lambda _: detector.is_voice_detected(current_time=stream.time()), [None]
+
+    def verify_identity_stage():
+        from face_recognition_utils import verify_identity
+        path = reference_path or os.path.join(workdir, "reference.jpg")
+        if not reference_path:
+            cv2.imwrite(path, frames[0])
+        return lambda frame: verify_identity(path, frame), frames
+
+    def report_stage():
+        from report_generator import ReportGenerator
+
+        def render(_):
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                report = ReportGenerator("benchmark")
+                for i in range(5):
+                    report.add_event(f"Benchmark event {i}", frames[i % len(frames)])
+                for i in range(50):
+                    report.add_gaze_event(f"00:00:{i:02d}", "Looking Left")
+                    report.add_voice_event(f"00:00:{i:02d}")
+                report.generate_report()
+            finally:
+                os.chdir(cwd)
+        return render, [None]
+
+    return [
+        ("yolo_detect", yolo_stage),
+        ("detect_gaze_deviation", gaze_deviation_stage),
+        ("gaze_direction", gaze_direction_stage),
+        ("voice_activity", voice_stage),
+        ("verify_identity", verify_identity_stage),
+        ("generate_report", report_stage),
+    ]
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"{'stage':<24}{'p50 before':>12}{'p50 now':>12}{'change':>10}")
+    for name, stage in results["stages"].items():
+        before = baseline.get("stages", {}).get(name, {})
+        if "p50_ms" not in stage or "p50_ms" not in before:
+            continue
+        change = (stage["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+        print(f"{name:<24}{before['p50_ms']:>12.2f}{stage['p50_ms']:>12.2f}{change:>9.1f}%")
+
+
+def run(frame_count=30, iterations=50, warmup=5, seed=0, video=None, reference=None, only=None):
+    frames = load_video_frames(video, frame_count) if video else synthetic_frames(frame_count, seed=seed)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "source": video or f"synthetic(seed={seed})",
+            "frames": len(frames),
+            "iterations": iterations,
+            "warmup": warmup,
+        },
+        "stages": {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, setup in build_stages(frames, workdir, reference):
+            if only and name not in only:
+                continue
+            # The peak RSS is process-wide, so each stage reports what it added instead (model loading included)
+            rss_before = current_rss_mb()
+            try:
+                func, inputs = setup()
+            except Exception as e:
+                results["stages"][name] = {"skipped": f"{type(e).__name__}: {e}"}
+                continue
+            # Slow stages get fewer iterations so the whole suite stays quick
+            stage_iterations = iterations if name != "generate_report" else max(3, iterations // 10)
+            stage = results["stages"][name] = measure(func, inputs, warmup, stage_iterations)
+            stage["rss_before_mb"] = rss_before
+            stage["rss_after_mb"] = current_rss_mb()
+    results["meta"]["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline without camera, microphone or network.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--frames", type=int, default=30, help="Distinct frames to cycle through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--video", help="Use frames from a recording instead of synthetic ones")
+    parser.add_argument("--reference", help="Reference photo for verify_identity (default: first frame)")
+    parser.add_argument("--stage", action="append", help="Run only this stage (repeatable)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    results = run(args.frames, args.iterations, args.warmup, args.seed, args.video, args.reference, args.stage)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,236 @@
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+# Process names (as in /proc/<pid>/comm, lower case) that should not run during an exam
+FORBIDDEN_APPS = {
+    "discord", "slack", "teams", "zoom", "skype", "telegram-deskto", "whatsapp",
+    "signal-desktop", "anydesk", "teamviewer", "obs", "chatgpt",
+}
+
+
+def _focused_sway_node(node):
+    # Depth-first search of a swaymsg get_tree node for the focused window
+    if node.get("focused") and node.get("pid"):
+        return node
+    for child in node.get("nodes", []) + node.get("floating_nodes", []):
+        found = _focused_sway_node(child)
+        if found:
+            return found
+    return None
+
+
+class ProcfsBackend:
+    # Linux backend: processes from /proc, focused window from the compositor.
+    # On Wayland, X tools only see XWayland windows, so focus comes from swaymsg
+    # or hyprctl on sway and Hyprland. On X11 it comes from xdotool or xprop.
+    # Otherwise window_unavailable says why, and only processes are watched.
+    def __init__(self, proc_root="/proc", environ=os.environ):
+        self.proc_root = proc_root
+        self.names = {}  # pid -> name, only new pids are read on each sample
+        self.window_tool = None
+        self.window_unavailable = None
+        if environ.get("WAYLAND_DISPLAY") or environ.get("XDG_SESSION_TYPE") == "wayland":
+            if environ.get("SWAYSOCK") and shutil.which("swaymsg"):
+                self.window_tool = "swaymsg"
+            elif environ.get("HYPRLAND_INSTANCE_SIGNATURE") and shutil.which("hyprctl"):
+                self.window_tool = "hyprctl"
+            else:
+                self.window_unavailable = "Wayland session without a supported compositor (sway, Hyprland)"
+        elif environ.get("DISPLAY"):
+            if shutil.which("xdotool"):
+                self.window_tool = "xdotool"
+            elif shutil.which("xprop"):
+                self.window_tool = "xprop"
+            else:
+                self.window_unavailable = "neither xdotool nor xprop is installed"
+        else:
+            self.window_unavailable = "no graphical session"
+
+    def processes(self):
+        pids = {int(entry) for entry in os.listdir(self.proc_root) if entry.isdigit()}
+        for pid in pids - self.names.keys():
+            try:
+                with open(os.path.join(self.proc_root, str(pid), "comm"), "r") as f:
+                    self.names[pid] = f.read().strip()
+            except OSError:
+                pass  # exited between listdir and open
+        for pid in self.names.keys() - pids:
+            del self.names[pid]
+        return self.names
+
+    def focused_window(self):
+        # (title, pid) of the focused window, or None when it cannot be determined
+        try:
+            if self.window_tool == "xdotool":
+                out = subprocess.run(["xdotool", "getactivewindow", "getwindowname", "getwindowpid"],
+                                     capture_output=True, text=True, timeout=1).stdout.splitlines()
+                if len(out) >= 2:
+                    return out[0], int(out[1])
+            elif self.window_tool == "xprop":
+                active = subprocess.run(["xprop", "-root", "_NET_ACTIVE_WINDOW"],
+                                        capture_output=True, text=True, timeout=1).stdout
+                window_id = active.strip().split()[-1]
+                props = subprocess.run(["xprop", "-id", window_id, "_NET_WM_NAME", "_NET_WM_PID"],
+                                       capture_output=True, text=True, timeout=1).stdout
+                title, pid = "", None
+                for line in props.splitlines():
+                    if line.startswith("_NET_WM_NAME"):
+                        title = line.split("=", 1)[-1].strip().strip('"')
+                    elif line.startswith("_NET_WM_PID"):
+                        pid = int(line.split("=", 1)[-1])
+                return title, pid
+            elif self.window_tool == "swaymsg":
+                tree = subprocess.run(["swaymsg", "-t", "get_tree", "-r"],
+                                      capture_output=True, text=True, timeout=1).stdout
+                node = _focused_sway_node(json.loads(tree))
+                if node:
+                    return node.get("name") or "", int(node["pid"])
+            elif self.window_tool == "hyprctl":
+                # Prints "Invalid" rather than JSON when no window has focus
+                active = json.loads(subprocess.run(["hyprctl", "activewindow", "-j"],
+                                                   capture_output=True, text=True, timeout=1).stdout)
+                if active.get("pid"):
+                    return active.get("title", ""), int(active["pid"])
+        except (OSError, ValueError, IndexError, KeyError, AttributeError, subprocess.SubprocessError):
+            pass
+        return None
+
+
+class FakeActivityBackend:
+    # Scripted backend for headless runs: each sample returns the next
+    # (processes, focused_window) step, repeating the last one
+    window_unavailable = None
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.index = 0
+        self.current = self.steps[0] if self.steps else ({}, None)
+
+    def processes(self):
+        self.current = self.steps[min(self.index, len(self.steps) - 1)] if self.steps else ({}, None)
+        self.index += 1
+        return dict(self.current[0])
+
+    def focused_window(self):
+        return self.current[1]
+
+
+# Watches what else the candidate is doing on the machine: focus changes and
+# forbidden applications. A low-frequency background thread samples the
+# backend and compares each sample with the previous one, so only changes
+# become events. Sampling slows down whenever its own CPU time exceeds
+# cpu_budget of the interval.
 class BrowserLogger:
-    def __init__(self):
+    def __init__(self, journal=None, backend=None, interval=2.0, max_interval=30.0, cpu_budget=0.01,
+                 forbidden=FORBIDDEN_APPS):
+        self.journal = journal
+        self.backend = backend
+        self.base_interval = interval
+        self.interval = interval
+        self.max_interval = max_interval
+        self.cpu_budget = cpu_budget
+        self.forbidden = {name.lower() for name in forbidden}
         self.logs = []
+        self.lock = threading.Lock()
+
+        self.known_pids = set()
+        self.running_forbidden = {}  # pid -> name
+        self.window = None
+        self.window_switches = 0
+        self.samples = 0
+        self.sample_cpu = 0.0  # CPU seconds spent sampling, helper processes included
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.backend is None:
+            self.backend = ProcfsBackend()
+        if self.backend.window_unavailable:
+            # Said once, so a report without window switches is not read as a candidate who never switched
+            reason = self.backend.window_unavailable
+            self._emit("focus_tracking_unavailable", f"Window focus is not tracked: {reason}", reason=reason)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            started = time.thread_time() + self._children_cpu()
+            try:
+                self.sample()
+            except Exception as e:
+                self.log(f"Activity sampling failed: {e}")
+            cost = time.thread_time() + self._children_cpu() - started
+            self.sample_cpu += cost
+            # Back off when sampling would use more than the budget, recover when it is cheap again
+            self.interval = min(self.max_interval, max(self.base_interval, cost / self.cpu_budget))
+            self.stop_event.wait(self.interval)
+
+    @staticmethod
+    def _children_cpu():
+        # CPU of finished helper processes (xdotool, xprop) counts against the budget too
+        times = os.times()
+        return times.children_user + times.children_system
+
+    def sample(self):
+        processes = self.backend.processes()
+        pids = set(processes)
+        for pid in pids - self.known_pids:
+            name = processes[pid]
+            if name.lower() in self.forbidden:
+                with self.lock:
+                    self.running_forbidden[pid] = name
+                self._emit("forbidden_app", f"Forbidden application running: {name}", pid=pid, name=name)
+        for pid in self.known_pids - pids:
+            if pid in self.running_forbidden:
+                with self.lock:
+                    name = self.running_forbidden.pop(pid)
+                self._emit("forbidden_app_closed", f"Forbidden application closed: {name}", pid=pid, name=name)
+        self.known_pids = pids
+
+        window = self.backend.focused_window()
+        if window is not None and window != self.window:
+            title, pid = window
+            if self.window is not None:
+                with self.lock:
+                    self.window_switches += 1
+                self._emit("window_switch", f"Focus moved to: {title}", title=title, pid=pid,
+                           app=processes.get(pid, ""))
+            self.window = window
+        self.samples += 1
+
+    def _emit(self, event_type, message, **fields):
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.log(f"{timestamp} - {message}")
+        if self.journal:
+            self.journal.record(event_type, message, timestamp, **fields)
+
+    def status(self):
+        # Current state for the proctoring loop's rule signals
+        with self.lock:
+            names = sorted(set(self.running_forbidden.values()))
+            return {
+                "forbidden_apps": len(names),
+                "forbidden_app_names": ", ".join(names),
+                "window_switches": self.window_switches,
+            }
 
     def log(self, message):
-        self.logs.append(message)
+        with self.lock:
+            self.logs.append(message)
 
     def get_logs(self):
-        return self.logs
+        with self.lock:
+            return list(self.logs)
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 1.0)
+            self.thread = None
@@ -0,0 +1,117 @@
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from report_generator import COVER_PATH, ReportGenerator
+
+
+# Renders the reports of a whole sitting after the fact. Each session's report
+# is rebuilt from its event journal and rendered in a worker process; the
+# sessions share nothing, so throughput grows with the number of cores. The
+# cover page PNG is converted to JPEG once up front: FPDF has to inflate and
+# re-encode a PNG for every report, while a JPEG is embedded as is.
+
+def prepare_cover(cover_path, cache_folder):
+    # JPEG copy of the cover for the workers, or None when there is no cover
+    if not cover_path or not os.path.exists(cover_path):
+        return None
+    image = cv2.imread(cover_path, cv2.IMREAD_COLOR)
+    if image is None:
+        return cover_path
+    os.makedirs(cache_folder, exist_ok=True)
+    cached = os.path.join(cache_folder, "cover.jpg")
+    cv2.imwrite(cached, image, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return cached
+
+
+def _render(journal_path, output_folder, cover_path):
+    started = time.perf_counter()
+    report = ReportGenerator.from_journal(journal_path)
+    report_path = report.generate_report(
+        cover_path, os.path.join(output_folder, f"proctoring_report_{report.session_id}.pdf"))
+    return {
+        "session": report.session_id,
+        "candidate": report.candidate_name,
+        "malpractice_events": len(report.events),
+        "gaze_events": len(report.gaze_events),
+        "voice_events": len(report.voice_events),
+        "system_events": len(report.system_events),
+        "report": report_path,
+        "render_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def select_journals(paths=None, db_path=None, since=None, journal_folder="session_logs"):
+    # Journals named on the command line, the sessions in the analytics database
+    # (optionally since a date), or every journal in the folder
+    if paths:
+        return paths
+    if db_path:
+        from analytics_store import AnalyticsStore
+        sessions = AnalyticsStore(db_path).sessions(since=since)
+        journals = [os.path.join(journal_folder, f"{s['session_id']}.jsonl") for s in sessions]
+        return [path for path in journals if os.path.exists(path)]
+    return sorted(path for path in glob.glob(os.path.join(journal_folder, "*.jsonl")))
+
+
+def write_summary(rows, path):
+    fields = ["session", "candidate", "malpractice_events", "gaze_events", "voice_events", "system_events",
+              "report", "render_seconds", "error"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        # Candidates with the most malpractice events first
+        for row in sorted(rows, key=lambda r: (-r.get("malpractice_events", 0), -r.get("gaze_events", 0))):
+            writer.writerow(row)
+
+
+def render_all(journals, output_folder="cohort_reports", workers=None, cover_path=COVER_PATH):
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_folder, exist_ok=True)
+    cover = prepare_cover(cover_path, os.path.join(output_folder, ".cache"))
+
+    started = time.monotonic()
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        futures = {executor.submit(_render, path, output_folder, cover): path for path in journals}
+        for future, path in futures.items():
+            try:
+                rows.append(future.result())
+            except Exception as e:
+                # One broken journal should not cost the rest of the cohort its reports
+                session = os.path.splitext(os.path.basename(path))[0]
+                rows.append({"session": session, "error": f"{type(e).__name__}: {e}"})
+
+    summary_path = os.path.join(output_folder, "cohort_summary.csv")
+    write_summary(rows, summary_path)
+    return rows, summary_path, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the reports of many sessions in parallel.")
+    parser.add_argument("journals", nargs="*", help="Session journals (default: every journal in --journal-folder)")
+    parser.add_argument("--journal-folder", default="session_logs")
+    parser.add_argument("--db", help="Pick sessions from this analytics database instead")
+    parser.add_argument("--since", help="With --db: sessions started on or after YYYY-mm-dd")
+    parser.add_argument("--output", default="cohort_reports", help="Folder for the PDFs and cohort_summary.csv")
+    parser.add_argument("--workers", type=int, help="Rendering processes (default: all cores)")
+    parser.add_argument("--cover", default=COVER_PATH, help="Cover page image")
+    args = parser.parse_args()
+
+    journals = select_journals(args.journals, args.db, args.since, args.journal_folder)
+    if not journals:
+        raise SystemExit("No session journals found.")
+    rows, summary_path, seconds = render_all(journals, args.output, args.workers, args.cover)
+    failed = sum(1 for row in rows if "error" in row)
+    print(f"Rendered {len(rows) - failed} of {len(rows)} reports in {seconds:.1f}s; summary in {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import threading
+import time
+
+import cv2
+
+
+# Owns the webcam for the whole application run. A background thread keeps
+# calling grab() so the driver buffer never fills up with stale frames; a
+# frame is only decoded (retrieve) when a reader is waiting for one, so just
+# the newest frame is ever decoded. The object can be handed to anything that
+# expects a cv2.VideoCapture.
+class CameraCapture:
+    def __init__(self, device=0, width=640, height=480, fps=30, fourcc="MJPG", buffer_size=1):
+        self.device = device
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+
+        self.cap = None
+        self.cap_lock = threading.Lock()  # every call into the VideoCapture object
+        self.handoff = threading.Condition()  # frame requests and replies between reader and grabber
+        self.request = None
+        self.reply = None
+        self.running = False
+        self.thread = None
+
+        self.grab_count = 0
+        self.decoded_count = 0
+        self.skipped_count = 0  # grabbed while nobody was waiting: the normal way stale frames are flushed
+        self.dropped_count = 0  # requested by a reader but lost (timeout or failed decode)
+        self.last_latency = 0.0  # seconds from the end of grab() to the end of its decode
+        self.on_drop = None  # called with 1 for every requested frame that was lost, e.g. PerfMonitor.count_drop
+        self.on_skip = None  # called with 1 for every grabbed frame nobody asked for, e.g. PerfMonitor.count_skip
+
+    def open(self):
+        if self.running:
+            return True
+        self.cap = cv2.VideoCapture(self.device)
+        if not self.cap.isOpened():
+            return False
+        self._apply_settings()
+        self.running = True
+        self.thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def _apply_settings(self):
+        # MJPEG keeps USB bandwidth low at higher resolutions; a one-frame buffer keeps frames fresh
+        if self.fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+    def set_resolution(self, width, height):
+        with self.cap_lock:
+            self.width, self.height = width, height
+            if self.cap is not None:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def _grab_loop(self):
+        while self.running:
+            with self.cap_lock:
+                ok = self.cap.grab()
+            if not ok:
+                time.sleep(0.01)
+                continue
+            grabbed_at = time.monotonic()
+            self.grab_count += 1
+
+            with self.handoff:
+                request = self.request
+            if request is None:
+                # Nobody is waiting, leave this frame undecoded
+                self.skipped_count += 1
+                if self.on_skip:
+                    self.on_skip(1)
+                continue
+
+            # Decode on this thread so the reader never contends with grab() for the device
+            with self.cap_lock:
+                ok, frame = self.cap.retrieve(request[0])
+            with self.handoff:
+                self.decoded_count += 1
+                self.last_latency = time.monotonic() - grabbed_at
+                self.request = None
+                self.reply = (ok, frame)
+                self.handoff.notify_all()
+
+    def read(self, image=None, timeout=1.0):
+        # Returns the first frame grabbed after the call, decoded into image when given
+        with self.handoff:
+            if not self.running:
+                return False, None
+            self.reply = None
+            self.request = (image,)
+            deadline = time.monotonic() + timeout
+            while self.reply is None and self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.request = None
+                    break
+                self.handoff.wait(remaining)
+            reply, self.reply = self.reply, None
+            running = self.running
+        if reply is None or not reply[0]:
+            # The frame this reader asked for never arrived or could not be decoded
+            if running:
+                self.dropped_count += 1
+                if self.on_drop:
+                    self.on_drop(1)
+            return False, None
+        return reply
+
+    def isOpened(self):
+        return self.running
+
+    def get(self, prop):
+        with self.cap_lock:
+            return self.cap.get(prop) if self.cap is not None else 0.0
+
+    def set(self, prop, value):
+        with self.cap_lock:
+            return self.cap.set(prop, value) if self.cap is not None else False
+
+    def stats(self):
+        return {
+            "grabbed": self.grab_count,
+            "decoded": self.decoded_count,
+            "skipped": self.skipped_count,
+            "dropped": self.dropped_count,
+            "latency_ms": round(self.last_latency * 1000, 1),
+        }
+
+    def release(self):
+        self.running = False
+        with self.handoff:
+            self.handoff.notify_all()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
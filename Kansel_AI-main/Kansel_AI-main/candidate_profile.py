@@ -0,0 +1,40 @@
+import hashlib
+import json
+import os
+
+PROFILE_FOLDER = "candidate_profiles"
+
+
+# Per-candidate data that is expensive to recompute (the reference face
+# encoding, fitted gaze thresholds) is kept in one JSON file per reference
+# photo. Files are keyed by the photo's content hash, so replacing the photo
+# invalidates everything derived from it.
+def profile_path(reference_image_path, folder=PROFILE_FOLDER):
+    digest = hashlib.sha1()
+    with open(reference_image_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return os.path.join(folder, digest.hexdigest() + ".json")
+
+
+def load_profile(reference_image_path, folder=PROFILE_FOLDER):
+    path = profile_path(reference_image_path, folder)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_profile(reference_image_path, folder=PROFILE_FOLDER, **values):
+    profile = load_profile(reference_image_path, folder)
+    profile.update(values)
+    os.makedirs(folder, exist_ok=True)
+    path = profile_path(reference_image_path, folder)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, path)
+    return profile
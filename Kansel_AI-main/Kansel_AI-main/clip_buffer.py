@@ -0,0 +1,132 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+# Rolling evidence buffer: the last few seconds of downscaled frames, kept as
+# JPEG bytes so memory stays fixed however long the session runs. The loop
+# only hands over a small frame copy; encoding and clip writing happen on a
+# background thread. An event asks for a clip around "now" and the clip is
+# written once the post-event frames have arrived.
+class EvidenceClipBuffer:
+    def __init__(self, pre_seconds=4.0, post_seconds=2.0, fps=5.0, scale=0.5, quality=70, fourcc="mp4v",
+                 clock=time.monotonic):
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fps = fps
+        self.scale = scale
+        self.quality = quality
+        self.fourcc = fourcc
+        self.clock = clock  # must match the frame timestamps passed to push()
+
+        capacity = int(np.ceil((pre_seconds + post_seconds) * fps)) + 1
+        self.frames = deque(maxlen=capacity)  # (timestamp, jpeg bytes)
+        self.incoming = queue.Queue(maxsize=4)  # small frames waiting to be encoded
+        self.requests = []  # (start, end, path) clips waiting for their post-event frames
+        self.lock = threading.Lock()
+        self.last_push = float("-inf")
+        self.dropped = 0
+        self.on_drop = None  # called with 1 for every frame the busy encoder had to skip
+        self.failed = 0
+        self.written = []
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def push(self, frame, timestamp):
+        # Called for every captured frame; keeps at most fps frames per second
+        if timestamp - self.last_push < 1.0 / self.fps:
+            return
+        self.last_push = timestamp
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        try:
+            self.incoming.put_nowait((timestamp, small))
+        except queue.Full:
+            self.dropped += 1
+            if self.on_drop:
+                self.on_drop(1)
+
+    def request_clip(self, path, at=None):
+        # Schedules a clip from pre_seconds before to post_seconds after at; returns its path
+        at = self.clock() if at is None else at
+        with self.lock:
+            self.requests.append((at - self.pre_seconds, at + self.post_seconds, path))
+        return path
+
+    def pending_until(self):
+        # End of the latest clip still waiting for its post-event frames, None when none is
+        with self.lock:
+            return max((end for _, end, _ in self.requests), default=None)
+
+    def _run(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while self.running or not self.incoming.empty():
+            try:
+                timestamp, small = self.incoming.get(timeout=0.2)
+                ok, encoded = cv2.imencode(".jpg", small, params)
+                if ok:
+                    self.frames.append((timestamp, encoded.tobytes()))
+                latest = timestamp
+            except queue.Empty:
+                latest = self.clock()
+            self._write_due(latest)
+        self._write_due(float("inf"))
+
+    def _write_due(self, latest):
+        with self.lock:
+            due = [r for r in self.requests if r[1] <= latest]
+            self.requests = [r for r in self.requests if r[1] > latest]
+        for start, end, path in due:
+            self._write_clip(start, end, path)
+
+    def _write_clip(self, start, end, path):
+        # Only clips that made it to disk end up in written; a failed one leaves no file behind
+        frames = [jpeg for timestamp, jpeg in list(self.frames) if start <= timestamp <= end]
+        if not frames:
+            return
+        writer = None
+        try:
+            for jpeg in frames:
+                image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                if writer is None:
+                    height, width = image.shape[:2]
+                    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+                    if not writer.isOpened():
+                        raise OSError(f"no {self.fourcc} video writer for {path}")
+                writer.write(image)
+            writer.release()
+            self.written.append(path)
+        except Exception as e:
+            if writer is not None:
+                writer.release()
+            if os.path.exists(path):
+                os.remove(path)
+            self.failed += 1
+            print("[Clips]: clip not written:", e)
+
+    def close(self):
+        # Writes clips that are still waiting, with whatever frames they have;
+        # waits for all of them so the report only lists finished clips
+        self.running = False
+        self.thread.join()
+
+
+def capture_clip_tail(clips, ring, cap):
+    # A terminating event ends the proctoring loop at once, but its clip still
+    # needs post_seconds of frames: keep capturing into the buffer until every
+    # requested clip has them (or the camera gives out)
+    until = clips.pending_until()
+    while until is not None and clips.clock() < until:
+        ring_frame = ring.capture(cap)
+        if ring_frame is None:
+            break
+        try:
+            clips.push(ring_frame.bgr, ring_frame.timestamp)
+        finally:
+            ring.release(ring_frame.slot)
@@ -0,0 +1,99 @@
+from collections import deque
+
+from rules_engine import MALPRACTICE_LABELS
+
+
+def box_iou(a, b):
+    # Intersection over union of two [x, y, w, h] boxes
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = min(ax + aw, bx + bw) - max(ax, bx)
+    ih = min(ay + ah, by + bh) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+class _Candidate:
+    def __init__(self, label, box, runs):
+        self.label = label
+        self.box = box
+        self.hits = deque([True], maxlen=runs)
+        self.confirmed = False
+        self.rechecked = False
+
+
+# Holds back malpractice detections until the same object has been seen in k
+# of the last n detector runs, matched from run to run by label and box IoU.
+# When a recheck callable is given it is asked once per candidate, at the
+# moment the k-of-n test passes, to look at the suspicious region again
+# (typically at a higher YOLO input size); a rejected candidate starts over.
+# Detections of other labels pass through unchanged.
+class DetectionConfirmer:
+    def __init__(self, k=3, n=5, iou_threshold=0.3, labels=MALPRACTICE_LABELS):
+        self.k = k
+        self.n = n
+        self.iou_threshold = iou_threshold
+        self.labels = set(labels)
+        self.candidates = []
+        self.rejected = 0
+
+    def update(self, detections, recheck=None):
+        # Call once per detector run; returns detections with unconfirmed objects removed.
+        # recheck(label, box) -> bool
+        watched = [obj for obj in detections if obj["label"] in self.labels]
+        passed = [obj for obj in detections if obj["label"] not in self.labels]
+
+        # Greedy association, best overlaps first
+        pairs = []
+        for i, obj in enumerate(watched):
+            for j, candidate in enumerate(self.candidates):
+                if candidate.label == obj["label"]:
+                    iou = box_iou(obj["box"], candidate.box)
+                    if iou >= self.iou_threshold:
+                        pairs.append((iou, i, j))
+        pairs.sort(reverse=True)
+        matched = {}
+        used = set()
+        for _, i, j in pairs:
+            if i not in matched and j not in used:
+                matched[i] = j
+                used.add(j)
+
+        for j, candidate in enumerate(self.candidates):
+            if j not in used:
+                candidate.hits.append(False)
+
+        for i, obj in enumerate(watched):
+            if i in matched:
+                candidate = self.candidates[matched[i]]
+                candidate.box = obj["box"]
+                candidate.hits.append(True)
+            else:
+                candidate = _Candidate(obj["label"], obj["box"], self.n)
+                self.candidates.append(candidate)
+
+            if not candidate.confirmed and sum(candidate.hits) >= self.k:
+                if recheck is not None and not candidate.rechecked:
+                    candidate.rechecked = True
+                    if not recheck(candidate.label, candidate.box):
+                        self.rejected += 1
+                        candidate.hits.clear()
+                        continue
+                candidate.confirmed = True
+            if candidate.confirmed:
+                passed.append(obj)
+
+        # Forget candidates that were not seen in any of the last n runs
+        self.candidates = [c for c in self.candidates if any(c.hits)]
+        return passed
+
+    def reset(self):
+        self.candidates = []
+
+
+def region_confirms(detections, label, box, iou_threshold=0.1):
+    # True when a region re-check found the same kind of object where the candidate was
+    return any(obj["label"] == label and box_iou(obj["box"], box) >= iou_threshold for obj in detections)
@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import queue
+import time
+
+import cv2
+
+from frame_ring import SharedFrameRing
+from rules_engine import analysis_signals
+
+
+def analyse_frame(ring_frame, yolo=None, gaze=True, yolo_input_size=None, roi_scale=None, gaze_thresholds=None,
+                  max_faces=0):
+    # The per-frame detector work, shared by the in-process loop and the pool workers
+    from face_recognition_utils import detect_gaze_deviation, last_head_pose, last_mouth_ratio, detect_faces
+
+    # Stage timings travel with the result so pooled runs are instrumented too
+    timings = {}
+    result = {"timings": timings}
+    if yolo is not None:
+        started = time.perf_counter()
+        result["detections"] = yolo.detect(ring_frame.bgr, yolo_input_size)
+        timings["object_detection"] = time.perf_counter() - started
+    if gaze:
+        started = time.perf_counter()
+        result["gaze"] = detect_gaze_deviation(ring_frame.bgr, frame_rgb=ring_frame.rgb, roi_scale=roi_scale,
+                                               thresholds=gaze_thresholds)
+        result["head_pose"] = last_head_pose()
+        result["mouth"] = last_mouth_ratio()
+        timings["gaze"] = time.perf_counter() - started
+    if max_faces:
+        # Counting faces does not need full resolution
+        started = time.perf_counter()
+        result["faces"] = detect_faces(cv2.cvtColor(ring_frame.small, cv2.COLOR_BGR2RGB), max_faces)
+        timings["face_scan"] = time.perf_counter() - started
+    return result
+
+
+def consume_analysis(result, timestamp, perf, tracker, speaker, face_filter, confirmer, recheck=None):
+    # The main-process half of analyse_frame: feeds one result to the stateful
+    # tracker and filters and returns its rule signals. ProctoringSession and
+    # the soak test both go through here, so the soak test measures the real thing.
+    for stage, seconds in result["timings"].items():
+        perf.record(stage, seconds)
+
+    # Tracks follow people and objects between detector runs
+    if result.get("detections") is not None:
+        tracker.update(result["detections"], timestamp)
+    else:
+        tracker.predict()
+
+    speaker.add_mouth(timestamp, result.get("mouth"))
+    if result.get("faces") is not None:
+        result["secondary_faces"] = face_filter.update(result["faces"])
+
+    # A malpractice object only counts once it persists over several detector runs
+    if result.get("detections") is not None:
+        result["detections"] = confirmer.update(result["detections"], recheck)
+    return analysis_signals(result, tracker)
+
+
+# State of one worker process, filled in by _init_worker
+_worker_ring = None
+_worker_yolo = None
+_worker_gaze = False
+_worker_gaze_thresholds = None
+
+
+def _init_worker(ring_descriptor, detectors, yolo_paths, gaze_thresholds):
+    global _worker_ring, _worker_yolo, _worker_gaze, _worker_gaze_thresholds
+    _worker_ring = SharedFrameRing.attach(ring_descriptor)
+    if "yolo" in detectors:
+        from yolo_detector import YOLODetector
+        _worker_yolo = YOLODetector(*yolo_paths)
+    _worker_gaze = "gaze" in detectors
+    _worker_gaze_thresholds = gaze_thresholds
+
+
+def _run_detectors(slot, frame_id, run_yolo, yolo_input_size, roi_scale, max_faces):
+    ring_frame = _worker_ring.frame(slot)
+    if ring_frame.frame_id != frame_id:
+        return slot, frame_id, {"error": RuntimeError(f"Frame slot {slot} was reused before analysis")}
+    yolo = _worker_yolo if run_yolo else None
+    result = analyse_frame(ring_frame, yolo, _worker_gaze, yolo_input_size, roi_scale, _worker_gaze_thresholds, max_faces)
+    return slot, frame_id, result
+
+
+def _detect_region(slot, frame_id, box, input_size):
+    ring_frame = _worker_ring.frame(slot)
+    if ring_frame.frame_id != frame_id or _worker_yolo is None:
+        return []
+    return _worker_yolo.detect_region(ring_frame.bgr, box, input_size)
+
+
+# Runs the CPU-bound detectors in a pool of worker processes so they do not
+# compete with the GUI thread for the GIL. Workers attach to the session's
+# frame ring and read frames in place; a submitted slot stays retained until
+# the caller releases it after handling the result, so the capture stage never
+# overwrites a frame a worker is still reading.
+class DetectorPool:
+    def __init__(self, ring, processes=None, detectors=("yolo", "gaze"), max_pending=None,
+                 yolo_paths=("yolov4.weights", "yolov4.cfg"), gaze_thresholds=None):
+        self.ring = ring
+        self.processes = processes or max(1, (os.cpu_count() or 2) - 1)
+        self.max_pending = max_pending or self.processes * 2
+        self.results = queue.Queue()
+        self.in_flight = 0
+        self.skipped_frames = 0
+
+        # spawn keeps the workers clear of the parent's Qt and capture threads
+        context = multiprocessing.get_context("spawn")
+        self.pool = context.Pool(
+            self.processes,
+            initializer=_init_worker,
+            initargs=(ring.descriptor(), tuple(detectors), tuple(yolo_paths), gaze_thresholds)
+        )
+
+    def submit(self, ring_frame, run_yolo=True, yolo_input_size=None, roi_scale=None, max_faces=0):
+        # Returns False when the workers are saturated and the frame is skipped
+        if self.in_flight >= self.max_pending:
+            self.skipped_frames += 1
+            return False
+        self.ring.retain(ring_frame.slot)
+        self.in_flight += 1
+        slot, frame_id = ring_frame.slot, ring_frame.frame_id
+        self.pool.apply_async(
+            _run_detectors, (slot, frame_id, run_yolo, yolo_input_size, roi_scale, max_faces),
+            callback=self.results.put,
+            error_callback=lambda e: self.results.put((slot, frame_id, {"error": e}))
+        )
+        return True
+
+    def poll(self, timeout=None):
+        # Finished work as (ring_frame, result), oldest frame first. The caller
+        # must hand each ring_frame back through release() once it is handled.
+        finished = []
+        try:
+            finished.append(self.results.get(timeout=timeout) if timeout else self.results.get_nowait())
+            while True:
+                finished.append(self.results.get_nowait())
+        except queue.Empty:
+            pass
+        self.in_flight -= len(finished)
+        finished.sort(key=lambda item: item[1])
+        return [(self.ring.frame(slot), result) for slot, _, result in finished]
+
+    def detect_region(self, ring_frame, box, input_size=608):
+        # Synchronous high-resolution re-check of one region; the caller must still hold the slot
+        return self.pool.apply(_detect_region, (ring_frame.slot, ring_frame.frame_id, box, input_size))
+
+    def release(self, ring_frame):
+        self.ring.release(ring_frame.slot)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
@@ -1,5 +1,5 @@
 import smtplib
-import random
+from otp_manager import generate_code
 from email.message import EmailMessage
 
 EXAMINER_EMAIL = ""  # Default examiner email here
@@ -64,7 +64,7 @@ AI Proctoring System
         smtp.send_message(msg)
 
 # === New Function: 2FA OTP email ===
-def send_otp_email(to_email, otp_code):
+def send_otp_email(to_email, otp_code, valid_minutes=5):
     msg = EmailMessage()
     msg['Subject'] = "Your OTP Code for Exam Login"
     msg['From'] = SENDER_EMAIL
@@ -79,7 +79,7 @@ Your One-Time Password (OTP) for starting the exam is:
 
 Please enter this code in the system to verify your identity.
 
-Note: This code is valid for one login attempt only.
+Note: This code can be used once and expires in {valid_minutes:g} minutes.
 
 Regards,
 AI Proctoring System
@@ -91,4 +91,5 @@ AI Proctoring System
 
 # === New Function: Generate 6-digit OTP ===
 def generate_otp():
-    return str(random.randint(100000, 999999))
+    # From the secrets module; random is predictable
+    return generate_code(6)
@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+import datetime
+
+
+def session_journal_path(candidate_name, folder="session_logs"):
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(folder, f"{candidate_name}_{stamp}.jsonl")
+
+
+# Append-only JSON-lines record of everything that happened in a session.
+# One line per event, flushed as it is written, so the journal survives a
+# crash and can be replayed or diffed between a live run and an offline re-score.
+class EventJournal:
+    def __init__(self, path, resume_offset=None, seq=0, listener=None):
+        # resume_offset/seq come from position() at a checkpoint; later lines are dropped
+        self.path = path
+        self.listener = listener  # called with every entry, e.g. AnalyticsStore.journal_listener
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+        if resume_offset is not None:
+            self.file.truncate(resume_offset)
+            self.file.seek(resume_offset)
+        self.seq = seq
+
+    def record(self, event_type, message, timestamp=None, **fields):
+        if timestamp is None:
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.lock:
+            self.seq += 1
+            entry = {"seq": self.seq, "time": timestamp, "type": event_type, "message": message}
+            entry.update(fields)
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            if self.listener:
+                self.listener(entry)
+        return entry
+
+    @property
+    def session_id(self):
+        # The journal file name identifies the session everywhere else (evidence folder, analytics)
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def offset(self):
+        # Byte position of the end of the journal, used to resume an interrupted session
+        with self.lock:
+            return self.file.tell()
+
+    def position(self):
+        # (offset, seq) taken together, for a checkpoint
+        with self.lock:
+            return self.file.tell(), self.seq
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+    @staticmethod
+    def read(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
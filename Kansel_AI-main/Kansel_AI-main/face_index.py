@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+INDEX_FOLDER = "face_index"
+
+
+def _cell_lists(cells, cell_count):
+    # Row ids grouped by cell: rows in cell c are list_rows[list_starts[c]:list_starts[c + 1]]
+    list_rows = np.argsort(cells, kind="stable")
+    return list_rows, np.searchsorted(cells[list_rows], np.arange(cell_count + 1))
+
+
+# Persistent index of every verified candidate's 128-d face encoding, used to
+# find the same person sitting exams under different names. Encodings live in
+# a memory-mapped float32 matrix that grows by doubling, with one metadata line
+# per row beside it. For fast lookups the rows are split into k-means cells (an
+# inverted file): a query only compares exactly against the rows of the few
+# cells whose centroids are closest. Cells are refitted on a background thread
+# each time the index has doubled in size, while queries keep using the old
+# cells; rows added in between go into their nearest existing cell.
+class FaceIndex:
+    def __init__(self, folder=INDEX_FOLDER, dim=128, probes=8, min_train=256, initial_capacity=1024, seed=0):
+        self.folder = folder
+        self.probes = probes
+        self.min_train = min_train
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.training = None  # background refit in progress
+        os.makedirs(folder, exist_ok=True)
+        self.header_path = os.path.join(folder, "index.json")
+        self.matrix_path = os.path.join(folder, "encodings.f32")
+        self.cells_path = os.path.join(folder, "cells.i32")
+        self.centroids_path = os.path.join(folder, "centroids.npy")
+        self.meta_path = os.path.join(folder, "entries.jsonl")
+
+        header = self._read_header() or {}
+        self.dim = header.get("dim", dim)
+        self.count = header.get("count", 0)
+        self.capacity = max(initial_capacity, header.get("capacity", 0))
+        self.trained_at = header.get("trained_at", 0)
+        self._open_arrays()
+        self.entries = self._read_entries()
+        self.profiles = {entry["profile"]: row for row, entry in enumerate(self.entries) if entry.get("profile")}
+
+        self.centroids = None
+        if self.trained_at and os.path.exists(self.centroids_path):
+            self.centroids = np.load(self.centroids_path)
+        self._build_lists()
+
+    def _read_header(self):
+        try:
+            with open(self.header_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_header(self):
+        header = {"dim": self.dim, "count": self.count, "capacity": self.capacity, "trained_at": self.trained_at}
+        tmp_path = self.header_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(header, f)
+        os.replace(tmp_path, self.header_path)
+
+    def _open_memmap(self, path, dtype, shape):
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if not os.path.exists(path):
+            return np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+        if os.path.getsize(path) < size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open_arrays(self):
+        self.matrix = self._open_memmap(self.matrix_path, np.float32, (self.capacity, self.dim))
+        self.cells = self._open_memmap(self.cells_path, np.int32, (self.capacity,))
+
+    def _read_entries(self):
+        # Lines beyond the header count belong to an insert that did not finish
+        entries = []
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r+b") as f:
+                end = 0
+                for line in f:
+                    if len(entries) == self.count:
+                        break
+                    entries.append(json.loads(line))
+                    end += len(line)
+                f.truncate(end)
+        self.count = len(entries)
+        return entries
+
+    def _build_lists(self):
+        self.tail = []  # rows added since the lists were built
+        if self.centroids is None:
+            return
+        self.list_rows, self.list_starts = _cell_lists(np.asarray(self.cells[:self.count]), len(self.centroids))
+
+    def _nearest_cells(self, encodings, n=1, centroids=None):
+        # Squared distances via |x|^2 - 2x.c + |c|^2, without materialising the differences
+        centroids = self.centroids if centroids is None else centroids
+        scores = (centroids ** 2).sum(axis=1) - 2 * encodings @ centroids.T
+        if n == 1:
+            return scores.argmin(axis=1)
+        n = min(n, len(centroids))
+        return np.argpartition(scores, n - 1, axis=1)[:, :n]
+
+    def _fit(self, matrix, count):
+        # Lloyd's k-means on a sample of the first count rows, then each of them is assigned in chunks
+        cell_count = int(np.clip(np.sqrt(count), 16, 4096))
+        sample_rows = self.rng.choice(count, min(count, 64 * cell_count), replace=False)
+        sample = np.asarray(matrix[np.sort(sample_rows)])
+        centroids = sample[self.rng.choice(len(sample), cell_count, replace=False)].copy()
+        for _ in range(10):
+            assigned = self._nearest_cells(sample, centroids=centroids)
+            for c in range(cell_count):
+                members = sample[assigned == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+        cells = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            end = min(count, start + 65536)
+            cells[start:end] = self._nearest_cells(np.asarray(matrix[start:end]), centroids=centroids)
+        return centroids, cells
+
+    def _train(self, matrix, count):
+        # Runs on the training thread. Rows below count never change, so the fit
+        # needs no lock; only the swap to the new cells does.
+        try:
+            centroids, cells = self._fit(matrix, count)
+            list_rows, list_starts = _cell_lists(cells, len(centroids))
+            with self.lock:
+                # Rows added during the fit join the new lists' tail
+                tail = np.arange(count, self.count)
+                self.cells[:count] = cells
+                if len(tail):
+                    self.cells[tail] = self._nearest_cells(np.asarray(self.matrix[tail]), centroids=centroids)
+                self.cells.flush()
+                tmp_path = self.centroids_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, centroids)
+                os.replace(tmp_path, self.centroids_path)
+                self.centroids = centroids
+                self.list_rows, self.list_starts = list_rows, list_starts
+                self.tail = tail.tolist()
+                self.trained_at = count
+                self._write_header()
+        except Exception as e:
+            print("[FaceIndex]: refitting the cells failed:", e)
+        finally:
+            with self.lock:
+                self.training = None
+
+    def wait_for_training(self):
+        training = self.training
+        if training is not None:
+            training.join()
+
+    def __len__(self):
+        return self.count
+
+    def add(self, encoding, **metadata):
+        # Appends one encoding; metadata (candidate name, profile key, ...) comes back with query results
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        with self.lock:
+            if self.count == self.capacity:
+                self.matrix.flush()
+                self.cells.flush()
+                self.capacity *= 2
+                self._open_arrays()
+            row = self.count
+            self.matrix[row] = encoding
+            if self.centroids is not None:
+                self.cells[row] = self._nearest_cells(encoding[None])[0]
+                self.tail.append(row)
+            self.matrix.flush()
+            self.cells.flush()
+            with open(self.meta_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(metadata) + "\n")
+            self.count += 1
+            self.entries.append(metadata)
+            if metadata.get("profile"):
+                self.profiles[metadata["profile"]] = row
+
+            self._write_header()
+            if self.count >= self.min_train and self.count >= 2 * self.trained_at and self.training is None:
+                # Refitting takes seconds at scale; session start must not wait for it
+                self.training = threading.Thread(target=self._train, args=(self.matrix, self.count), daemon=True)
+                self.training.start()
+            elif len(self.tail) >= 1024:
+                self._build_lists()
+            return row
+
+    def _candidates(self, encoding):
+        if self.centroids is None:
+            return np.arange(self.count)
+        probed = self._nearest_cells(encoding[None], self.probes)[0]
+        found = [self.list_rows[self.list_starts[c]:self.list_starts[c + 1]] for c in probed]
+        if self.tail:
+            tail = np.array(self.tail)
+            found.append(tail[np.isin(self.cells[tail], probed)])
+        return np.concatenate(found)
+
+    def query(self, encoding, k=5, max_distance=None, exact=False):
+        # Up to k (distance, row, metadata) nearest entries, closest first
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        with self.lock:
+            if self.count == 0:
+                return []
+            rows = np.arange(self.count) if exact else self._candidates(encoding)
+            if not len(rows):
+                return []
+            distances = np.linalg.norm(self.matrix[rows] - encoding, axis=1)
+            results = []
+            for i in np.argsort(distances)[:k]:
+                if max_distance is not None and distances[i] > max_distance:
+                    break
+                row = int(rows[i])
+                results.append((float(distances[i]), row, self.entries[row]))
+            return results
+
+    def contains_profile(self, profile):
+        return profile in self.profiles
+
+    def close(self):
+        self.wait_for_training()
+        with self.lock:
+            self.matrix.flush()
+            self.cells.flush()
+
+
+def register_identity(index, encoding, candidate_name, profile, tolerance=0.6, k=5):
+    # Earlier entries with the same face under a different name; the candidate
+    # is then added unless this reference photo is indexed already
+    matches = [(distance, entry) for distance, _, entry in index.query(encoding, k, max_distance=tolerance)
+               if entry.get("candidate") != candidate_name]
+    if not index.contains_profile(profile):
+        index.add(encoding, candidate=candidate_name, profile=profile)
+    return matches
+
+
+def describe_matches(matches):
+    return "; ".join(f"{entry.get('candidate')} (distance {distance:.2f})" for distance, entry in matches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the face index for earlier candidates matching a photo.")
+    parser.add_argument("photo", help="Photo of the person to look up")
+    parser.add_argument("--folder", default=INDEX_FOLDER)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--exact", action="store_true", help="Compare with every entry instead of the closest cells")
+    args = parser.parse_args()
+
+    import face_recognition
+    encodings = face_recognition.face_encodings(face_recognition.load_image_file(args.photo))
+    if not encodings:
+        raise SystemExit(f"No face found in {args.photo}")
+    index = FaceIndex(args.folder)
+    for distance, row, entry in index.query(encodings[0], args.top, args.tolerance, args.exact):
+        print(f"{distance:.3f}  #{row}  {json.dumps(entry)}")
+
+
+if __name__ == "__main__":
+    main()
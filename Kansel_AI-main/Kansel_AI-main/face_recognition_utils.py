@@ -1,30 +1,203 @@
+import os
 import face_recognition
 import numpy as np
 import mediapipe as mp
 import cv2
 
-# Identity verification function (unchanged)
+from candidate_profile import load_profile, update_profile, profile_path
+from face_index import FaceIndex, register_identity
+
+# Gaze limits on the fused iris ratios; per-candidate values come from gaze_calibration
+DEFAULT_GAZE_THRESHOLDS = {"left": 0.35, "right": 0.65, "down": 0.65}
+
+_reference_encodings = {}  # reference image path -> encoding, for this process
+
+def reference_encoding(reference_image_path):
+    # Encoding the reference photo is the slowest part of verification, so it is
+    # computed once per photo and kept in the candidate profile for later exams
+    encoding = _reference_encodings.get(reference_image_path)
+    if encoding is not None:
+        return encoding
+    stored = load_profile(reference_image_path).get("encoding")
+    if stored is not None:
+        encoding = np.array(stored)
+    else:
+        ref_image = face_recognition.load_image_file(reference_image_path)
+        ref_encodings = face_recognition.face_encodings(ref_image)
+        if not ref_encodings:
+            return None
+        encoding = ref_encodings[0]
+        update_profile(reference_image_path, encoding=encoding.tolist())
+    _reference_encodings[reference_image_path] = encoding
+    return encoding
+
+# Identity verification function
 def verify_identity(reference_image_path, live_frame, tolerance=0.6):
-    ref_image = face_recognition.load_image_file(reference_image_path)
-    ref_encodings = face_recognition.face_encodings(ref_image)
-    if not ref_encodings:
+    ref_encoding = reference_encoding(reference_image_path)
+    if ref_encoding is None:
         return False
-    reference_encoding = ref_encodings[0]
 
     live_encodings = face_recognition.face_encodings(live_frame)
     if not live_encodings:
         return False
 
-    if isinstance(reference_encoding, np.ndarray) and isinstance(live_encodings[0], np.ndarray):
-        matches = face_recognition.compare_faces([reference_encoding], live_encodings[0], tolerance=tolerance)
+    if isinstance(ref_encoding, np.ndarray) and isinstance(live_encodings[0], np.ndarray):
+        matches = face_recognition.compare_faces([ref_encoding], live_encodings[0], tolerance=tolerance)
         return matches[0]
     else:
         return False
 
+_face_index = None  # cohort-wide FaceIndex, opened on first use
+
+def face_index():
+    # Opening a large index reads every entry, so the app does it while the candidate is busy with 2FA
+    global _face_index
+    if _face_index is None:
+        _face_index = FaceIndex()
+    return _face_index
+
+def duplicate_identities(reference_image_path, candidate_name, tolerance=0.6):
+    # Earlier candidates (under other names) whose face matches this reference
+    # photo, as (distance, entry); the candidate is added to the index afterwards
+    encoding = reference_encoding(reference_image_path)
+    if encoding is None:
+        return []
+    profile = os.path.basename(profile_path(reference_image_path))
+    return register_identity(face_index(), encoding, candidate_name, profile, tolerance)
+
 # Mediapipe initialization
 mp_face_mesh = mp.solutions.face_mesh
 FACE_MESH = mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.5)
 
+# Separate multi-face mesh for the low-cadence secondary face scan, created on first use
+_multi_face_mesh = None
+_multi_face_limit = 0
+
+def detect_faces(frame_rgb, max_faces=3):
+    # Boxes (x0, y0, x1, y1) as fractions of the frame, one per face found
+    global _multi_face_mesh, _multi_face_limit
+    if _multi_face_mesh is None or _multi_face_limit != max_faces:
+        _multi_face_mesh = mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=max_faces,
+                                                 refine_landmarks=False, min_detection_confidence=0.5)
+        _multi_face_limit = max_faces
+    results = _multi_face_mesh.process(frame_rgb)
+    boxes = []
+    for face in results.multi_face_landmarks or []:
+        xs = [landmark.x for landmark in face.landmark]
+        ys = [landmark.y for landmark in face.landmark]
+        boxes.append((min(xs), min(ys), max(xs), max(ys)))
+    return boxes
+
+# Last face box (x0, y0, x1, y1) in pixels, used to crop the next FaceMesh pass
+_last_face_box = None
+
+# Crops move and change size from frame to frame, so they are not a video
+# stream FACE_MESH could track through; they go to a static-mode mesh of their
+# own and FACE_MESH only ever sees full frames. Created on first use.
+_roi_face_mesh = None
+
+def roi_face_mesh():
+    global _roi_face_mesh
+    if _roi_face_mesh is None:
+        _roi_face_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, refine_landmarks=True,
+                                               min_detection_confidence=0.5)
+    return _roi_face_mesh
+
+def _face_roi(w, h, roi_scale):
+    if not roi_scale or _last_face_box is None:
+        return None
+    x0, y0, x1, y1 = _last_face_box
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    half = max(x1 - x0, y1 - y0) * roi_scale / 2
+    return (int(max(0, cx - half)), int(max(0, cy - half)),
+            int(min(w, cx + half)), int(min(h, cy + half)))
+
+def _process_face_mesh(frame_rgb, roi_scale):
+    # Runs FaceMesh on the region around the last face when roi_scale is set and
+    # maps the landmarks back to full-frame coordinates; falls back to the full frame
+    global _last_face_box
+    h, w = frame_rgb.shape[:2]
+    roi = _face_roi(w, h, roi_scale)
+    results = None
+    if roi is not None:
+        rx0, ry0, rx1, ry1 = roi
+        results = roi_face_mesh().process(np.ascontiguousarray(frame_rgb[ry0:ry1, rx0:rx1]))
+        if results.multi_face_landmarks:
+            cw, ch = rx1 - rx0, ry1 - ry0
+            for landmark in results.multi_face_landmarks[0].landmark:
+                landmark.x = (rx0 + landmark.x * cw) / w
+                landmark.y = (ry0 + landmark.y * ch) / h
+        else:
+            results = None
+    if results is None:
+        results = FACE_MESH.process(frame_rgb)
+
+    if results.multi_face_landmarks:
+        xs = [landmark.x for landmark in results.multi_face_landmarks[0].landmark]
+        ys = [landmark.y for landmark in results.multi_face_landmarks[0].landmark]
+        _last_face_box = (min(xs) * w, min(ys) * h, max(xs) * w, max(ys) * h)
+    else:
+        _last_face_box = None
+    return results
+
+# Canonical 3D face (mm) in camera axes: x right, y down, z away from the camera.
+# Rows match HEAD_POSE_LANDMARKS: nose tip, chin, eye outer corners, mouth corners.
+HEAD_POSE_LANDMARKS = [1, 152, 33, 263, 61, 291]
+HEAD_MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),
+    (0.0, 330.0, 65.0),
+    (-225.0, -170.0, 135.0),
+    (225.0, -170.0, 135.0),
+    (-150.0, 150.0, 125.0),
+    (150.0, 150.0, 125.0),
+])
+HEAD_YAW_RANGE = 120.0  # head yaw in degrees worth the whole 0..1 iris ratio range
+HEAD_PITCH_RANGE = 100.0  # same for head pitch against the vertical iris ratio
+
+_camera_matrices = {}  # (width, height) -> approximate pinhole intrinsics
+_last_pose = None  # (rvec, tvec) of the previous frame, the start of the next iterative solve
+_last_angles = None  # (yaw, pitch, roll) in degrees from the latest frame
+_last_mouth_ratio = None  # lip gap over mouth width from the latest frame
+
+def _camera_matrix(w, h):
+    matrix = _camera_matrices.get((w, h))
+    if matrix is None:
+        # Focal length of about the image width fits typical webcams
+        matrix = _camera_matrices[(w, h)] = np.array([[w, 0, w / 2], [0, w, h / 2], [0, 0, 1]], dtype=np.float64)
+    return matrix
+
+def estimate_head_pose(landmarks, frame_width, frame_height):
+    # Returns (yaw, pitch, roll) in degrees: yaw > 0 turned towards image right, pitch > 0 tilted down
+    global _last_pose, _last_angles
+    image_points = np.array([(landmarks.landmark[i].x * frame_width, landmarks.landmark[i].y * frame_height)
+                             for i in HEAD_POSE_LANDMARKS], dtype=np.float64)
+    camera = _camera_matrix(frame_width, frame_height)
+    if _last_pose is not None:
+        rvec, tvec = _last_pose[0].copy(), _last_pose[1].copy()
+        ok, rvec, tvec = cv2.solvePnP(HEAD_MODEL_POINTS, image_points, camera, None, rvec, tvec,
+                                      useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE)
+    else:
+        ok, rvec, tvec = cv2.solvePnP(HEAD_MODEL_POINTS, image_points, camera, None, flags=cv2.SOLVEPNP_EPNP)
+    if not ok:
+        _last_pose = _last_angles = None
+        return None
+
+    _last_pose = (rvec, tvec)
+    rotation, _ = cv2.Rodrigues(rvec)
+    pitch, yaw, roll = cv2.RQDecomp3x3(rotation)[0]
+    _last_angles = (-yaw, pitch, roll)
+    return _last_angles
+
+def last_head_pose():
+    return _last_angles
+
+def last_mouth_ratio():
+    return _last_mouth_ratio
+
+def _reset_head_pose():
+    global _last_pose, _last_angles, _last_mouth_ratio
+    _last_pose = _last_angles = _last_mouth_ratio = None
+
 def calculate_EAR(landmarks, eye_indices, frame_width, frame_height):
     # Convert normalized landmarks to pixel coordinates
     points = [(int(landmarks.landmark[i].x * frame_width), int(landmarks.landmark[i].y * frame_height)) for i in eye_indices]
@@ -40,18 +213,31 @@ def calculate_EAR(landmarks, eye_indices, frame_width, frame_height):
     EAR = (vertical_1 + vertical_2) / (2.0 * horizontal)
     return EAR
 
-def detect_gaze_deviation(frame, ear_threshold=0.25):
+def mouth_opening_ratio(landmarks, frame_width, frame_height):
+    # Inner lip gap (13-14) over mouth corner distance (61-291); about 0 when closed
+    def point(i):
+        return np.array([landmarks.landmark[i].x * frame_width, landmarks.landmark[i].y * frame_height])
+    width = np.linalg.norm(point(61) - point(291))
+    return float(np.linalg.norm(point(13) - point(14)) / width) if width > 0 else 0.0
+
+def measure_gaze(frame, ear_threshold=0.25, frame_rgb=None, roi_scale=None):
+    # Head-pose-corrected (horizontal, vertical, blink) iris ratios, None without a face
+    global _last_mouth_ratio
     if frame is None:
-        return False, None, True, False  # no_face=True
+        return None
 
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = FACE_MESH.process(frame_rgb)
+    # Callers holding a frame ring pass the RGB variant that was already computed for this frame
+    if frame_rgb is None:
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    results = _process_face_mesh(frame_rgb, roi_scale)
 
     if not results.multi_face_landmarks:
-        return False, None, True, False  # no_face=True
+        _reset_head_pose()
+        return None
 
     face_landmarks = results.multi_face_landmarks[0]
     h, w, _ = frame.shape
+    _last_mouth_ratio = mouth_opening_ratio(face_landmarks, w, h)
 
     # Indices for blink detection
     left_eye_indices = [33, 160, 158, 133, 153, 144]
@@ -83,12 +269,34 @@ def detect_gaze_deviation(frame, ear_threshold=0.25):
     # Average ratio
     avg_ratio = (left_ratio + right_ratio) / 2.0
 
+    # Iris height between the eyelids (0 = top, 1 = bottom)
+    left_vertical = (left_iris.y - face_landmarks.landmark[159].y) / max(face_landmarks.landmark[145].y - face_landmarks.landmark[159].y, 1e-6)
+    right_vertical = (right_iris.y - face_landmarks.landmark[386].y) / max(face_landmarks.landmark[374].y - face_landmarks.landmark[386].y, 1e-6)
+    vertical_ratio = (left_vertical + right_vertical) / 2.0
+
+    # Fuse head pose: a turned head moves the gaze even when the eyes stay centred,
+    # and eyes turned back towards the screen cancel a turned head
+    pose = estimate_head_pose(face_landmarks, w, h)
+    if pose is not None:
+        yaw, pitch, _ = pose
+        avg_ratio += yaw / HEAD_YAW_RANGE
+        vertical_ratio += pitch / HEAD_PITCH_RANGE
+
+    return avg_ratio, vertical_ratio, blink
+
+def detect_gaze_deviation(frame, ear_threshold=0.25, frame_rgb=None, roi_scale=None, thresholds=None):
+    gaze = measure_gaze(frame, ear_threshold, frame_rgb, roi_scale)
+    if gaze is None:
+        return False, None, True, False  # no_face=True
+    avg_ratio, vertical_ratio, blink = gaze
+    thresholds = thresholds or DEFAULT_GAZE_THRESHOLDS
+
     # Gaze direction thresholds
-    if avg_ratio < 0.35:
+    if avg_ratio < thresholds["left"]:
         direction = "Looking Left"
-    elif avg_ratio > 0.65:
+    elif avg_ratio > thresholds["right"]:
         direction = "Looking Right"
-    elif (left_iris.y + right_iris.y) / 2 > left_eye_outer.y + 0.02:
+    elif vertical_ratio > thresholds["down"]:
         direction = "Looking Down"
     else:
         direction = "Looking Center"
@@ -0,0 +1,182 @@
+import time
+import threading
+import numpy as np
+import cv2
+from multiprocessing import shared_memory
+
+
+# One captured frame inside the ring. Consumers get read-only views of the slot
+# and of derived variants (RGB, grayscale, downscaled) that are computed at most
+# once per frame into preallocated buffers, so passing a frame around never copies it.
+class RingFrame:
+    def __init__(self, ring, slot):
+        self.ring = ring
+        self.slot = slot
+        self.frame_id = int(ring.frame_ids[slot])
+        self.timestamp = float(ring.timestamps[slot])
+
+    @property
+    def shape(self):
+        return self.ring.shape
+
+    @property
+    def bgr(self):
+        return self.ring.view(self.slot)
+
+    @property
+    def rgb(self):
+        return self.ring.derived(self.slot, "rgb")
+
+    @property
+    def gray(self):
+        return self.ring.derived(self.slot, "gray")
+
+    @property
+    def small(self):
+        return self.ring.derived(self.slot, "small")
+
+    def is_current(self):
+        # False once the capture stage has reused the slot for a newer frame
+        return int(self.ring.frame_ids[self.slot]) == self.frame_id
+
+
+# Fixed number of preallocated frame slots living in one shared memory block,
+# followed by per-slot frame ids and capture timestamps. The owning process
+# captures straight into the slots, worker processes attach by name and read
+# the same bytes without any pickling of the arrays.
+class SharedFrameRing:
+    def __init__(self, slots, shape, dtype=np.uint8, name=None, small_scale=0.5):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.small_scale = small_scale
+
+        frames_bytes = self.slot_bytes * slots
+        meta_bytes = 16 * slots  # int64 frame id + float64 timestamp per slot
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=frames_bytes + meta_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self.frame_ids = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=frames_bytes)
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=self.shm.buf, offset=frames_bytes + 8 * slots)
+        if self.owner:
+            self.frame_ids[:] = -1
+            self.timestamps[:] = 0.0
+
+        # Process-local state: slot reservations and derived-variant buffers
+        self.refcounts = [0] * slots
+        self.lock = threading.Lock()
+        self.next_slot = 0
+        self.next_frame_id = 0
+        self.dropped_frames = 0
+        self.derived_buffers = {}  # (kind, slot) -> [frame_id, array]
+
+    def descriptor(self):
+        # Everything a worker needs to attach to this ring
+        return (self.shm.name, self.slots, self.shape, self.dtype.str, self.small_scale)
+
+    @classmethod
+    def attach(cls, descriptor):
+        name, slots, shape, dtype, small_scale = descriptor
+        return cls(slots, shape, dtype=dtype, name=name, small_scale=small_scale)
+
+    def acquire(self):
+        # Next free slot in ring order, reserved for the caller, or None if all are busy
+        with self.lock:
+            for i in range(self.slots):
+                slot = (self.next_slot + i) % self.slots
+                if self.refcounts[slot] == 0:
+                    self.refcounts[slot] = 1
+                    self.next_slot = (slot + 1) % self.slots
+                    return slot
+            self.dropped_frames += 1
+            return None
+
+    def retain(self, slot):
+        with self.lock:
+            self.refcounts[slot] += 1
+
+    def release(self, slot):
+        with self.lock:
+            self.refcounts[slot] = max(0, self.refcounts[slot] - 1)
+
+    def capture(self, cap):
+        # Reads the next camera frame directly into a free slot
+        slot = self.acquire()
+        if slot is None:
+            return None
+        target = self.frames[slot]
+        ret, frame = cap.read(target)
+        if not ret:
+            self.release(slot)
+            return None
+        if frame is not None and frame.ctypes.data != target.ctypes.data:
+            # The driver handed back its own buffer (different size), copy it in once
+            self.write_into(slot, frame)
+        return self.publish(slot)
+
+    def write(self, frame, timestamp=None):
+        # For sources that already produce arrays (video files, synthetic frames)
+        slot = self.acquire()
+        if slot is None:
+            return None
+        self.write_into(slot, frame)
+        return self.publish(slot, timestamp)
+
+    def write_into(self, slot, frame):
+        target = self.frames[slot]
+        if frame.shape == self.shape:
+            np.copyto(target, frame)
+        else:
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=target)
+
+    def publish(self, slot, timestamp=None):
+        with self.lock:
+            frame_id = self.next_frame_id
+            self.next_frame_id += 1
+        self.timestamps[slot] = time.monotonic() if timestamp is None else timestamp
+        self.frame_ids[slot] = frame_id
+        return RingFrame(self, slot)
+
+    def frame(self, slot):
+        return RingFrame(self, slot)
+
+    def view(self, slot):
+        view = self.frames[slot].view()
+        view.flags.writeable = False
+        return view
+
+    def derived(self, slot, kind):
+        frame_id = int(self.frame_ids[slot])
+        entry = self.derived_buffers.get((kind, slot))
+        if entry is not None and entry[0] == frame_id:
+            return entry[1]
+
+        src = self.frames[slot]
+        buffer = entry[1].base if entry is not None else None
+        if kind == "rgb":
+            buffer = cv2.cvtColor(src, cv2.COLOR_BGR2RGB, dst=buffer)
+        elif kind == "gray":
+            buffer = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=buffer)
+        elif kind == "small":
+            size = (int(self.shape[1] * self.small_scale), int(self.shape[0] * self.small_scale))
+            buffer = cv2.resize(src, size, dst=buffer, interpolation=cv2.INTER_AREA)
+        else:
+            raise ValueError(f"Unknown frame variant: {kind}")
+
+        view = buffer.view()
+        view.flags.writeable = False
+        self.derived_buffers[(kind, slot)] = [frame_id, view]
+        return view
+
+    def close(self):
+        self.frames = self.frame_ids = self.timestamps = None
+        self.derived_buffers.clear()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+
+from candidate_profile import load_profile, update_profile
+from face_recognition_utils import DEFAULT_GAZE_THRESHOLDS, measure_gaze
+
+# Where the candidate is asked to look; the corners bound the legitimate gaze range
+CALIBRATION_TARGETS = [
+    ("centre", "the centre of the screen"),
+    ("top_left", "the top-left corner of the screen"),
+    ("top_right", "the top-right corner of the screen"),
+    ("bottom_left", "the bottom-left corner of the screen"),
+    ("bottom_right", "the bottom-right corner of the screen"),
+]
+
+# Fitted thresholds are kept inside these bounds so a bad calibration cannot switch gaze checks off
+THRESHOLD_BOUNDS = {"left": (0.15, 0.45), "right": (0.55, 0.85), "down": (0.55, 0.9)}
+
+
+# Fits per-candidate gaze thresholds from a few seconds of looking at the
+# screen corners: everything seen while looking at the screen counts as on
+# screen, plus a margin.
+class GazeCalibrator:
+    def __init__(self, samples_per_target=10, margin=0.05, min_samples=5):
+        self.samples_per_target = samples_per_target
+        self.margin = margin
+        self.min_samples = min_samples
+        self.samples = {}
+
+    def add_sample(self, target, frame, frame_rgb=None):
+        gaze = measure_gaze(frame, frame_rgb=frame_rgb)
+        if gaze is None or gaze[2]:
+            return False  # no face or a blink
+        self.samples.setdefault(target, []).append(gaze[:2])
+        return True
+
+    def complete(self):
+        return all(len(self.samples.get(target, ())) >= self.min_samples for target, _ in CALIBRATION_TARGETS)
+
+    def fit(self):
+        if not self.complete():
+            return None
+        # Medians per target ignore the odd glance while the candidate finds the corner
+        medians = np.array([np.median(self.samples[target], axis=0) for target, _ in CALIBRATION_TARGETS])
+        fitted = {
+            "left": medians[:, 0].min() - self.margin,
+            "right": medians[:, 0].max() + self.margin,
+            "down": medians[:, 1].max() + self.margin,
+        }
+        return {key: round(float(np.clip(value, *THRESHOLD_BOUNDS[key])), 3) for key, value in fitted.items()}
+
+
+def run_calibration(cap, prompt, samples_per_target=10, settle=1.5, timeout=6.0):
+    # Walks the candidate through the targets; returns fitted thresholds or None
+    calibrator = GazeCalibrator(samples_per_target)
+    for target, description in CALIBRATION_TARGETS:
+        prompt(f"Look at {description}")
+        time.sleep(settle)
+        deadline = time.monotonic() + timeout
+        collected = 0
+        while collected < samples_per_target and time.monotonic() < deadline:
+            ret, frame = cap.read()
+            if ret and calibrator.add_sample(target, frame):
+                collected += 1
+    return calibrator.fit()
+
+
+def candidate_gaze_thresholds(reference_image_path, cap, prompt):
+    # Thresholds stored with the candidate's reference encoding, calibrating only on first use.
+    # Returns (thresholds, calibrated_now)
+    stored = load_profile(reference_image_path).get("gaze_thresholds")
+    if stored:
+        return stored, False
+    thresholds = run_calibration(cap, prompt)
+    if thresholds is None:
+        return dict(DEFAULT_GAZE_THRESHOLDS), False
+    update_profile(reference_image_path, gaze_thresholds=thresholds, gaze_calibrated_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    return thresholds, True
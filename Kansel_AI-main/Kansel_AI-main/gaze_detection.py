@@ -2,7 +2,9 @@ import cv2
 import mediapipe as mp
 
 class GazeDetector:
-    def __init__(self):
+    def __init__(self, thresholds=None):
+        # Per-candidate limits from gaze_calibration; vertical limits mirror the horizontal ones
+        self.thresholds = thresholds or {"left": 0.35, "right": 0.65, "down": 0.65}
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             max_num_faces=1,
@@ -64,13 +66,13 @@ class GazeDetector:
         vertical_ratio = (left_eye_vertical + right_eye_vertical) / 2
 
         # Determine direction
-        if horizontal_ratio < 0.35:
+        if horizontal_ratio < self.thresholds["left"]:
             return "LOOKING_LEFT"
-        elif horizontal_ratio > 0.65:
+        elif horizontal_ratio > self.thresholds["right"]:
             return "LOOKING_RIGHT"
-        elif vertical_ratio < 0.35:
+        elif vertical_ratio < 1.0 - self.thresholds["down"]:
             return "LOOKING_UP"
-        elif vertical_ratio > 0.65:
+        elif vertical_ratio > self.thresholds["down"]:
             return "LOOKING_DOWN"
         else:
             return "LOOKING_FORWARD"
@@ -3,10 +3,12 @@ from PyQt5.QtWidgets import (
     QHBoxLayout, QVBoxLayout, QStackedLayout, QMessageBox, QFileDialog
 )
 from PyQt5.QtGui import QFont, QPixmap
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import sys
 import random
-from email_alert import send_otp_email, generate_otp  # ✅ ADDED
+from email_alert import send_otp_email  # ✅ ADDED
+import otp_manager
+from otp_manager import OTPManager
 
 class LogoWidget(QWidget):
     def __init__(self, parent=None):
@@ -182,10 +184,30 @@ class CandidatePage(QWidget):
             return
         self.verify_and_continue(name, self.photo_path)  # ✅ Hooked for actual backend verification
 
+class OTPSender(QThread):
+    # Sends the code off the GUI thread; the SMTP handshake can take seconds
+    sent = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, email, code, valid_minutes):
+        super().__init__()
+        self.email = email
+        self.code = code
+        self.valid_minutes = valid_minutes
+
+    def run(self):
+        try:
+            send_otp_email(self.email, self.code, self.valid_minutes)
+            self.sent.emit(self.email)
+        except Exception as e:
+            self.failed.emit(self.email, str(e))
+
+
 class TwoFAPage(QWidget):
     def __init__(self, navigate_back):
         super().__init__()
-        self.verification_code = None
+        self.otp = OTPManager()
+        self.sender_thread = None
         self.navigate_back = navigate_back
         layout = QVBoxLayout()
         layout.setSpacing(20)
@@ -196,12 +218,14 @@ class TwoFAPage(QWidget):
         self.email_input = self.create_input("Enter your email")
         self.code_input = self.create_input("Enter verification code")
 
-        send_button = self.create_button("Send Verification Code", self.send_code)
+        self.send_button = send_button = self.create_button("Send Verification Code", self.send_code)
+        self.status_label = self.sub_label("")
         verify_button = self.create_button("Verify Code", self.verify_code)
         back_button = self.create_button("Back", navigate_back, text_link=True)
 
         layout.addWidget(self.email_input)
         layout.addWidget(send_button)
+        layout.addWidget(self.status_label)
         layout.addWidget(self.code_input)
         layout.addWidget(verify_button)
         layout.addWidget(back_button)
@@ -274,16 +298,40 @@ class TwoFAPage(QWidget):
         if not email or "@" not in email:
             QMessageBox.warning(self, "Invalid Email", "Please enter a valid email address.")
             return
-        self.verification_code = generate_otp()
-        send_otp_email(email, self.verification_code)
-        QMessageBox.information(self, "Code Sent", f"A verification code was sent to {email}.")
+        if self.sender_thread and self.sender_thread.isRunning():
+            return
+        code = self.otp.issue(email)
+        self.send_button.setEnabled(False)
+        self.status_label.setText(f"Sending a code to {email}...")
+        self.sender_thread = OTPSender(email, code, self.otp.ttl / 60)
+        self.sender_thread.sent.connect(self.code_sent)
+        self.sender_thread.failed.connect(self.code_failed)
+        self.sender_thread.start()
+
+    def code_sent(self, email):
+        self.send_button.setEnabled(True)
+        self.status_label.setText(f"A verification code was sent to {email}.")
+
+    def code_failed(self, email, error):
+        self.otp.revoke(email)
+        self.send_button.setEnabled(True)
+        self.status_label.setText("")
+        QMessageBox.warning(self, "Sending Failed", f"The code could not be sent to {email}: {error}")
 
     def verify_code(self):
-        if self.code_input.text().strip() == self.verification_code:
+        email = self.email_input.text().strip()
+        result = self.otp.verify(email, self.code_input.text())
+        if result == otp_manager.OK:
             QMessageBox.information(self, "Verified", "Email verified successfully.")
             self.navigate_back()
+        elif result == otp_manager.WRONG:
+            QMessageBox.warning(self, "Error",
+                                f"Incorrect verification code. Attempts left: {self.otp.attempts_left(email)}")
+        elif result == otp_manager.MISSING:
+            QMessageBox.warning(self, "Error", "Send a verification code to this address first.")
         else:
-            QMessageBox.warning(self, "Error", "Incorrect verification code.")
+            reason = "has expired" if result == otp_manager.EXPIRED else "was entered wrongly too many times"
+            QMessageBox.warning(self, "Error", f"The verification code {reason}. Please send a new one.")
 
 
 
@@ -1,16 +1,36 @@
+import functools
+import os
 import sys
 import time
 import cv2
-from PyQt5.QtWidgets import QApplication, QMessageBox, QLabel, QPushButton  
+from PyQt5.QtWidgets import QApplication, QMessageBox, QLabel, QPushButton, QCheckBox
 from PyQt5.QtCore import QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QFont
 from kansel_ui import KanselMainWindow
 from yolo_detector import YOLODetector
-from face_recognition_utils import verify_identity, detect_gaze_deviation
+from detector_pool import DetectorPool, analyse_frame, consume_analysis
+from frame_ring import SharedFrameRing
+from face_recognition_utils import verify_identity, detect_gaze_deviation, duplicate_identities, face_index
+from face_index import describe_matches
 from voice_activity_detector import VoiceActivityDetector
 from browser_logger import BrowserLogger
 from light_noise_analysis import LightNoiseAnalyzer
 from report_generator import ReportGenerator
+from event_journal import EventJournal, session_journal_path
+from perf_monitor import PerfMonitor
+from camera_capture import CameraCapture
+from rules_engine import RulesEngine, record_hits
+from detection_confirmer import DetectionConfirmer, region_confirms
+from object_tracker import ObjectTracker
+from gaze_calibration import candidate_gaze_thresholds
+from secondary_faces import SecondaryFaceFilter
+from speaker_attribution import SpeakerAttributor
+from clip_buffer import EvidenceClipBuffer, capture_clip_tail
+from session_checkpoint import SessionCheckpoint, checkpoint_path, load_checkpoint
+from candidate_profile import profile_path
+from auto_tuner import HardwareCalibrator, RuntimeAdjuster, DEFAULT_PROFILE, YOLO_MODELS
+from power_monitor import PowerMonitor, power_saving_profile
+from analytics_store import AnalyticsStore, perf_metrics, DEFAULT_DB_PATH
 from email_alert import send_malpractice_email, send_otp_email, generate_otp
 
 
@@ -19,103 +39,385 @@ class ProctoringSession(QThread):
     session_ended = pyqtSignal(str)
     frame_ready = pyqtSignal(QPixmap)
 
-    def __init__(self, candidate_name, candidate_email, reference_image_path):
+    # Slots for the frame being captured plus the one being shown and analysed
+    RING_SPARE_SLOTS = 3
+    STATUS_ICONS = {"critical": "❌", "warning": "⚠️", "info": "ℹ️"}
+    # YOLO input size for re-checking a suspicious region before acting on it
+    RECHECK_INPUT_SIZE = 608
+    # Multi-face scan for a second person: every n-th frame, up to this many faces (0 disables)
+    FACE_SCAN_INTERVAL = 10
+    FACE_SCAN_MAX_FACES = 3
+    # Loop rate in power-saving mode, and how much sparser the face scan gets
+    POWER_SAVING_FPS = 5.0
+    POWER_SAVING_FACE_SCAN_FACTOR = 3
+
+    def __init__(self, candidate_name, candidate_email, reference_image_path, use_process_pool=False, pool_processes=None,
+                 perf_monitor=None, tuning=None, calibration=None, camera=None, rules=None, resume=None,
+                 power_source=None):
         super().__init__()
         self.candidate_name = candidate_name
         self.candidate_email = candidate_email
         self.reference_image_path = reference_image_path
+        self.use_process_pool = use_process_pool
+        self.pool_processes = pool_processes
+        self.perf = perf_monitor or PerfMonitor()
+        self.show_overlay = False
+        self.tuning = tuning or DEFAULT_PROFILE
+        self.calibration = calibration  # micro-benchmark figures behind the chosen profile
+        self.camera = camera  # already-open CameraCapture shared with the app, if any
+        self.rules = rules or RulesEngine()
+        self.confirmer = DetectionConfirmer()
+        self.detect_region = None  # (ring_frame, box) -> detections, set once the detector is up
+        self.tracker = ObjectTracker(on_retire=self.record_track)
+        self.face_filter = SecondaryFaceFilter()
+        self.speaker = SpeakerAttributor()
+        self.journal = None
+        self.report = None
+        self.malpractice_details = []
+        self.malpractice_evidence_images = []
+        self.resume = resume  # checkpoint state of an interrupted session to continue
+        self.power_source = power_source  # battery/thermal readings, /sys when None
         self.session_active = True
 
     def run(self):
+        pool = None
+        ring = None
+        store = None
         try:
-            cap = cv2.VideoCapture(0)
+            profile = self.tuning
+            # On battery (or already hot) the session also starts at a lower camera resolution
+            power = PowerMonitor(self.power_source)
+            power_message = None
+            if power.observe():
+                profile = power_saving_profile(profile, capture=True)
+                power_message = f"Power saving mode from the start ({power.last_reason})"
+            if self.camera is not None:
+                cap = self.camera
+                cap.set_resolution(profile.capture_width, profile.capture_height)
+            else:
+                cap = CameraCapture(width=profile.capture_width, height=profile.capture_height)
+                cap.open()
+            # A resumed session is verified again too: whoever sits at the camera now may not be the candidate.
+            # The reference encoding is cached, so this only costs the live frame's encoding.
+            resume = self.resume
             ret, live_frame = cap.read()
             if not ret or not verify_identity(self.reference_image_path, live_frame):
                 self.status_updated.emit("❌ Identity verification failed. Ending exam.")
-                cap.release()
+                if cap is not self.camera:
+                    cap.release()
                 self.session_ended.emit("Verification failed.")
                 return
 
-            self.status_updated.emit("✅ Identity verified. Starting proctoring...")
-            yolo = YOLODetector()
+            duplicates = []
+            if resume:
+                self.status_updated.emit("✅ Resuming interrupted session.")
+                gaze_thresholds, calibrated = resume["gaze_thresholds"], False
+            else:
+                self.status_updated.emit("✅ Identity verified.")
+                # The same face registered under another name in an earlier sitting
+                duplicates = duplicate_identities(self.reference_image_path, self.candidate_name)
+                if duplicates:
+                    self.status_updated.emit(f"⚠️ Face matches earlier candidate(s): {describe_matches(duplicates)}")
+                # Calibrates only the first time this reference photo is used
+                gaze_thresholds, calibrated = candidate_gaze_thresholds(
+                    self.reference_image_path, cap, lambda text: self.status_updated.emit(f"👀 {text}"))
+            self.status_updated.emit("✅ Starting proctoring...")
+            if self.use_process_pool:
+                # Detectors live in the worker processes, the GUI process only captures
+                processes = self.pool_processes or max(1, (os.cpu_count() or 2) - 1)
+                ring = SharedFrameRing(self.RING_SPARE_SLOTS + 2 * processes, live_frame.shape)
+                pool = DetectorPool(ring, processes=processes, max_pending=2 * processes,
+                                    yolo_paths=YOLO_MODELS[profile.yolo_model], gaze_thresholds=gaze_thresholds)
+                yolo = None
+                self.detect_region = lambda ring_frame, box: pool.detect_region(ring_frame, box, self.RECHECK_INPUT_SIZE)
+            else:
+                ring = SharedFrameRing(self.RING_SPARE_SLOTS, live_frame.shape)
+                yolo = YOLODetector(*YOLO_MODELS[profile.yolo_model], input_size=profile.yolo_input_size)
+                self.detect_region = lambda ring_frame, box: yolo.detect_region(ring_frame.bgr, box, self.RECHECK_INPUT_SIZE)
+            del live_frame
             voice_detector = VoiceActivityDetector()
             light_noise = LightNoiseAnalyzer()
-            report = ReportGenerator(self.candidate_name)
-            malpractice_details = []
-            malpractice_evidence_images = []
+            if resume:
+                journal = EventJournal(resume["journal_path"], resume["journal_offset"], resume["journal_seq"])
+            else:
+                journal = EventJournal(session_journal_path(self.candidate_name))
+            self.journal = journal
+            # Every journal entry is mirrored into the cohort-wide analytics database
+            store = AnalyticsStore(os.environ.get("KANSEL_ANALYTICS_DB", DEFAULT_DB_PATH)).start()
+            store.start_session(journal.session_id, self.candidate_name, self.candidate_email)
+            journal.listener = store.journal_listener(journal.session_id, self.candidate_name)
+            clips = EvidenceClipBuffer()
+            activity = BrowserLogger(journal=journal).start()
+            self.report = report = ReportGenerator(self.candidate_name, journal=journal, clips=clips)
+            elapsed_before = 0.0
+            if resume:
+                report.restore(resume["report"])
+                self.malpractice_details = list(resume["malpractice_details"])
+                self.malpractice_evidence_images = list(resume["malpractice_evidence_images"])
+                self.tracker.next_id = resume["tracker_next_id"]
+                elapsed_before = resume["elapsed"]
+                report.add_system_event(time.strftime("%Y-%m-%d %H:%M:%S"),
+                                        f"Session resumed after {elapsed_before:.0f}s of exam time, identity re-verified")
+            report.set_session_info("Performance profile", profile.describe())
+            if power_message:
+                report.add_system_event(time.strftime("%Y-%m-%d %H:%M:%S"), power_message)
+            if self.calibration:
+                report.set_session_info("Calibration (ms per frame)", self.calibration)
+            report.set_session_info("Gaze thresholds" + (" (calibrated this session)" if calibrated else ""),
+                                    gaze_thresholds)
+            if duplicates:
+                report.add_system_event(time.strftime("%Y-%m-%d %H:%M:%S"),
+                                        f"Face matches earlier candidate(s): {describe_matches(duplicates)}")
+
+            checkpoint = SessionCheckpoint(checkpoint_path(self.candidate_name))
+            started = time.monotonic()
 
+            perf = self.perf
+            # Frames the loop asked for and lost are drops; grabs it never asked for are only skips
+            cap.on_drop = functools.partial(perf.count_drop, "capture")
+            cap.on_skip = functools.partial(perf.count_skip, "capture")
+            clips.on_drop = functools.partial(perf.count_drop, "clip_buffer")
+            # The adjuster works from the full configuration; power saving is layered on top of it
+            adjuster = RuntimeAdjuster(self.tuning.copy(capture_width=profile.capture_width,
+                                                        capture_height=profile.capture_height))
+            # The power-saving loop is capped, so the adjuster must not read that as the machine falling behind
+            normal_fps = adjuster.target_fps
+            if power.saving:
+                adjuster.retarget(self.POWER_SAVING_FPS)
+            frame_index = 0
+            terminated = False
             while self.session_active:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+                loop_started = time.perf_counter()
+                run_yolo = frame_index % profile.detection_interval == 0
+                face_scan_interval = self.FACE_SCAN_INTERVAL * (self.POWER_SAVING_FACE_SCAN_FACTOR if power.saving else 1)
+                max_faces = self.FACE_SCAN_MAX_FACES if face_scan_interval and frame_index % face_scan_interval == 0 else 0
+                frame_index += 1
 
-                # Emit current frame to UI
-                self.send_frame_to_ui(frame)
-
-                # Malpractice detection
-                malpractice_objects = yolo.detect_malpractice_objects(frame)
-                if malpractice_objects:
-                    for obj in malpractice_objects:
-                        msg = f"Malpractice Object Detected: {obj['label']}"
-                        report.add_event(msg, frame)
-                        malpractice_details.append(msg)
-                        malpractice_evidence_images.append(f"report_images/event_{len(report.events)}.jpg")
-                    self.status_updated.emit("❌ Malpractice detected. Terminating exam.")
-                    self.session_active = False
+                # The pool never holds more than max_pending slots, so one is always free here
+                with perf.stage("capture"):
+                    ring_frame = ring.capture(cap)
+                if ring_frame is None:
                     break
+                perf.record("capture_latency", cap.last_latency)
+                with perf.stage("clip_buffer"):
+                    clips.push(ring_frame.bgr, ring_frame.timestamp)
 
-                if yolo.detect_multiple_persons(frame):
-                    msg = "Multiple persons detected"
-                    report.add_event(msg, frame)
-                    malpractice_details.append(msg)
-                    malpractice_evidence_images.append(f"report_images/event_{len(report.events)}.jpg")
-                    self.status_updated.emit("❌ Malpractice detected. Terminating exam.")
-                    self.session_active = False
-                    break
+                try:
+                    # Emit current frame to UI; the preview is paused while saving power
+                    if not power.saving:
+                        with perf.stage("preview"):
+                            self.send_frame_to_ui(ring_frame)
+
+                    # Object and gaze detection, in process or on the worker pool
+                    if pool:
+                        if not pool.submit(ring_frame, run_yolo, profile.yolo_input_size, profile.face_roi_scale, max_faces):
+                            perf.count_drop("analysis")
+                        signals = self.handle_pool_results(pool)
+                    else:
+                        result = analyse_frame(ring_frame, yolo if run_yolo else None,
+                                               yolo_input_size=profile.yolo_input_size, roi_scale=profile.face_roi_scale,
+                                               gaze_thresholds=gaze_thresholds, max_faces=max_faces)
+                        signals = self.handle_analysis(ring_frame, result)
+
+                    # Voice and lighting/noise
+                    with perf.stage("voice"):
+                        voice_detected = voice_detector.is_voice_detected()
+                    with perf.stage("lighting"):
+                        light, noise = light_noise.analyze(ring_frame.bgr)
+                    with perf.stage("speaker_attribution"):
+                        speech_source = self.speaker.classify(voice_detector, time.monotonic())
+                    signals.update(activity.status())
+                    signals.update({
+                        "voice": voice_detected,
+                        "voice_active": voice_detector.is_speaking,
+                        "speech_source": speech_source,
+                        "light": light,
+                        "noise": noise,
+                    })
+
+                    # All of the tick's signals go through the rules at once, so each rule is evaluated once per frame
+                    terminate = self.apply_rules(signals, ring_frame)
+
+                    if terminate:
+                        self.status_updated.emit("❌ Malpractice detected. Terminating exam.")
+                        self.session_active = False
+                        terminated = True
+                        break
+                finally:
+                    ring.release(ring_frame.slot)
+                perf.record("loop", time.perf_counter() - loop_started)
+
+                # Step the detector cadence down when the machine throttles, back up when it recovers
+                adjusted = adjuster.observe()
+                if adjusted:
+                    profile = power_saving_profile(adjusted) if power.saving else adjusted
+                    message = f"Performance profile changed to {profile.describe()} ({adjuster.last_reading})"
+                    report.add_system_event(time.strftime("%Y-%m-%d %H:%M:%S"), message)
 
-                # Gaze
-                gaze_deviated, direction, no_face, blink = detect_gaze_deviation(frame)
-                if no_face:
-                    self.status_updated.emit("⚠️ No face detected.")
-                elif gaze_deviated:
-                    report.add_gaze_event(time.strftime("%Y-%m-%d %H:%M:%S"), direction)
-                    self.status_updated.emit(f"👀 Gaze Deviation: {direction}")
-
-                # Voice
-                if voice_detector.is_voice_detected():
-                    report.add_voice_event(time.strftime("%Y-%m-%d %H:%M:%S"))
-                    self.status_updated.emit("🎤 Voice Detected!")
-
-                # Lighting/Noise
-                light, noise = light_noise.analyze(frame)
-                if light < 50:
-                    self.status_updated.emit("⚠️ Low lighting.")
-                if noise > 95:
-                    self.status_updated.emit("⚠️ High noise level.")
-
-            cap.release()
+                # Battery, temperature and clock speed switch the power-saving configuration on and off
+                mode = power.observe()
+                if mode:
+                    adjuster.retarget(self.POWER_SAVING_FPS if power.saving else normal_fps)
+                    profile = power_saving_profile(adjuster.profile) if power.saving else adjuster.profile
+                    message = (f"Power saving mode {'on' if power.saving else 'off'} ({power.last_reason}), "
+                               f"profile {profile.describe()}")
+                    report.add_system_event(time.strftime("%Y-%m-%d %H:%M:%S"), message)
+                    self.status_updated.emit(f"🔋 {message}")
+                if power.saving:
+                    # Fewer frames per second is the biggest saving of all
+                    spare = 1.0 / self.POWER_SAVING_FPS - (time.perf_counter() - loop_started)
+                    if spare > 0:
+                        time.sleep(spare)
+
+                if checkpoint.due():
+                    with perf.stage("checkpoint"):
+                        checkpoint.save(self.checkpoint_state(gaze_thresholds, elapsed_before + time.monotonic() - started))
+
+            # The last event's clip gets its post-event seconds before the camera is let go
+            capture_clip_tail(clips, ring, cap)
+            if cap is not self.camera:
+                cap.release()
             voice_detector.close()
+            self.tracker.close()
+            activity.close()
+            report.set_session_info("Window switches", activity.window_switches)
+            clips.close()
+            journal.close()
 
-            report_path = report.generate_report()
+            with self.perf.stage("report_write"):
+                report_path = report.generate_report()
+            store.record_metrics(journal.session_id, perf_metrics(self.perf.snapshot()))
+            store.end_session(journal.session_id, "terminated" if terminated else "completed", report_path)
             send_malpractice_email(
                 self.candidate_name,
                 report_path,
-                "\n".join(malpractice_details) or "No major violations.",
-                malpractice_evidence_images
+                "\n".join(self.malpractice_details) or "No major violations.",
+                self.malpractice_evidence_images
             )
+            checkpoint.clear()
             self.status_updated.emit("✅ Session ended. Report emailed.")
             self.session_ended.emit("Malpractice detected. Exam ended.")
 
         except Exception as e:
             self.status_updated.emit(f"❌ Error occurred: {str(e)}")
             self.session_ended.emit("Error")
+        finally:
+            if pool:
+                pool.close()
+            if ring:
+                ring.close()
+            if store:
+                store.close()
+
+    def checkpoint_state(self, gaze_thresholds, elapsed):
+        # Rule, tracker and VAD timings are on this process's monotonic clock and start afresh on resume
+        journal_offset, journal_seq = self.journal.position()
+        return {
+            "candidate_name": self.candidate_name,
+            "reference_profile": os.path.basename(profile_path(self.reference_image_path)),
+            "elapsed": round(elapsed, 1),
+            "journal_path": self.journal.path,
+            "journal_offset": journal_offset,
+            "journal_seq": journal_seq,
+            "gaze_thresholds": gaze_thresholds,
+            "report": self.report.state(),
+            "malpractice_details": self.malpractice_details,
+            "malpractice_evidence_images": self.malpractice_evidence_images,
+            "tracker_next_id": self.tracker.next_id,
+        }
+
+    def handle_pool_results(self, pool, timeout=None):
+        # Signals of every result that came back, oldest first, so later frames win
+        signals = {}
+        for ring_frame, result in pool.poll(timeout):
+            try:
+                signals.update(self.handle_analysis(ring_frame, result))
+            finally:
+                pool.release(ring_frame)
+        return signals
+
+    def handle_analysis(self, ring_frame, result):
+        # Returns the rule signals of one analysed frame
+        if "error" in result:
+            raise result["error"]
+        return consume_analysis(result, ring_frame.timestamp, self.perf, self.tracker, self.speaker,
+                                self.face_filter, self.confirmer, self.region_recheck(ring_frame))
+
+    def record_track(self, track):
+        # One journal entry per object that has left the view, instead of one per frame
+        if self.journal:
+            self.journal.record("track", f"{track.label} #{track.track_id} in view for {track.dwell:.1f}s",
+                                track_id=track.track_id, label=track.label, dwell=round(track.dwell, 2),
+                                detections=track.hits)
+
+    def region_recheck(self, ring_frame):
+        if self.detect_region is None:
+            return None
+
+        def recheck(label, box):
+            with self.perf.stage("region_recheck"):
+                return region_confirms(self.detect_region(ring_frame, box), label, box)
+        return recheck
+
+    def apply_rules(self, signals, ring_frame):
+        hits = self.rules.update(signals, time.monotonic())
+        if not hits:
+            return False
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self.perf.stage("report_write"):
+            terminate = record_hits(hits, self.report, ring_frame.bgr, timestamp,
+                                    self.malpractice_details, self.malpractice_evidence_images)
+        for hit in hits:
+            self.status_updated.emit(f"{self.STATUS_ICONS.get(hit.severity, '')} {hit.message}")
+        return terminate
 
-    def send_frame_to_ui(self, frame):
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def send_frame_to_ui(self, ring_frame):
+        rgb_image = ring_frame.rgb
         h, w, ch = rgb_image.shape
         bytes_per_line = ch * w
         qt_img = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        self.frame_ready.emit(QPixmap.fromImage(qt_img))
+        pixmap = QPixmap.fromImage(qt_img)
+        if self.show_overlay:
+            self.draw_perf_overlay(pixmap)
+        self.frame_ready.emit(pixmap)
+
+    def draw_perf_overlay(self, pixmap):
+        # Painted on the pixmap copy, the shared frame slot stays untouched
+        painter = QPainter(pixmap)
+        painter.setFont(QFont("Consolas", 9))
+        lines = self.perf.overlay_lines()
+        painter.fillRect(0, 0, 330, 16 * len(lines) + 8, QColor(0, 0, 0, 150))
+        painter.setPen(QColor(0, 255, 0))
+        for i, line in enumerate(lines):
+            painter.drawText(6, 16 * (i + 1), line)
+        painter.setPen(QColor(255, 200, 0))
+        for track in self.tracker.confirmed():
+            x, y, w, h = track.box
+            painter.drawRect(x, y, w, h)
+            painter.drawText(x + 2, y + 12, f"{track.label} #{track.track_id} {track.dwell:.0f}s")
+        painter.end()
+
+
+class CalibrationThread(QThread):
+    def __init__(self, sample_frame):
+        super().__init__()
+        self.sample_frame = sample_frame
+        self.profile = DEFAULT_PROFILE
+        self.measurements = None
+
+    def run(self):
+        calibrator = HardwareCalibrator()
+        try:
+            self.profile = calibrator.calibrate(self.sample_frame)
+            self.measurements = calibrator.measurements
+        except Exception as e:
+            print("[Calibration]: failed, using default profile:", e)
+        print("[Calibration]:", self.profile.describe())
+        # Warm-up for the session start, still while the candidate completes 2FA
+        try:
+            face_index()
+        except Exception as e:
+            print("[Calibration]: face index could not be opened:", e)
 
 
 class App(KanselMainWindow):
@@ -125,6 +427,14 @@ class App(KanselMainWindow):
         self.reference_image_path = ""
         self.candidate_email = ""
         self.proctor_thread = None
+        self.use_process_pool = os.environ.get("KANSEL_PROCESS_POOL") == "1"
+        self.metrics_file = os.environ.get("KANSEL_METRICS_FILE")
+        self.metrics_port = os.environ.get("KANSEL_METRICS_PORT")
+        self.rules_file = os.environ.get("KANSEL_RULES_FILE")
+        self.perf_monitor = None
+        self.calibration_thread = None
+        self.session_pending = False  # exam page shown, session waiting for calibration to finish
+        self.camera = None  # opened once at verification and reused by the exam session
 
         # override the button behavior
         self.candidate_page.verify_and_continue = self.verify_and_continue
@@ -134,8 +444,11 @@ class App(KanselMainWindow):
         self.status_label = QLabel("Monitoring...")
         self.status_label.setStyleSheet("color: green; font-size: 14px;")
         self.video_label = QLabel()
+        self.overlay_checkbox = QCheckBox("Show performance overlay")
+        self.overlay_checkbox.toggled.connect(self.toggle_overlay)
         self.exam_page.layout().insertWidget(0, self.status_label)
         self.exam_page.layout().insertWidget(1, self.video_label)
+        self.exam_page.layout().insertWidget(2, self.overlay_checkbox)
         self.end_exam_button.clicked.connect(self.end_exam)
 
 
@@ -143,26 +456,70 @@ class App(KanselMainWindow):
     def verify_and_continue(self, name, photo_path):
         self.candidate_name = name
         self.reference_image_path = photo_path
-        cap = cv2.VideoCapture(0)
-        ret, frame = cap.read()
-        cap.release()
+        if self.camera is None:
+            self.camera = CameraCapture()
+        if not self.camera.open():
+            QMessageBox.critical(self, "Camera Error", "Could not open the webcam.")
+            return
+        ret, frame = self.camera.read()
         if not ret or not verify_identity(photo_path, frame):
             QMessageBox.critical(self, "Verification Failed", "Face did not match the reference image.")
             return
         QMessageBox.information(self, "Identity Verified", "Face verified successfully.")
+        self.start_calibration(frame)
         self.show_2fa_page()
 
+    def start_calibration(self, sample_frame):
+        # Benchmarks this machine while the candidate completes 2FA
+        self.calibration_thread = CalibrationThread(sample_frame)
+        self.calibration_thread.finished.connect(self.calibration_finished)
+        self.calibration_thread.start()
+
+    def calibration_finished(self):
+        if self.session_pending:
+            self.session_pending = False
+            self.start_session()
+
     def show_exam_page(self):
         self.candidate_email = self.two_fa_page.email_input.text().strip()
         self.start_proctoring()
         super().show_exam_page()
 
     def start_proctoring(self):
+        # Calibration usually finishes long before 2FA does. The detectors must not be shared
+        # with it, so otherwise the session starts from its finished signal instead of blocking the GUI.
+        if self.calibration_thread and not self.calibration_thread.isFinished():
+            self.session_pending = True
+            self.update_status("⏳ Finishing hardware calibration...")
+            return
+        self.start_session()
+
+    def start_session(self):
+        tuning, calibration = None, None
+        if self.calibration_thread:
+            tuning, calibration = self.calibration_thread.profile, self.calibration_thread.measurements
+        self.perf_monitor = PerfMonitor()
+        if self.metrics_file:
+            self.perf_monitor.start_metrics_file(self.metrics_file)
+        if self.metrics_port:
+            try:
+                self.perf_monitor.start_http_server(int(self.metrics_port))
+            except OSError as e:
+                # A busy port costs the metrics endpoint, not the exam
+                print(f"[Metrics]: port {self.metrics_port} unavailable, endpoint disabled:", e)
         self.proctor_thread = ProctoringSession(
             self.candidate_name,
             self.candidate_email,
-            self.reference_image_path
+            self.reference_image_path,
+            use_process_pool=self.use_process_pool,
+            perf_monitor=self.perf_monitor,
+            tuning=tuning,
+            calibration=calibration,
+            camera=self.camera,
+            rules=RulesEngine.from_file(self.rules_file) if self.rules_file else None,
+            resume=load_checkpoint(self.candidate_name, self.reference_image_path)
         )
+        self.proctor_thread.show_overlay = self.overlay_checkbox.isChecked()
         self.proctor_thread.status_updated.connect(self.update_status)
         self.proctor_thread.session_ended.connect(self.finish_proctoring)
         self.proctor_thread.frame_ready.connect(self.video_label.setPixmap)
@@ -172,12 +529,34 @@ class App(KanselMainWindow):
         print("[Status]:", msg)
         self.status_label.setText(msg)
 
+    def toggle_overlay(self, checked):
+        if self.proctor_thread:
+            self.proctor_thread.show_overlay = checked
+
     def finish_proctoring(self, result):
+        if self.perf_monitor:
+            self.perf_monitor.close(self.metrics_file)
+            self.perf_monitor = None
+        if self.camera:
+            self.camera.release()
+            self.camera = None
         QMessageBox.information(self, "Session Complete", f"{result}")
         self.show_home_page()
 
+    def closeEvent(self, event):
+        if self.proctor_thread and self.proctor_thread.isRunning():
+            self.proctor_thread.session_active = False
+            self.proctor_thread.wait(5000)
+        if self.camera:
+            self.camera.release()
+        super().closeEvent(event)
+
     def end_exam(self):
-        if self.proctor_thread:
+        if self.session_pending:
+            # Ended while calibration was still finishing, before anything started
+            self.session_pending = False
+            self.finish_proctoring("Exam ended before proctoring started.")
+        elif self.proctor_thread:
             self.proctor_thread.session_active = False
             self.status_label.setText("Ending session...")
 
@@ -0,0 +1,149 @@
+import numpy as np
+
+from detection_confirmer import box_iou
+
+TRACKED_LABELS = ("person", "cell phone", "book")
+
+# Constant-velocity model over [cx, cy, area, aspect, vcx, vcy, varea], one step per processed frame
+_F = np.eye(7)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_H = np.eye(4, 7)
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+
+
+def _to_state(box):
+    x, y, w, h = box
+    return np.array([x + w / 2.0, y + h / 2.0, float(w * h), w / float(max(h, 1))])
+
+
+def _to_box(state):
+    cx, cy, area, aspect = state[:4]
+    area = max(float(area), 1.0)
+    w = np.sqrt(area * max(float(aspect), 1e-3))
+    h = area / w
+    return [int(cx - w / 2), int(cy - h / 2), int(w), int(h)]
+
+
+class Track:
+    def __init__(self, track_id, detection, now):
+        self.track_id = track_id
+        self.label = detection["label"]
+        self.confidence = detection["confidence"]
+        self.x = np.zeros(7)
+        self.x[:4] = _to_state(detection["box"])
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.misses = 0  # detector runs since the last match
+
+    @property
+    def box(self):
+        return _to_box(self.x)
+
+    @property
+    def dwell(self):
+        return self.last_seen - self.first_seen
+
+    def predict(self):
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = _F @ self.x
+        self.P = _F @ self.P @ _F.T + _Q
+
+    def correct(self, detection, now):
+        z = _to_state(detection["box"])
+        S = _H @ self.P @ _H.T + _R
+        K = self.P @ _H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - _H @ self.x)
+        self.P = (np.eye(7) - K @ _H) @ self.P
+        self.confidence = detection["confidence"]
+        self.last_seen = now
+        self.hits += 1
+        self.misses = 0
+
+    def as_dict(self):
+        return {
+            "track_id": self.track_id,
+            "label": self.label,
+            "box": self.box,
+            "confidence": self.confidence,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "dwell": round(self.dwell, 2),
+        }
+
+
+# SORT-style tracker: a Kalman filter per object and greedy IoU association
+# between predicted track boxes and fresh YOLO detections of the same label.
+# Call update() on frames where YOLO ran and predict() on frames where it was
+# skipped, so boxes keep moving between detector runs. Tracks that miss
+# max_misses detector runs in a row are retired and handed to on_retire.
+class ObjectTracker:
+    def __init__(self, labels=TRACKED_LABELS, iou_threshold=0.3, max_misses=3, min_hits=2, on_retire=None):
+        self.labels = set(labels)
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.on_retire = on_retire
+        self.tracks = []
+        self.next_id = 1
+
+    def predict(self):
+        for track in self.tracks:
+            track.predict()
+        return self.confirmed()
+
+    def update(self, detections, now):
+        for track in self.tracks:
+            track.predict()
+
+        detections = [obj for obj in detections if obj["label"] in self.labels]
+        pairs = []
+        for i, obj in enumerate(detections):
+            for j, track in enumerate(self.tracks):
+                if track.label == obj["label"]:
+                    iou = box_iou(obj["box"], track.box)
+                    if iou >= self.iou_threshold:
+                        pairs.append((iou, i, j))
+        pairs.sort(reverse=True)
+        matched_detections = set()
+        matched_tracks = set()
+        for _, i, j in pairs:
+            if i not in matched_detections and j not in matched_tracks:
+                self.tracks[j].correct(detections[i], now)
+                matched_detections.add(i)
+                matched_tracks.add(j)
+
+        for j, track in enumerate(self.tracks):
+            if j not in matched_tracks:
+                track.misses += 1
+        for i, obj in enumerate(detections):
+            if i not in matched_detections:
+                self.tracks.append(Track(self.next_id, obj, now))
+                self.next_id += 1
+
+        alive = []
+        for track in self.tracks:
+            if track.misses > self.max_misses:
+                self._retire(track)
+            else:
+                alive.append(track)
+        self.tracks = alive
+        return self.confirmed()
+
+    def confirmed(self):
+        return [track for track in self.tracks if track.hits >= self.min_hits]
+
+    def max_dwell(self, labels):
+        return max((t.dwell for t in self.confirmed() if t.label in labels), default=0.0)
+
+    def _retire(self, track):
+        if self.on_retire and track.hits >= self.min_hits:
+            self.on_retire(track)
+
+    def close(self):
+        for track in self.tracks:
+            self._retire(track)
+        self.tracks = []
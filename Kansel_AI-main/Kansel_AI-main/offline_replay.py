@@ -0,0 +1,270 @@
+import argparse
+import atexit
+import datetime
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from detection_confirmer import DetectionConfirmer
+from detector_pool import analyse_frame, consume_analysis
+from event_journal import EventJournal, session_journal_path
+from frame_ring import SharedFrameRing
+from object_tracker import ObjectTracker
+from perf_monitor import PerfMonitor
+from report_generator import ReportGenerator
+from rules_engine import RulesEngine, record_hits
+from secondary_faces import SecondaryFaceFilter
+from speaker_attribution import SpeakerAttributor
+from voice_activity_detector import VoiceActivityDetector, WaveFileStream
+from yolo_batcher import YOLOBatcher
+from yolo_detector import YOLODetector
+
+
+# Re-scores a recorded exam as fast as the hardware allows. The video is split
+# into chunks that are decoded and analysed in parallel worker processes; only
+# every step-th frame is decoded and analysed, the rest are grabbed and skipped.
+# The workers only run the stateless detectors. Their results are consumed in
+# media-time order by the same tracker, confirmer, speaker attribution and
+# rules a live session uses, so a replay scores exactly like the live exam.
+
+# Multi-face scan cadence in sampled frames, as in a live session
+FACE_SCAN_INTERVAL = 10
+FACE_SCAN_MAX_FACES = 3
+# YOLO runs a chunk's sampled frames in batches on the batcher thread while the
+# chunk's own thread decodes and face-meshes the next batch, so two batches are
+# in flight. max_wait only matters for the last, partial batch of a chunk.
+REPLAY_BATCH_SIZE = 4
+REPLAY_BATCH_WAIT = 0.25
+
+_worker_batcher = None
+_worker_ring = None  # one frame ring per worker, reused for every chunk
+
+
+def _init_worker():
+    global _worker_batcher
+    _worker_batcher = YOLOBatcher(YOLODetector(), max_batch_size=REPLAY_BATCH_SIZE, max_wait=REPLAY_BATCH_WAIT)
+    atexit.register(_close_worker_ring)
+    atexit.register(_worker_batcher.close)
+
+
+def _worker_frame_ring(shape):
+    global _worker_ring
+    if _worker_ring is None or _worker_ring.shape != tuple(shape):
+        _close_worker_ring()
+        _worker_ring = SharedFrameRing(2 * REPLAY_BATCH_SIZE, shape)
+    return _worker_ring
+
+
+def _close_worker_ring():
+    global _worker_ring
+    if _worker_ring is not None:
+        _worker_ring.close()
+        _worker_ring = None
+
+
+def _open_at(video_path, start_frame):
+    # Seeking by frame number is only exact for some containers and codecs; when
+    # the capture does not land on start_frame, the chunk is reached by decoding
+    # from the start instead, so every chunk sees exactly its own frames
+    cap = cv2.VideoCapture(video_path)
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start_frame:
+            cap.release()
+            cap = cv2.VideoCapture(video_path)
+            for _ in range(start_frame):
+                if not cap.grab():
+                    break
+    return cap
+
+
+def _read_frame(video_path, index):
+    # Evidence frame for a rule hit, read again from the recording
+    cap = _open_at(video_path, index)
+    try:
+        ret, frame = cap.read()
+        return frame if ret else None
+    finally:
+        cap.release()
+
+
+def _finish(ring_frame, detections, result):
+    # Adds the frame's batched YOLO detections and frees its ring slot
+    try:
+        result["detections"] = detections.result()
+    finally:
+        ring_frame.ring.release(ring_frame.slot)
+    return result
+
+
+def _analyse_chunk(video_path, start_frame, end_frame, step, fps):
+    cap = _open_at(video_path, start_frame)
+    pending = deque()  # (ring_frame, detections future, result) waiting for their YOLO batch
+    results = []
+
+    try:
+        for index in range(start_frame, end_frame):
+            if (index - start_frame) % step:
+                if not cap.grab():
+                    break
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            ring = _worker_frame_ring(frame.shape)
+            if len(pending) == ring.slots:
+                results.append(_finish(*pending.popleft()))
+
+            media_time = index / fps
+            # Chunks are aligned to the step, so the face scan cadence runs on across chunk boundaries
+            max_faces = FACE_SCAN_MAX_FACES if (index // step) % FACE_SCAN_INTERVAL == 0 else 0
+            ring_frame = ring.write(frame, timestamp=media_time)
+            result = {"time": media_time, "frame": index}
+            pending.append((ring_frame, _worker_batcher.submit(ring_frame.bgr), result))
+            # The face mesh runs here while the batcher thread runs YOLO
+            result.update(analyse_frame(ring_frame, max_faces=max_faces))
+
+        while pending:
+            results.append(_finish(*pending.popleft()))
+    finally:
+        cap.release()
+        # Left over only when the chunk failed; the batcher may still be reading these frames
+        for ring_frame, detections, _ in pending:
+            wait([detections])
+            ring_frame.ring.release(ring_frame.slot)
+    return results
+
+
+def _chunk_results(futures):
+    # Chunks are contiguous and submitted in order, so this yields every result in media-time order
+    for future in futures:
+        yield from future.result()
+
+
+def _format_time(media_time, start_time):
+    if start_time is not None:
+        return (start_time + datetime.timedelta(seconds=media_time)).strftime("%Y-%m-%d %H:%M:%S")
+    return time.strftime("%H:%M:%S", time.gmtime(media_time))
+
+
+def replay(video_path, candidate_name, audio_path=None, sample_fps=5.0, workers=None,
+           chunks_per_worker=4, start_time=None, full_audit=False, journal_path=None, rules_file=None):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        raise IOError(f"Video has no frames: {video_path}")
+
+    duration = total_frames / fps
+    step = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+    workers = workers or os.cpu_count() or 1
+
+    # Chunk boundaries are aligned to the sampling step so no sampled frame is lost
+    chunk_count = max(1, min(workers * chunks_per_worker, total_frames // step))
+    chunk_length = int(np.ceil(total_frames / chunk_count / step)) * step
+    bounds = [(start, min(start + chunk_length, total_frames))
+              for start in range(0, total_frames, chunk_length)]
+
+    journal = EventJournal(journal_path or session_journal_path(candidate_name))
+    report = ReportGenerator(candidate_name, journal=journal)
+    journal.record("replay", f"Offline replay of {video_path}", _format_time(0, start_time),
+                   sample_fps=sample_fps, frame_step=step, workers=workers)
+
+    # The stateful half of the pipeline runs here, on the recording's clock
+    perf = PerfMonitor()
+    rules = RulesEngine.from_file(rules_file) if rules_file else RulesEngine()
+    confirmer = DetectionConfirmer()
+    tracker = ObjectTracker(on_retire=lambda track: journal.record(
+        "track", f"{track.label} #{track.track_id} in view for {track.dwell:.1f}s",
+        _format_time(track.last_seen, start_time), track_id=track.track_id, label=track.label,
+        dwell=round(track.dwell, 2), detections=track.hits))
+    face_filter = SecondaryFaceFilter()
+    speaker = SpeakerAttributor()
+    audio = WaveFileStream(audio_path) if audio_path else None
+    voice = VoiceActivityDetector(stream=audio) if audio else None
+
+    malpractice_details = []
+    malpractice_evidence_images = []
+    terminated_at = None
+    frames_analysed = 0
+    started = time.monotonic()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as executor:
+        futures = [executor.submit(_analyse_chunk, video_path, start, end, step, fps) for start, end in bounds]
+        for result in _chunk_results(futures):
+            media_time = result["time"]
+            frames_analysed += 1
+            signals = consume_analysis(result, media_time, perf, tracker, speaker, face_filter, confirmer)
+
+            if voice:
+                # The audio track is read up to the frame's media time, as the microphone would deliver it
+                voice_detected = False
+                while not audio.exhausted() and audio.time() < media_time:
+                    voice_detected = voice.is_voice_detected(current_time=audio.time()) or voice_detected
+                signals.update({"voice": voice_detected, "voice_active": voice.is_speaking,
+                                "speech_source": speaker.classify(voice, media_time)})
+
+            hits = rules.update(signals, media_time)
+            if not hits:
+                continue
+            timestamp = _format_time(media_time, start_time)
+            frame = _read_frame(video_path, result["frame"]) if any(hit.report == "event" for hit in hits) else None
+            terminate = record_hits(hits, report, frame, timestamp, malpractice_details, malpractice_evidence_images)
+            if terminate and not full_audit:
+                # A live session ends at the first terminating hit
+                terminated_at = timestamp
+                for future in futures:
+                    future.cancel()
+                break
+
+    tracker.close()
+    if voice:
+        voice.close()
+    if terminated_at:
+        journal.record("terminated", "Malpractice detected. Exam ended.", terminated_at)
+    journal.record("replay_finished", "Offline replay finished", _format_time(duration, start_time),
+                   processing_seconds=round(time.monotonic() - started, 2), frames_analysed=frames_analysed)
+    journal.close()
+
+    report_path = report.generate_report()
+    return report_path, malpractice_details, malpractice_evidence_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proctor a recorded exam video offline.")
+    parser.add_argument("video", help="Recorded exam video")
+    parser.add_argument("--name", required=True, help="Candidate name used for the report")
+    parser.add_argument("--audio", help="Audio track as 16-bit WAV (extract it from the video with ffmpeg)")
+    parser.add_argument("--sample-fps", type=float, default=5.0, help="Frames analysed per second of video")
+    parser.add_argument("--workers", type=int, help="Decoder/detector processes (default: all cores)")
+    parser.add_argument("--start-time", help="Wall-clock start of the recording, YYYY-mm-dd HH:MM:SS")
+    parser.add_argument("--full-audit", action="store_true", help="Keep scoring after the first malpractice event")
+    parser.add_argument("--rules", help="Rules file (default: KANSEL_RULES_FILE or built-in rules)")
+    parser.add_argument("--journal", help="Event journal output path")
+    parser.add_argument("--email", action="store_true", help="Email the report to the examiner")
+    args = parser.parse_args()
+
+    start_time = datetime.datetime.strptime(args.start_time, "%Y-%m-%d %H:%M:%S") if args.start_time else None
+    report_path, details, evidence = replay(
+        args.video, args.name, audio_path=args.audio, sample_fps=args.sample_fps, workers=args.workers,
+        start_time=start_time, full_audit=args.full_audit, journal_path=args.journal,
+        rules_file=args.rules or os.environ.get("KANSEL_RULES_FILE")
+    )
+    print(f"Report written to {report_path}")
+
+    if args.email:
+        from email_alert import send_malpractice_email
+        send_malpractice_email(args.name, report_path, "\n".join(details) or "No major violations.", evidence)
+
+
+if __name__ == "__main__":
+    main()
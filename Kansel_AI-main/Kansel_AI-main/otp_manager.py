@@ -0,0 +1,70 @@
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+OK = "ok"
+WRONG = "wrong"
+EXPIRED = "expired"
+LOCKED = "locked"
+MISSING = "missing"
+
+
+def generate_code(length=6):
+    return str(secrets.randbelow(10 ** length)).zfill(length)
+
+
+# One-time codes for the email second factor. Only a salted hash of each code
+# is kept, every code expires after ttl seconds, is good for one successful
+# verification, and is withdrawn after max_attempts wrong guesses.
+class OTPManager:
+    def __init__(self, ttl=300.0, max_attempts=5, length=6, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.length = length
+        self.clock = clock
+        self.codes = {}  # email -> (salt, digest, expires, attempts left)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _digest(salt, code):
+        return hashlib.sha256(salt + code.encode()).digest()
+
+    def issue(self, email):
+        # New code for this address, replacing any earlier one; the caller sends it
+        code = generate_code(self.length)
+        salt = secrets.token_bytes(16)
+        with self.lock:
+            self.codes[email.lower()] = (salt, self._digest(salt, code), self.clock() + self.ttl, self.max_attempts)
+        return code
+
+    def revoke(self, email):
+        with self.lock:
+            self.codes.pop(email.lower(), None)
+
+    def verify(self, email, code):
+        # One of OK, WRONG, EXPIRED, LOCKED (too many wrong codes) or MISSING (none issued)
+        key = email.lower()
+        with self.lock:
+            entry = self.codes.get(key)
+            if entry is None:
+                return MISSING
+            salt, digest, expires, attempts = entry
+            if self.clock() > expires:
+                del self.codes[key]
+                return EXPIRED
+            if hmac.compare_digest(digest, self._digest(salt, code.strip())):
+                del self.codes[key]
+                return OK
+            attempts -= 1
+            if attempts <= 0:
+                del self.codes[key]
+                return LOCKED
+            self.codes[key] = (salt, digest, expires, attempts)
+            return WRONG
+
+    def attempts_left(self, email):
+        with self.lock:
+            entry = self.codes.get(email.lower())
+            return entry[3] if entry else 0
@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class StageStats:
+    def __init__(self, window):
+        self.latencies = np.zeros(window)  # rolling window, overwritten in place
+        self.window = window
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.completions = deque()  # monotonic completion times of the last few seconds
+        self.dropped = 0  # frames lost because the stage was busy or failed
+        self.skipped = 0  # frames the stage left out on purpose
+        self.last = 0.0
+
+    def record(self, seconds, now, fps_window):
+        self.latencies[self.index] = seconds
+        self.index = (self.index + 1) % self.window
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.completions.append(now)
+        while self.completions and now - self.completions[0] > fps_window:
+            self.completions.popleft()
+
+    def summary(self, now, fps_window):
+        recent = self.latencies[:min(self.count, self.window)] * 1000
+        while self.completions and now - self.completions[0] > fps_window:
+            self.completions.popleft()
+        return {
+            "count": self.count,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "fps": round(len(self.completions) / fps_window, 2),
+            "last_ms": round(self.last * 1000, 2),
+            "p50_ms": round(float(np.percentile(recent, 50)), 2) if len(recent) else 0.0,
+            "p95_ms": round(float(np.percentile(recent, 95)), 2) if len(recent) else 0.0,
+            "max_ms": round(float(recent.max()), 2) if len(recent) else 0.0,
+        }
+
+
+class _StageTimer:
+    # Reused for every measurement of one stage, so timing a stage allocates nothing
+    def __init__(self, monitor, name):
+        self.monitor = monitor
+        self.name = name
+        self.started = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.monitor.record(self.name, (time.perf_counter_ns() - self.started) / 1e9)
+        return False
+
+
+# Low-overhead per-stage timing for the proctoring loop: monotonic timers,
+# rolling latency windows, cumulative histograms, dropped-frame counters and
+# effective FPS. Readers (overlay, metrics file, HTTP endpoint) take snapshots.
+class PerfMonitor:
+    def __init__(self, window=300, fps_window=5.0):
+        self.window = window
+        self.fps_window = fps_window
+        self.stages = {}
+        self.timers = {}
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.server = None
+        self.writer = None
+        self.writer_stop = threading.Event()
+
+    def stage(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = _StageTimer(self, name)
+        return timer
+
+    def _stats(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(self.window)
+        return stats
+
+    def record(self, name, seconds):
+        with self.lock:
+            self._stats(name).record(seconds, time.monotonic(), self.fps_window)
+
+    def count_drop(self, name, frames=1):
+        with self.lock:
+            self._stats(name).dropped += frames
+
+    def count_skip(self, name, frames=1):
+        with self.lock:
+            self._stats(name).skipped += frames
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                "uptime_s": round(now - self.started, 1),
+                "stages": {name: stats.summary(now, self.fps_window) for name, stats in self.stages.items()},
+            }
+
+    def overlay_lines(self):
+        lines = []
+        for name, s in self.snapshot()["stages"].items():
+            line = f"{name}: {s['last_ms']:.1f} ms (p95 {s['p95_ms']:.1f}) {s['fps']:.1f} fps"
+            if s["dropped"]:
+                line += f" dropped {s['dropped']}"
+            lines.append(line)
+        return lines
+
+    def prometheus_text(self):
+        now = time.monotonic()
+        out = [
+            "# HELP kansel_stage_latency_seconds Time spent in each proctoring stage.",
+            "# TYPE kansel_stage_latency_seconds histogram",
+        ]
+        with self.lock:
+            items = [(name, stats, stats.summary(now, self.fps_window)) for name, stats in self.stages.items()]
+            for name, stats, _ in items:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += count
+                    out.append(f'kansel_stage_latency_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                out.append(f'kansel_stage_latency_seconds_bucket{{stage="{name}",le="+Inf"}} {stats.count}')
+                out.append(f'kansel_stage_latency_seconds_sum{{stage="{name}"}} {stats.total:.6f}')
+                out.append(f'kansel_stage_latency_seconds_count{{stage="{name}"}} {stats.count}')
+        out.append("# HELP kansel_stage_fps Effective rate each stage completes at.")
+        out.append("# TYPE kansel_stage_fps gauge")
+        for name, _, summary in items:
+            out.append(f'kansel_stage_fps{{stage="{name}"}} {summary["fps"]}')
+        out.append("# HELP kansel_stage_dropped_frames_total Frames a stage skipped because it was busy.")
+        out.append("# TYPE kansel_stage_dropped_frames_total counter")
+        for name, _, summary in items:
+            out.append(f'kansel_stage_dropped_frames_total{{stage="{name}"}} {summary["dropped"]}')
+        out.append("# HELP kansel_stage_skipped_frames_total Frames a stage left out on purpose, e.g. grabs nobody read.")
+        out.append("# TYPE kansel_stage_skipped_frames_total counter")
+        for name, _, summary in items:
+            out.append(f'kansel_stage_skipped_frames_total{{stage="{name}"}} {summary["skipped"]}')
+        return "\n".join(out) + "\n"
+
+    def start_http_server(self, port=9464, host="127.0.0.1"):
+        # Local Prometheus-style scrape endpoint at http://host:port/metrics
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = monitor.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def start_metrics_file(self, path, interval=10.0):
+        # Periodically replaces path with the latest JSON snapshot
+        def write_loop():
+            while not self.writer_stop.wait(interval):
+                self.write_metrics_file(path)
+
+        self.writer = threading.Thread(target=write_loop, daemon=True)
+        self.writer.start()
+
+    def write_metrics_file(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def close(self, final_metrics_path=None):
+        self.writer_stop.set()
+        if final_metrics_path:
+            self.write_metrics_file(final_metrics_path)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
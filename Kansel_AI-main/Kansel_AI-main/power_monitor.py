@@ -0,0 +1,144 @@
+import glob
+import os
+import time
+
+NORMAL = "normal"
+POWER_SAVING = "power_saving"
+
+
+def _read(path, cast=str):
+    try:
+        with open(path, "r") as f:
+            return cast(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+class SysfsPowerSource:
+    # Linux: battery and mains state from power_supply, the hottest thermal
+    # zone, and two throttling signs: the lowest ceiling cpufreq allows a core
+    # (scaling_max_freq over cpuinfo_max_freq; the current clock says nothing,
+    # idle cores always run slow) and the thermal throttle events counted since
+    # the previous read. Anything the machine does not expose is reported as None.
+    def __init__(self, root="/sys"):
+        supplies = glob.glob(os.path.join(root, "class", "power_supply", "*"))
+        self.batteries = [p for p in supplies if _read(os.path.join(p, "type")) == "Battery"]
+        self.mains = [p for p in supplies if _read(os.path.join(p, "type")) == "Mains"]
+        self.zones = glob.glob(os.path.join(root, "class", "thermal", "thermal_zone*", "temp"))
+        cpu_root = os.path.join(root, "devices", "system", "cpu")
+        self.cpus = [p for p in glob.glob(os.path.join(cpu_root, "cpu[0-9]*", "cpufreq"))
+                     if os.path.exists(os.path.join(p, "scaling_max_freq"))]
+        self.throttle_counters = glob.glob(os.path.join(cpu_root, "cpu[0-9]*", "thermal_throttle", "*_throttle_count"))
+        self.last_throttle_count = self._throttle_count()
+
+    def _throttle_count(self):
+        counts = [c for c in (_read(path, int) for path in self.throttle_counters) if c is not None]
+        return sum(counts) if counts else None
+
+    def read(self):
+        on_battery, battery_percent = None, None
+        if self.mains:
+            on_battery = not any(_read(os.path.join(p, "online"), int) for p in self.mains)
+        if self.batteries:
+            battery = self.batteries[0]
+            battery_percent = _read(os.path.join(battery, "capacity"), int)
+            if on_battery is None:
+                on_battery = _read(os.path.join(battery, "status")) == "Discharging"
+
+        temps = [t for t in (_read(path, int) for path in self.zones) if t is not None]
+        ratios = []
+        for cpu in self.cpus:
+            ceiling = _read(os.path.join(cpu, "scaling_max_freq"), int)
+            maximum = _read(os.path.join(cpu, "cpuinfo_max_freq"), int)
+            if ceiling and maximum:
+                ratios.append(ceiling / maximum)
+
+        throttle_count = self._throttle_count()
+        throttle_events = None
+        if throttle_count is not None and self.last_throttle_count is not None:
+            throttle_events = max(0, throttle_count - self.last_throttle_count)
+        self.last_throttle_count = throttle_count
+        return {
+            "on_battery": on_battery,
+            "battery_percent": battery_percent,
+            "temperature_c": max(temps) / 1000.0 if temps else None,
+            "max_freq_ratio": round(min(ratios), 2) if ratios else None,
+            "throttle_events": throttle_events,
+        }
+
+
+class FakePowerSource:
+    # Scripted readings for headless runs: each read returns the next one, repeating the last
+    def __init__(self, readings):
+        self.readings = list(readings)
+        self.index = 0
+
+    def read(self):
+        reading = self.readings[min(self.index, len(self.readings) - 1)]
+        self.index += 1
+        return dict(reading)
+
+
+# Decides between the normal and the power-saving configuration. Power saving
+# starts when the laptop runs on battery, gets hot or is being throttled, and
+# ends once it is plugged in again and has cooled down. Temperature has
+# separate enter and leave limits so the mode does not flap around one value.
+class PowerMonitor:
+    def __init__(self, source=None, interval=5.0, hot_c=85.0, cool_c=75.0, min_freq_ratio=0.8):
+        self.source = source or SysfsPowerSource()
+        self.interval = interval
+        self.hot_c = hot_c
+        self.cool_c = cool_c
+        self.min_freq_ratio = min_freq_ratio
+        self.mode = NORMAL
+        self.last_check = float("-inf")
+        self.last_reading = None
+        self.last_reason = ""
+
+    @property
+    def saving(self):
+        return self.mode == POWER_SAVING
+
+    def observe(self, now=None):
+        # Call every frame; reads the source at most every interval seconds and returns the new mode when it changes
+        now = time.monotonic() if now is None else now
+        if now - self.last_check < self.interval:
+            return None
+        self.last_check = now
+        reading = self.last_reading = self.source.read()
+
+        temperature = reading.get("temperature_c")
+        freq_ratio = reading.get("max_freq_ratio")
+        throttle_events = reading.get("throttle_events")
+        reasons = []
+        if reading.get("on_battery"):
+            percent = reading.get("battery_percent")
+            reasons.append("on battery" + (f" ({percent}%)" if percent is not None else ""))
+        if temperature is not None and temperature >= (self.cool_c if self.saving else self.hot_c):
+            reasons.append(f"CPU at {temperature:.0f}°C")
+        if freq_ratio is not None and freq_ratio < self.min_freq_ratio:
+            reasons.append(f"CPU capped at {freq_ratio:.0%} of its top clock")
+        if throttle_events:
+            reasons.append(f"CPU thermally throttled {throttle_events} times")
+
+        mode = POWER_SAVING if reasons else NORMAL
+        if mode == self.mode:
+            return None
+        self.mode = mode
+        self.last_reason = ", ".join(reasons) if reasons else "plugged in and cool"
+        return mode
+
+
+def power_saving_profile(profile, capture=False):
+    # Sparser object detection, smaller YOLO input and FaceMesh on the face
+    # region only; capture=True also lowers the camera resolution, which is
+    # only possible before the frame ring has been sized
+    changes = {
+        "detection_interval": max(4, profile.detection_interval * 2),
+        "yolo_input_size": min(profile.yolo_input_size, 256),
+        "face_roi_scale": profile.face_roi_scale or 2.0,
+    }
+    if capture:
+        changes["capture_width"] = min(profile.capture_width, 480)
+        changes["capture_height"] = min(profile.capture_height, 360)
+    return profile.copy(**changes)
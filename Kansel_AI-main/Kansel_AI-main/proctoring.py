@@ -1,120 +1,216 @@
+import argparse
 import cv2
 import datetime
+import json
+import signal
+import threading
+import time
 from yolo_detector import YOLODetector
-from face_recognition_utils import verify_identity, detect_gaze_deviation
+from face_recognition_utils import (verify_identity, detect_gaze_deviation, last_head_pose, last_mouth_ratio,
+                                    duplicate_identities)
+from face_index import describe_matches
 from voice_activity_detector import VoiceActivityDetector
 from browser_logger import BrowserLogger
 from light_noise_analysis import LightNoiseAnalyzer
 from report_generator import ReportGenerator
-from email_alert import send_malpractice_email, send_otp_email, generate_otp
+from event_journal import EventJournal, session_journal_path
+from frame_ring import SharedFrameRing
+from camera_capture import CameraCapture
+from rules_engine import RulesEngine, analysis_signals, record_hits
+from detection_confirmer import DetectionConfirmer, region_confirms
+from object_tracker import ObjectTracker
+from gaze_calibration import candidate_gaze_thresholds
+from speaker_attribution import SpeakerAttributor
+from clip_buffer import EvidenceClipBuffer, capture_clip_tail
+from analytics_store import AnalyticsStore, DEFAULT_DB_PATH
+from email_alert import send_malpractice_email, send_otp_email
+import otp_manager
+from otp_manager import OTPManager
 import os
 
-def main():
-    # === New: ask candidate info at start ===
-    candidate_name = input("Enter candidate name: ").strip()
-    candidate_email = input("Enter candidate email (for 2FA): ").strip()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Proctor an exam from the command line.")
+    parser.add_argument("--config", help="JSON file with any of: name, email, photo, rules, duration, camera")
+    parser.add_argument("--name", help="Candidate name")
+    parser.add_argument("--email", help="Candidate email for the OTP")
+    parser.add_argument("--photo", help="Candidate reference photo")
+    parser.add_argument("--rules", help="Rules file (default: KANSEL_RULES_FILE or built-in rules)")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--camera", type=int, help="Camera device index")
+    parser.add_argument("--headless", action="store_true", help="No preview window; missing inputs are an error instead of a prompt")
+    parser.add_argument("--no-otp", action="store_true", help="Skip the emailed OTP (kiosks authenticated otherwise)")
+    parser.add_argument("--no-email", action="store_true", help="Do not email the report")
+    args = parser.parse_args(argv)
 
-    # === New: Send OTP and verify ===
-    otp = generate_otp()
-    send_otp_email(candidate_email, otp)
+    # Command-line values win over the config file
+    settings = {}
+    if args.config:
+        with open(args.config, "r") as f:
+            settings.update(json.load(f))
+    for key, value in vars(args).items():
+        if key != "config" and value is not None and value is not False:
+            settings[key] = value
+    return settings
 
-    for attempt in range(3):
-        user_input = input("Enter the OTP sent to your email: ").strip()
-        if user_input == otp:
-            print("✅ OTP verified successfully.")
-            break
-        else:
-            print(f"❌ Incorrect OTP. Attempts left: {2 - attempt}")
-    else:
-        print("🚫 OTP verification failed. Terminating exam.")
-        return
+
+def ask(settings, key, prompt):
+    # Missing inputs are asked for interactively, unless running headless
+    if settings.get(key):
+        return settings[key]
+    if settings.get("headless"):
+        raise SystemExit(f"--{key} is required in headless mode")
+    return input(prompt).strip()
+
+
+def main(argv=None):
+    settings = parse_args(argv)
+    headless = settings.get("headless", False)
+
+    # SIGINT/SIGTERM finish the session normally: report written, email sent
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    # The emailed OTP has to be typed in, which a headless run cannot do
+    if headless and not settings.get("no_otp"):
+        raise SystemExit("--headless requires --no-otp")
+
+    candidate_name = ask(settings, "name", "Enter candidate name: ")
+
+    if not settings.get("no_otp"):
+        candidate_email = ask(settings, "email", "Enter candidate email (for 2FA): ")
+        otp = OTPManager(max_attempts=3)
+        send_otp_email(candidate_email, otp.issue(candidate_email), otp.ttl / 60)
+
+        while True:
+            result = otp.verify(candidate_email, input("Enter the OTP sent to your email: "))
+            if result == otp_manager.OK:
+                print("✅ OTP verified successfully.")
+                break
+            if result != otp_manager.WRONG:
+                print(f"🚫 OTP verification failed ({result}). Terminating exam.")
+                return
+            print(f"❌ Incorrect OTP. Attempts left: {otp.attempts_left(candidate_email)}")
 
     # Ask for candidate reference image path until valid
     while True:
-        reference_image_path = input("Enter path to candidate reference photo: ").strip()
+        reference_image_path = ask(settings, "photo", "Enter path to candidate reference photo: ")
         if os.path.isfile(reference_image_path):
             break
+        if headless:
+            raise SystemExit(f"File '{reference_image_path}' does not exist.")
+        settings.pop("photo", None)
         print(f"File '{reference_image_path}' does not exist. Please enter a valid file path.")
 
-    cap = cv2.VideoCapture(0)
+    cap = CameraCapture(settings.get("camera", 0))
+    cap.open()
 
     yolo = YOLODetector()
-    voice_detector = VoiceActivityDetector()
-    browser_logger = BrowserLogger()
-    light_noise = LightNoiseAnalyzer()
-    report = ReportGenerator(candidate_name)
+    journal = EventJournal(session_journal_path(candidate_name))
+    store = AnalyticsStore(os.environ.get("KANSEL_ANALYTICS_DB", DEFAULT_DB_PATH)).start()
+    store.start_session(journal.session_id, candidate_name, settings.get("email"))
+    journal.listener = store.journal_listener(journal.session_id, candidate_name)
+    rules_file = settings.get("rules") or os.environ.get("KANSEL_RULES_FILE")
+    rules = RulesEngine.from_file(rules_file) if rules_file else RulesEngine()
+    confirmer = DetectionConfirmer()
+    speaker = SpeakerAttributor()
+    tracker = ObjectTracker(on_retire=lambda track: journal.record(
+        "track", f"{track.label} #{track.track_id} in view for {track.dwell:.1f}s",
+        track_id=track.track_id, label=track.label, dwell=round(track.dwell, 2), detections=track.hits))
 
     # Identity verification at start
     ret, live_frame = cap.read()
     if not ret:
         print("Failed to capture initial frame.")
         cap.release()
+        journal.close()
+        store.end_session(journal.session_id, "capture failed")
+        store.close()
         return
 
     if not verify_identity(reference_image_path, live_frame):
         print("Candidate identity could not be verified. Terminating exam.")
         cap.release()
+        journal.close()
+        store.end_session(journal.session_id, "verification failed")
+        store.close()
         return
 
-    print("Identity verified. Starting exam proctoring...")
+    print("Identity verified.")
+    # Microphone, clip encoder and activity monitor only start for a verified candidate
+    voice_detector = VoiceActivityDetector()
+    light_noise = LightNoiseAnalyzer()
+    clips = EvidenceClipBuffer()
+    browser_logger = BrowserLogger(journal=journal).start()
+    report = ReportGenerator(candidate_name, journal=journal, clips=clips)
+    duplicates = duplicate_identities(reference_image_path, candidate_name)
+    if duplicates:
+        message = f"Face matches earlier candidate(s): {describe_matches(duplicates)}"
+        print(message)
+        report.add_system_event(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), message)
+    gaze_thresholds, calibrated = candidate_gaze_thresholds(reference_image_path, cap, print)
+    report.set_session_info("Gaze thresholds" + (" (calibrated this session)" if calibrated else ""), gaze_thresholds)
+    print("Starting exam proctoring...")
+
+    # Frames are captured straight into preallocated slots and shared by every stage
+    ring = SharedFrameRing(2, live_frame.shape)
+    del live_frame
 
     malpractice_detected = False
     malpractice_details = []
     malpractice_evidence_images = []
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
+    deadline = time.monotonic() + settings["duration"] if settings.get("duration") else None
+    while not stop.is_set():
+        if deadline and time.monotonic() >= deadline:
             break
+        ring_frame = ring.capture(cap)
+        if ring_frame is None:
+            break
+        # Single consumer: with two slots this frame is only overwritten by the capture after next
+        ring.release(ring_frame.slot)
+        frame = ring_frame.bgr
+        clips.push(frame, ring_frame.timestamp)
 
         warning_message = None  # To display on screen
 
-        # Detect malpractice objects
-        malpractice_objects = yolo.detect_malpractice_objects(frame)
-        if malpractice_objects:
-            malpractice_detected = True
-            for obj in malpractice_objects:
-                desc = f"Malpractice Object Detected: {obj['label']}"
-                print(desc)
-                report.add_event(desc, frame)
-                malpractice_details.append(desc)
-                malpractice_evidence_images.append(f"report_images/event_{len(report.events)}.jpg")
-            break
-
-        # Detect multiple persons
-        if yolo.detect_multiple_persons(frame):
-            malpractice_detected = True
-            desc = "Multiple persons detected"
-            print(desc)
-            report.add_event(desc, frame)
-            malpractice_details.append(desc)
-            malpractice_evidence_images.append(f"report_images/event_{len(report.events)}.jpg")
-            break
+        # Object, person and gaze signals
+        # Objects must persist over several frames and survive a high-resolution look at their region
+        detections = yolo.detect(frame)
+        tracker.update(detections, ring_frame.timestamp)
+        detections = confirmer.update(
+            detections,
+            lambda label, box: region_confirms(yolo.detect_region(frame, box), label, box)
+        )
+        signals = analysis_signals({
+            "detections": detections,
+            "gaze": detect_gaze_deviation(frame, frame_rgb=ring_frame.rgb, thresholds=gaze_thresholds),
+            "head_pose": last_head_pose(),
+        }, tracker)
 
-        # === Gaze deviation detection (updated to match new output) ===
-        gaze_deviated, direction, no_face, blink = detect_gaze_deviation(frame)
-        if no_face:
-            warning_message = "Warning: No face detected!"
-        elif gaze_deviated:
-            reason = direction if direction else "Looking away"
-            warning_message = f"Warning: Gaze deviation - {reason}"
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            report.add_gaze_event(timestamp, reason)
+        # Voice, light and noise signals
+        speaker.add_mouth(ring_frame.timestamp, last_mouth_ratio())
+        light, noise = light_noise.analyze(frame)
+        signals.update({
+            "voice": voice_detector.is_voice_detected(),
+            "voice_active": voice_detector.is_speaking,
+            "speech_source": speaker.classify(voice_detector, time.monotonic()),
+            "light": light,
+            "noise": noise,
+        })
+        signals.update(browser_logger.status())
 
-        # === Improved Voice detection ===
-        if voice_detector.is_voice_detected():
+        hits = rules.update(signals, time.monotonic())
+        if hits:
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            report.add_voice_event(timestamp)
-            warning_message = "Warning: Voice detected!"
-
-        # === Light and noise check (on-screen warning) ===
-        light, noise = light_noise.analyze(frame)
-        if light < 50:
-            warning_message = "Warning: Low lighting!"
-        elif noise > 95 and voice_detector.is_voice_detected():
-            warning_message = "Warning: High noise!"
-        elif noise > 110:
-            warning_message = "Warning: Very high noise!"
+            malpractice_detected = record_hits(hits, report, frame, timestamp,
+                                               malpractice_details, malpractice_evidence_images)
+            for hit in hits:
+                if hit.severity == "critical":
+                    print(hit.message)
+            warning_message = f"Warning: {hits[-1].message}"
+            if malpractice_detected:
+                break
 
         # === Display warning message if any ===
         """if warning_message:
@@ -122,24 +218,37 @@ def main():
                         cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)"""
 
         # Display frame with info, quit on 'q'
-        cv2.imshow("Proctoring", frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        if not headless:
+            cv2.imshow("Proctoring", frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
 
+    # The last event's clip gets its post-event seconds before the camera is let go
+    capture_clip_tail(clips, ring, cap)
     cap.release()
     voice_detector.close()
-    cv2.destroyAllWindows()
+    tracker.close()
+    browser_logger.close()
+    clips.close()
+    if not headless:
+        cv2.destroyAllWindows()
+    ring.close()
+    journal.close()
 
     # Generate report
     report_path = report.generate_report()
+    store.end_session(journal.session_id, "terminated" if malpractice_detected else "completed", report_path)
+    store.close()
 
     # Send email whether malpractice or not
-    send_malpractice_email(
-        candidate_name,
-        report_path,
-        "\n".join(malpractice_details) or "No major violations.",
-        malpractice_evidence_images
-    )
+    if not settings.get("no_email"):
+        send_malpractice_email(
+            candidate_name,
+            report_path,
+            "\n".join(malpractice_details) or "No major violations.",
+            malpractice_evidence_images
+        )
+    print(f"Report written to {report_path}")
 
     print("Exam session ended.")
 
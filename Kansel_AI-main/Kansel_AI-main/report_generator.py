@@ -1,38 +1,123 @@
 from fpdf import FPDF
+import datetime
 import os
 import cv2
 
+from event_journal import EventJournal
+
+COVER_PATH = "Report front Page.png"  # Make sure this file exists in the working directory
+
 class ReportGenerator:
-    def __init__(self, candidate_name):
+    def __init__(self, candidate_name, journal=None, clips=None, session_id=None):
         self.candidate_name = candidate_name
-        self.events = []  # (description, image_path)
-        self.image_folder = "report_images"
-        os.makedirs(self.image_folder, exist_ok=True)
+        self.journal = journal  # optional EventJournal mirroring every event
+        self.clips = clips  # optional EvidenceClipBuffer for a short clip around each event
+        self.events = []  # (description, image_path, clip_path)
+        # Evidence goes into a folder per session so event numbers never collide across sessions
+        if session_id is None:
+            stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            session_id = journal.session_id if journal else f"{candidate_name}_{stamp}"
+        self._set_session(session_id)
 
         self.gaze_events = []   # (timestamp, reason)
         self.voice_events = []  # timestamp only
+        self.session_info = []  # (setting, value)
+        self.system_events = []  # (timestamp, message)
 
-    def add_event(self, description, frame):
+    def _set_session(self, session_id):
+        self.session_id = session_id
+        self.image_folder = os.path.join("report_images", session_id)
+        os.makedirs(self.image_folder, exist_ok=True)
+
+    def add_event(self, description, frame, timestamp=None):
+        image_path = None
         if frame is not None:
             image_path = os.path.join(self.image_folder, f"event_{len(self.events)+1}.jpg")
             cv2.imwrite(image_path, frame)
-            self.events.append((description, image_path))
-        else:
-            self.events.append((description, None))
+        clip_path = None
+        if self.clips:
+            clip_path = self.clips.request_clip(os.path.join(self.image_folder, f"event_{len(self.events)+1}.mp4"))
+        self.events.append((description, image_path, clip_path))
+        if self.journal:
+            self.journal.record("malpractice", description, timestamp, image=image_path, clip=clip_path)
+        return image_path
+
+    def clip_written(self, clip_path):
+        # Clips are requested before they exist and a clip can fail to write
+        if self.clips is not None and clip_path in self.clips.written:
+            return True
+        # Clips of an earlier process (resumed session, report rebuilt from the journal)
+        return os.path.isfile(clip_path) and os.path.getsize(clip_path) > 0
 
     def add_gaze_event(self, timestamp, reason):
         self.gaze_events.append((timestamp, reason))
+        if self.journal:
+            self.journal.record("gaze", reason, timestamp)
 
     def add_voice_event(self, timestamp):
         self.voice_events.append(timestamp)
+        if self.journal:
+            self.journal.record("voice", "Voice detected", timestamp)
 
-    def generate_report(self):
+    def set_session_info(self, setting, value):
+        self.session_info = [(k, v) for k, v in self.session_info if k != setting]
+        self.session_info.append((setting, value))
+        if self.journal:
+            self.journal.record("setting", f"{setting}: {value}")
+
+    def add_system_event(self, timestamp, message):
+        self.system_events.append((timestamp, message))
+        if self.journal:
+            self.journal.record("system", message, timestamp)
+
+    def state(self):
+        # Everything recorded so far, as JSON-friendly lists for a session checkpoint
+        return {
+            "session_id": self.session_id,
+            "events": self.events,
+            "gaze_events": self.gaze_events,
+            "voice_events": self.voice_events,
+            "session_info": self.session_info,
+            "system_events": self.system_events,
+        }
+
+    def restore(self, state):
+        if state.get("session_id"):
+            self._set_session(state["session_id"])
+        self.events = [tuple(event) for event in state["events"]]
+        self.gaze_events = [tuple(event) for event in state["gaze_events"]]
+        self.voice_events = list(state["voice_events"])
+        self.session_info = [tuple(item) for item in state["session_info"]]
+        self.system_events = [tuple(event) for event in state["system_events"]]
+
+    @classmethod
+    def from_journal(cls, path, candidate_name=None):
+        # Rebuilds a finished session's report from its event journal; the
+        # candidate name defaults to the one in the journal file name
+        session_id = os.path.splitext(os.path.basename(path))[0]
+        report = cls(candidate_name or session_id.rsplit("_", 2)[0], session_id=session_id)
+        for entry in EventJournal.read(path):
+            kind = entry["type"]
+            if kind == "malpractice":
+                report.events.append((entry["message"], entry.get("image"), entry.get("clip")))
+            elif kind == "gaze":
+                report.gaze_events.append((entry["time"], entry["message"]))
+            elif kind == "voice":
+                report.voice_events.append(entry["time"])
+            elif kind == "system":
+                report.system_events.append((entry["time"], entry["message"]))
+            elif kind == "setting":
+                setting, _, value = entry["message"].partition(": ")
+                report.session_info = [(k, v) for k, v in report.session_info if k != setting]
+                report.session_info.append((setting, value))
+        return report
+
+    def generate_report(self, cover_path=COVER_PATH, report_path=None):
         pdf = FPDF()
         
         # ----------------- Front Page ------------------
         pdf.add_page()
-        cover_path = "Report front Page.png"  # Make sure this file exists in the working directory
-        if os.path.exists(cover_path):
+        if cover_path and os.path.exists(cover_path):
             pdf.image(cover_path, x=0, y=0, w=210, h=297)
         else:
             pdf.set_font("Arial", 'B', 24)
@@ -57,8 +142,10 @@ class ReportGenerator:
         if not self.events:
             pdf.cell(0, 10, "No significant malpractice events detected during the exam.", ln=True)
         else:
-            for i, (desc, img_path) in enumerate(self.events, 1):
+            for i, (desc, img_path, clip_path) in enumerate(self.events, 1):
                 pdf.multi_cell(0, 10, f"{i}. {desc}")
+                if clip_path and self.clip_written(clip_path):
+                    pdf.cell(0, 10, f"Video clip: {clip_path}", ln=True)
                 if img_path:
                     try:
                         pdf.image(img_path, w=100)
@@ -96,7 +183,20 @@ class ReportGenerator:
             for i, timestamp in enumerate(self.voice_events, 1):
                 pdf.cell(0, 10, f"{i}. Voice detected at {timestamp}", ln=True)
 
+        # Session settings and system events
+        if self.session_info or self.system_events:
+            pdf.ln(5)
+            pdf.set_font("Arial", 'B', 14)
+            pdf.set_text_color(0, 51, 102)
+            pdf.cell(0, 10, "Session Settings", ln=True)
+            pdf.set_font("Arial", size=12)
+            pdf.set_text_color(0)
+            for setting, value in self.session_info:
+                pdf.multi_cell(0, 10, f"{setting}: {value}")
+            for i, (timestamp, message) in enumerate(self.system_events, 1):
+                pdf.multi_cell(0, 10, f"{i}. At {timestamp}: {message}")
+
         # Save Report
-        report_path = f"proctoring_report_{self.candidate_name}.pdf"
+        report_path = report_path or f"proctoring_report_{self.candidate_name}.pdf"
         pdf.output(report_path)
         return report_path
@@ -0,0 +1,221 @@
+import json
+import operator
+from collections import deque, defaultdict
+
+MALPRACTICE_LABELS = {"cell phone", "book"}
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# What both proctoring loops used to hard-code. Each rule fires when all of its
+# "when" conditions hold; optional keys:
+#   for      - seconds the conditions must hold continuously before firing
+#   count    - number of onsets needed within "window" seconds
+#   repeat   - seconds between re-fires while the conditions keep holding
+#              (0 = every tick that measures one of its signals,
+#              omitted = once per onset)
+#   report   - "event" (malpractice with evidence), "gaze", "voice", "system" or omitted
+#   detail   - text stored in the report, defaults to message
+DEFAULT_RULES = [
+    {"name": "malpractice_object", "when": [["object_count", ">", 0]],
+     "severity": "critical", "action": "terminate", "report": "event",
+     "message": "Malpractice Object Detected: {objects}"},
+    {"name": "multiple_persons", "when": [["person_count", ">", 1]],
+     "severity": "critical", "action": "terminate", "report": "event",
+     "message": "Multiple persons detected"},
+    {"name": "secondary_face", "when": [["secondary_faces", ">", 0]], "for": 2,
+     "severity": "warning", "action": "warn", "report": "event",
+     "message": "Secondary face detected"},
+    {"name": "no_face", "when": [["no_face", "==", True]], "repeat": 0,
+     "severity": "warning", "action": "warn", "message": "No face detected."},
+    {"name": "gaze_deviation", "when": [["gaze_deviated", "==", True]], "repeat": 0,
+     "severity": "warning", "action": "warn", "report": "gaze",
+     "message": "Gaze Deviation: {gaze_direction}", "detail": "{gaze_direction}"},
+    {"name": "voice", "when": [["voice", "==", True], ["speech_source", "!=", "noise"]],
+     "severity": "warning", "action": "warn", "report": "voice", "message": "Voice Detected!"},
+    {"name": "off_camera_speech", "when": [["speech_source", "==", "off_camera"]], "for": 2,
+     "severity": "warning", "action": "warn", "report": "event",
+     "message": "Off-camera speech detected"},
+    {"name": "forbidden_app", "when": [["forbidden_apps", ">", 0]],
+     "severity": "warning", "action": "warn", "report": "system",
+     "message": "Forbidden application running: {forbidden_app_names}"},
+    {"name": "low_light", "when": [["light", "<", 50]], "repeat": 0,
+     "severity": "warning", "action": "warn", "message": "Low lighting."},
+    {"name": "high_noise", "when": [["noise", ">", 95], ["voice_active", "==", True]], "repeat": 0,
+     "severity": "warning", "action": "warn", "message": "High noise level."},
+    {"name": "very_high_noise", "when": [["noise", ">", 110]], "repeat": 0,
+     "severity": "warning", "action": "warn", "message": "Very high noise level."},
+]
+
+
+class RuleHit:
+    def __init__(self, rule, message, detail, timestamp):
+        self.name = rule.name
+        self.severity = rule.severity
+        self.action = rule.action
+        self.report = rule.report
+        self.message = message
+        self.detail = detail
+        self.timestamp = timestamp
+
+    @property
+    def terminate(self):
+        return self.action == "terminate"
+
+
+class Rule:
+    def __init__(self, spec, order):
+        self.name = spec["name"]
+        self.order = order
+        self.conditions = [(signal, OPERATORS[op], value) for signal, op, value in spec["when"]]
+        self.signals = {signal for signal, _, _ in self.conditions}
+        self.hold_for = spec.get("for", 0)
+        self.count = spec.get("count", 1)
+        self.window = spec.get("window")
+        self.repeat = spec.get("repeat")
+        self.severity = spec.get("severity", "warning")
+        self.action = spec.get("action", "warn")
+        self.report = spec.get("report")
+        self.message = spec.get("message", self.name)
+        self.detail = spec.get("detail")
+
+        # Runtime state
+        self.holding_since = None
+        self.onsets = deque()
+        self.last_fired = None
+        self.fired_this_hold = False
+
+    def holds(self, values):
+        for signal, op, threshold in self.conditions:
+            value = values.get(signal)
+            if value is None:
+                return False
+            try:
+                if not op(value, threshold):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def evaluate(self, values, now, fresh=True):
+        # Returns (fire, still_active); fresh is False when none of the rule's
+        # signals was measured this tick, so the held value is only carried over
+        if not self.holds(values):
+            self.holding_since = None
+            self.fired_this_hold = False
+            return False, False
+
+        if self.holding_since is None:
+            self.holding_since = now
+            if self.window:
+                self.onsets.append(now)
+        if self.window:
+            while self.onsets and now - self.onsets[0] > self.window:
+                self.onsets.popleft()
+            if len(self.onsets) < self.count:
+                return False, True
+
+        if now - self.holding_since < self.hold_for:
+            return False, True
+        if self.fired_this_hold:
+            if self.repeat is None or now - self.last_fired < self.repeat:
+                return False, True
+            if self.repeat == 0 and not fresh:
+                return False, True
+
+        self.last_fired = now
+        self.fired_this_hold = True
+        return True, True
+
+
+# Evaluates detector outputs against compiled rules once per tick. Rules are
+# indexed by the signals they read, so a tick only touches rules whose inputs
+# changed plus the few rules that are currently holding (waiting out a
+# duration or re-firing); the cost does not grow with the size of the rule set.
+class RulesEngine:
+    def __init__(self, rules=None):
+        self.rules = [Rule(spec, i) for i, spec in enumerate(rules or DEFAULT_RULES)]
+        self.by_signal = defaultdict(list)
+        for rule in self.rules:
+            for signal in rule.signals:
+                self.by_signal[signal].append(rule)
+        self.values = {}
+        self.active = set()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def update(self, signals, now):
+        # signals: the values measured this tick; omitted signals keep their last value
+        dirty = set(self.active)
+        for signal, value in signals.items():
+            if self.values.get(signal) != value or signal not in self.values:
+                self.values[signal] = value
+                dirty.update(self.by_signal.get(signal, ()))
+
+        hits = []
+        for rule in sorted(dirty, key=lambda r: r.order):
+            fire, active = rule.evaluate(self.values, now, fresh=not rule.signals.isdisjoint(signals))
+            if active:
+                self.active.add(rule)
+            else:
+                self.active.discard(rule)
+            if fire:
+                fields = defaultdict(str, self.values)
+                message = rule.message.format_map(fields)
+                detail = rule.detail.format_map(fields) if rule.detail else message
+                hits.append(RuleHit(rule, message, detail, now))
+        return hits
+
+
+def analysis_signals(result, tracker=None):
+    # Turns one analyse_frame result into rule signals; detectors that did not run add nothing
+    signals = {}
+    if tracker is not None:
+        # Seconds the longest-lived phone or book track has been in view
+        signals["object_dwell"] = tracker.max_dwell(MALPRACTICE_LABELS)
+    detections = result.get("detections")
+    if detections is not None:
+        objects = sorted({obj["label"] for obj in detections if obj["label"] in MALPRACTICE_LABELS})
+        signals["object_count"] = len(objects)
+        signals["objects"] = ", ".join(objects)
+        signals["person_count"] = sum(1 for obj in detections if obj["label"] == "person")
+    gaze = result.get("gaze")
+    if gaze is not None:
+        gaze_deviated, direction, no_face, blink = gaze
+        signals["no_face"] = no_face
+        signals["gaze_deviated"] = bool(gaze_deviated) and not no_face
+        signals["gaze_direction"] = direction or ""
+    if result.get("secondary_faces") is not None:
+        signals["secondary_faces"] = result["secondary_faces"]
+    head_pose = result.get("head_pose")
+    if head_pose is not None:
+        signals["head_yaw"], signals["head_pitch"], signals["head_roll"] = head_pose
+    return signals
+
+
+def record_hits(hits, report, frame, timestamp, malpractice_details, malpractice_evidence_images):
+    # Writes rule hits into the report; returns True if any of them ends the exam
+    terminate = False
+    for hit in hits:
+        if hit.report == "event":
+            image_path = report.add_event(hit.detail, frame, timestamp)
+            malpractice_details.append(hit.detail)
+            if image_path:
+                malpractice_evidence_images.append(image_path)
+        elif hit.report == "gaze":
+            report.add_gaze_event(timestamp, hit.detail)
+        elif hit.report == "voice":
+            report.add_voice_event(timestamp)
+        elif hit.report == "system":
+            report.add_system_event(timestamp, hit.detail)
+        terminate = terminate or hit.terminate
+    return terminate
@@ -0,0 +1,43 @@
+from collections import deque
+
+
+# Decides which of the faces found by the multi-face scan count as a second
+# person. The largest face is taken to be the candidate. Other faces are
+# ignored when they are too small (background, photos on a far wall), much
+# smaller than the candidate's face (posters, faces on a screen), or have not
+# moved over the last few scans (printed or paused pictures).
+class SecondaryFaceFilter:
+    def __init__(self, min_width=0.06, min_relative_size=0.35, static_scans=5, static_tolerance=0.01):
+        self.min_width = min_width  # face width as a fraction of frame width
+        self.min_relative_size = min_relative_size  # face width relative to the candidate's
+        self.static_scans = static_scans
+        self.static_tolerance = static_tolerance  # centre movement, as a fraction of the frame
+        self.history = deque(maxlen=static_scans)  # secondary face centres of recent scans
+
+    def update(self, boxes):
+        # boxes: (x0, y0, x1, y1) fractions from detect_faces; returns the number of secondary faces
+        if len(boxes) < 2:
+            self.history.append([])
+            return 0
+        boxes = sorted(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+        primary_width = boxes[0][2] - boxes[0][0]
+
+        candidates = []
+        for x0, y0, x1, y1 in boxes[1:]:
+            width = x1 - x0
+            if width < self.min_width or width < primary_width * self.min_relative_size:
+                continue
+            candidates.append(((x0 + x1) / 2, (y0 + y1) / 2))
+
+        count = sum(1 for centre in candidates if not self._is_static(centre))
+        self.history.append(candidates)
+        return count
+
+    def _is_static(self, centre):
+        if len(self.history) < self.static_scans:
+            return False
+        return all(
+            any(abs(centre[0] - cx) <= self.static_tolerance and abs(centre[1] - cy) <= self.static_tolerance
+                for cx, cy in scan)
+            for scan in self.history
+        )
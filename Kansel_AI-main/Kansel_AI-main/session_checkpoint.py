@@ -0,0 +1,55 @@
+import json
+import os
+import time
+
+from candidate_profile import profile_path
+
+
+def checkpoint_path(candidate_name, folder="session_logs"):
+    return os.path.join(folder, f"{candidate_name}.checkpoint.json")
+
+
+# Periodic snapshot of a running session (report lists, evidence paths,
+# journal position, gaze thresholds, elapsed exam time) so a restarted
+# process can pick the same session up instead of starting over. Writes are
+# atomic; a crash mid-write leaves the previous checkpoint in place.
+class SessionCheckpoint:
+    def __init__(self, path, interval=15.0):
+        self.path = path
+        self.interval = interval
+        self.last_saved = time.monotonic()
+
+    def due(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now - self.last_saved >= self.interval
+
+    def save(self, state):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        state = dict(state, saved_at=time.time())
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self.last_saved = time.monotonic()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_checkpoint(candidate_name, reference_image_path, max_age=3600.0, folder="session_logs"):
+    # The candidate's unfinished session, or None if there is none, it is too old,
+    # or it was started with a different reference photo
+    path = checkpoint_path(candidate_name, folder)
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - state.get("saved_at", 0) > max_age:
+        return None
+    if state.get("reference_profile") != os.path.basename(profile_path(reference_image_path)):
+        return None
+    return state
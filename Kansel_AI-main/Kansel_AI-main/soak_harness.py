@@ -0,0 +1,328 @@
+import argparse
+import functools
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from benchmark import current_rss_mb, git_commit
+from browser_logger import BrowserLogger, FakeActivityBackend
+from clip_buffer import EvidenceClipBuffer
+from detection_confirmer import DetectionConfirmer
+from detector_pool import analyse_frame, consume_analysis
+from event_journal import EventJournal, session_journal_path
+from frame_ring import SharedFrameRing
+from object_tracker import ObjectTracker
+from perf_monitor import PerfMonitor
+from report_generator import ReportGenerator
+from rules_engine import RulesEngine, record_hits
+from secondary_faces import SecondaryFaceFilter
+from speaker_attribution import SpeakerAttributor
+from synthetic_sources import synthetic_frames, SyntheticAudioStream
+from voice_activity_detector import VoiceActivityDetector
+
+
+# Long-running leak check. The whole proctoring pipeline (frame ring, evidence
+# clips, detectors, tracker, confirmer, rules, report, journal, activity
+# monitor) is driven headless from synthetic camera and microphone sources on
+# a simulated clock, so hours of exam time pass in minutes. Memory is sampled
+# along the way and the run fails when RSS keeps growing after warm-up.
+
+def object_counts(limit=None):
+    # Live gc-tracked objects by type name
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return dict(counts.most_common(limit))
+
+
+def growth_slope(samples, key, warmup_fraction):
+    # Least-squares growth of samples[key] per simulated hour, warm-up samples ignored
+    skip = int(len(samples) * warmup_fraction)
+    points = [(s["sim_hours"], s[key]) for s in samples[skip:] if s.get(key) is not None]
+    if len(points) < 3:
+        return None
+    hours, values = np.array(points).T
+    if np.ptp(hours) == 0:
+        return None
+    return round(float(np.polyfit(hours, values, 1)[0]), 3)
+
+
+class SimulatedClock:
+    # Stands in for time.monotonic in every component that takes a clock or a "now"
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def __call__(self):
+        return self.now
+
+
+class SoakPipeline:
+    # The per-frame work of ProctoringSession.run without Qt, camera or microphone.
+    # Results go through the same consume_analysis and the tick's signals through
+    # one rules update, as in run(); step() itself mirrors run()'s loop body and
+    # has to follow it when stages are added or reordered there.
+    def __init__(self, clock, frames, yolo=None, gaze=True, detection_interval=3, face_scan_interval=10,
+                 qt_preview=False):
+        self.clock = clock
+        self.frames = frames
+        self.yolo = yolo
+        self.gaze = gaze
+        self.detection_interval = detection_interval
+        self.face_scan_interval = face_scan_interval
+        self.frame_index = 0
+
+        self.perf = PerfMonitor()
+        self.ring = SharedFrameRing(4, frames[0].shape)
+        self.audio = SyntheticAudioStream()
+        self.audio_started = clock()
+        self.voice = VoiceActivityDetector(stream=self.audio)
+        self.journal = EventJournal(session_journal_path("soak"))
+        self.clips = EvidenceClipBuffer(clock=clock)
+        self.clips.on_drop = functools.partial(self.perf.count_drop, "clip_buffer")
+        # Opens and closes a forbidden application now and then, switching focus each time
+        self.activity = BrowserLogger(journal=self.journal, backend=FakeActivityBackend(
+            [({1: "bash"}, ("Exam", 1)), ({1: "bash", 2: "discord"}, ("Discord", 2))] * 3
+            + [({1: "bash"}, ("Exam", 1))]), interval=0.5)
+        self.report = ReportGenerator("soak", journal=self.journal, clips=self.clips)
+        self.rules = RulesEngine()
+        self.confirmer = DetectionConfirmer()
+        self.tracker = ObjectTracker(on_retire=self.record_track)
+        self.face_filter = SecondaryFaceFilter()
+        self.speaker = SpeakerAttributor()
+        self.malpractice_details = []
+        self.malpractice_evidence_images = []
+        self.terminations = 0
+
+        self.preview = None
+        if qt_preview:
+            # Exercises the QImage/QPixmap conversion the GUI does for every frame
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            from PyQt5.QtGui import QImage, QPixmap
+            from PyQt5.QtWidgets import QApplication
+            self.qt_app = QApplication.instance() or QApplication([])
+            self.preview = lambda rgb: QPixmap.fromImage(
+                QImage(rgb.data, rgb.shape[1], rgb.shape[0], 3 * rgb.shape[1], QImage.Format_RGB888))
+
+        self.activity.start()
+
+    def step(self, seconds):
+        self.clock.advance(seconds)
+        perf = self.perf
+        run_yolo = self.yolo is not None and self.frame_index % self.detection_interval == 0
+        max_faces = 3 if self.gaze and self.face_scan_interval and self.frame_index % self.face_scan_interval == 0 else 0
+        frame = self.frames[self.frame_index % len(self.frames)]
+        self.frame_index += 1
+
+        with perf.stage("capture"):
+            ring_frame = self.ring.write(frame, timestamp=self.clock())
+        if ring_frame is None:
+            perf.count_drop("capture")
+            return
+        try:
+            with perf.stage("clip_buffer"):
+                self.clips.push(ring_frame.bgr, ring_frame.timestamp)
+            if self.preview:
+                with perf.stage("preview"):
+                    self.preview(ring_frame.rgb)
+
+            result = analyse_frame(ring_frame, self.yolo if run_yolo else None, gaze=self.gaze, max_faces=max_faces)
+            signals = consume_analysis(result, ring_frame.timestamp, perf, self.tracker, self.speaker,
+                                       self.face_filter, self.confirmer)
+
+            # The microphone delivers audio in real time, so read every chunk up to the simulated now
+            voice_detected = False
+            with perf.stage("voice"):
+                while self.audio.time() < self.clock() - self.audio_started:
+                    voice_detected = self.voice.is_voice_detected(
+                        current_time=self.audio_started + self.audio.time()) or voice_detected
+            with perf.stage("speaker_attribution"):
+                speech_source = self.speaker.classify(self.voice, self.clock())
+            signals.update(self.activity.status())
+            signals.update({"voice": voice_detected, "voice_active": self.voice.is_speaking,
+                            "speech_source": speech_source})
+            # One rules update per tick, as in ProctoringSession.run
+            self.apply_rules(signals, ring_frame)
+        finally:
+            self.ring.release(ring_frame.slot)
+
+    def apply_rules(self, signals, ring_frame):
+        hits = self.rules.update(signals, self.clock())
+        if hits:
+            with self.perf.stage("report_write"):
+                terminate = record_hits(hits, self.report, ring_frame.bgr, time.strftime("%Y-%m-%d %H:%M:%S"),
+                                        self.malpractice_details, self.malpractice_evidence_images)
+            # A real session would end here; the soak test counts it and carries on
+            self.terminations += int(terminate)
+
+    def record_track(self, track):
+        self.journal.record("track", f"{track.label} #{track.track_id} in view for {track.dwell:.1f}s",
+                            track_id=track.track_id, label=track.label, dwell=round(track.dwell, 2))
+
+    def counters(self):
+        return {
+            "events": len(self.report.events),
+            "gaze_events": len(self.report.gaze_events),
+            "voice_events": len(self.report.voice_events),
+            "system_events": len(self.report.system_events),
+            "clips_written": len(self.clips.written),
+            "clips_dropped": self.clips.dropped,
+            "clips_failed": self.clips.failed,
+            "activity_logs": len(self.activity.get_logs()),
+            "terminations": self.terminations,
+        }
+
+    def close(self):
+        self.tracker.close()
+        self.activity.close()
+        self.clips.close()
+        self.voice.close()
+        self.journal.close()
+        self.ring.close()
+
+
+def take_sample(pipeline, sim_hours, started, baseline_snapshot, top_allocators):
+    gc.collect()
+    sample = {
+        "sim_hours": round(sim_hours, 3),
+        "wall_seconds": round(time.monotonic() - started, 1),
+        "frames": pipeline.frame_index,
+        "rss_mb": current_rss_mb(),
+        "gc_objects": len(gc.get_objects()),
+    }
+    if baseline_snapshot is not None:
+        snapshot = tracemalloc.take_snapshot()
+        sample["traced_mb"] = round(tracemalloc.get_traced_memory()[0] / (1024 * 1024), 2)
+        sample["top_allocators"] = [
+            {"where": str(stat.traceback[0]), "size_kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+            for stat in snapshot.compare_to(baseline_snapshot, "lineno")[:top_allocators]
+        ]
+    sample.update(pipeline.counters())
+    return sample
+
+
+def run(hours=3.0, fps=10.0, sample_minutes=10.0, frame_count=60, seed=0, with_yolo=False, gaze=True,
+        detection_interval=3, trace=True, top_allocators=10, warmup_fraction=0.2, qt_preview=False, log=print):
+    frames = synthetic_frames(frame_count, seed=seed)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "simulated_hours": hours,
+            "fps": fps,
+            "sample_minutes": sample_minutes,
+            "source": f"synthetic(seed={seed})",
+            "warmup_fraction": warmup_fraction,
+        },
+        "skipped": {},
+        "samples": [],
+    }
+
+    yolo = None
+    if with_yolo:
+        try:
+            from yolo_detector import YOLODetector
+            yolo = YOLODetector()
+        except Exception as e:
+            results["skipped"]["yolo"] = f"{type(e).__name__}: {e}"
+    if gaze:
+        try:
+            import face_recognition_utils  # noqa: F401
+        except Exception as e:
+            results["skipped"]["gaze"] = f"{type(e).__name__}: {e}"
+            gaze = False
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # Report images, clips and the journal land in the scratch directory
+        os.chdir(workdir)
+        pipeline = None
+        try:
+            clock = SimulatedClock()
+            pipeline = SoakPipeline(clock, frames, yolo=yolo, gaze=gaze, detection_interval=detection_interval,
+                                    qt_preview=qt_preview)
+            total_frames = int(hours * 3600 * fps)
+            sample_every = max(1, int(sample_minutes * 60 * fps))
+            started = time.monotonic()
+            baseline = None
+            if trace:
+                tracemalloc.start()
+                baseline = tracemalloc.take_snapshot()
+
+            for i in range(total_frames + 1):
+                if i % sample_every == 0:
+                    sample = take_sample(pipeline, i / fps / 3600, started, baseline, top_allocators)
+                    results["samples"].append(sample)
+                    log(f"[{sample['sim_hours']:6.2f} h] rss {sample['rss_mb']} MB, "
+                        f"{sample['gc_objects']} objects, {sample['events']} events")
+                if i < total_frames:
+                    pipeline.step(1.0 / fps)
+
+            results["perf"] = pipeline.perf.snapshot()
+            results["final_objects"] = object_counts(25)
+        finally:
+            if trace and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            if pipeline:
+                pipeline.close()
+            os.chdir(cwd)
+
+    samples = results["samples"]
+    results["rss_slope_mb_per_hour"] = growth_slope(samples, "rss_mb", warmup_fraction)
+    results["traced_slope_mb_per_hour"] = growth_slope(samples, "traced_mb", warmup_fraction)
+    results["object_slope_per_hour"] = growth_slope(samples, "gc_objects", warmup_fraction)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the proctoring pipeline for hours of simulated exam time "
+                                                 "and fail if memory keeps growing.")
+    parser.add_argument("--hours", type=float, default=3.0, help="Simulated exam length")
+    parser.add_argument("--fps", type=float, default=10.0, help="Simulated camera frame rate")
+    parser.add_argument("--sample-minutes", type=float, default=10.0, help="Simulated minutes between memory samples")
+    parser.add_argument("--frames", type=int, default=60, help="Distinct synthetic frames to cycle through")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-yolo", action="store_true", help="Run object detection too (needs the YOLO weights)")
+    parser.add_argument("--no-gaze", action="store_true", help="Skip the face mesh detectors")
+    parser.add_argument("--detection-interval", type=int, default=3)
+    parser.add_argument("--qt-preview", action="store_true", help="Convert every frame to a QPixmap like the GUI")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Faster, but no per-line allocation report")
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites listed per sample")
+    parser.add_argument("--warmup", type=float, default=0.2, help="Fraction of samples ignored for the slope")
+    parser.add_argument("--max-rss-slope", type=float, default=5.0, help="Allowed RSS growth in MB per simulated hour")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    results = run(args.hours, args.fps, args.sample_minutes, args.frames, args.seed, args.with_yolo,
+                  not args.no_gaze, args.detection_interval, not args.no_tracemalloc, args.top, args.warmup,
+                  args.qt_preview, log=lambda line: print(line, file=sys.stderr))
+    slope = results["rss_slope_mb_per_hour"]
+    results["max_rss_slope_mb_per_hour"] = args.max_rss_slope
+    # Without three samples after warm-up there is no trend, and no trend is not a pass
+    results["passed"] = slope is not None and slope <= args.max_rss_slope
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if slope is None:
+        print("RSS growth unknown: fewer than 3 samples after warm-up, run longer or lower --sample-minutes: FAIL",
+              file=sys.stderr)
+    else:
+        print(f"RSS growth {slope} MB/h (limit {args.max_rss_slope}): {'PASS' if results['passed'] else 'FAIL'}",
+              file=sys.stderr)
+    if not results["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
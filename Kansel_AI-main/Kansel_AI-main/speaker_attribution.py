@@ -0,0 +1,76 @@
+import numpy as np
+
+CANDIDATE = "candidate"
+OFF_CAMERA = "off_camera"
+NOISE = "noise"
+SILENT = "none"
+
+
+# Decides who is behind the sound the VAD hears by lining up its chunk
+# energies with the candidate's mouth-opening series on the monotonic clock
+# both streams are stamped with. Over each window:
+#   - steady energy without the ups and downs of syllables is noise,
+#   - speech that rises and falls with the candidate's mouth is the candidate,
+#   - speech while the candidate's mouth stays still is someone off camera.
+# Both series are already produced by the loop; this adds one interpolation
+# and one correlation per window.
+class SpeakerAttributor:
+    def __init__(self, window=2.0, history=256, voiced_energy=400, noise_variation=0.2,
+                 min_correlation=0.3, mouth_movement=0.03, min_mouth_samples=4, interval=0.5):
+        self.window = window
+        self.voiced_energy = voiced_energy  # same scale as the VAD threshold
+        self.noise_variation = noise_variation  # energy std/mean below this is steady noise
+        self.min_correlation = min_correlation
+        self.mouth_movement = mouth_movement  # mouth ratio spread that counts as moving lips
+        self.min_mouth_samples = min_mouth_samples
+        self.interval = interval  # seconds between classifications
+
+        self.mouth_times = np.full(history, -np.inf)
+        self.mouth_ratios = np.zeros(history)
+        self.mouth_index = 0
+        self.last_run = -np.inf
+        self.label = SILENT
+
+    def add_mouth(self, timestamp, ratio):
+        if ratio is None:
+            return
+        self.mouth_times[self.mouth_index] = timestamp
+        self.mouth_ratios[self.mouth_index] = ratio
+        self.mouth_index = (self.mouth_index + 1) % len(self.mouth_times)
+
+    def classify(self, vad, now):
+        # Label for the last window; recomputed at most every interval seconds
+        if now - self.last_run < self.interval:
+            return self.label
+        self.last_run = now
+        self.label = self._classify(vad, now)
+        return self.label
+
+    def _classify(self, vad, now):
+        start = now - self.window
+        times, energy = vad.energy_window(start, now)
+        voiced = energy > self.voiced_energy
+        if voiced.sum() < 2:
+            return SILENT
+
+        levels = energy[voiced]
+        if levels.std() / levels.mean() < self.noise_variation:
+            return NOISE
+
+        keep = (self.mouth_times >= start) & (self.mouth_times <= now)
+        if keep.sum() < self.min_mouth_samples:
+            return OFF_CAMERA  # nobody visible to attribute the speech to
+        order = np.argsort(self.mouth_times[keep])
+        mouth_times = self.mouth_times[keep][order]
+        mouth = self.mouth_ratios[keep][order]
+
+        # Lips that barely move while someone talks belong to a listener
+        speaking = mouth[mouth_times >= times[voiced][0]]
+        if len(speaking) < 2 or np.ptp(speaking) < self.mouth_movement:
+            return OFF_CAMERA
+
+        mouth_at_audio = np.interp(times, mouth_times, mouth)
+        correlation = np.corrcoef(mouth_at_audio, energy)[0, 1]
+        if np.isnan(correlation) or correlation < self.min_correlation:
+            return OFF_CAMERA
+        return CANDIDATE
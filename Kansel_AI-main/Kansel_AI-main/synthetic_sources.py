@@ -0,0 +1,83 @@
+import numpy as np
+import cv2
+
+
+# Deterministic stand-ins for the camera and microphone, so the pipeline can be
+# driven headless (benchmarks, soak tests) with no hardware attached.
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    # A lit background, a face-like blob and a drifting rectangle; the same seed gives the same frames
+    rng = np.random.default_rng(seed)
+    base = np.tile(np.linspace(60, 200, width, dtype=np.uint8), (height, 1))
+    base = cv2.merge([base, base, base])
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        cx = width // 2 + int(20 * np.sin(i / 7.0))
+        cv2.ellipse(frame, (cx, height // 2), (70, 95), 0, 0, 360, (140, 170, 210), -1)
+        cv2.circle(frame, (cx - 28, height // 2 - 20), 9, (40, 40, 40), -1)
+        cv2.circle(frame, (cx + 28, height // 2 - 20), 9, (40, 40, 40), -1)
+        x = (i * 11) % (width - 60)
+        cv2.rectangle(frame, (x, height - 120), (x + 50, height - 30), (30, 30, 30), -1)
+        noise = rng.integers(0, 12, size=frame.shape, dtype=np.uint8)
+        frames.append(cv2.add(frame, noise))
+    return frames
+
+
+class SyntheticCamera:
+    # cv2.VideoCapture look-alike cycling through pre-rendered frames
+    def __init__(self, frames=None, count=60, width=640, height=480, seed=0, limit=None):
+        self.frames = frames or synthetic_frames(count, width, height, seed)
+        self.index = 0
+        self.limit = limit
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        if self.limit is not None and self.index >= self.limit:
+            return False, None
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame.copy()
+
+    def grab(self):
+        ok, _ = self.read()
+        return ok
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        return 0.0
+
+    def release(self):
+        pass
+
+
+class SyntheticAudioStream:
+    # pyaudio stream look-alike: quiet room noise with periodic bursts of "speech"
+    def __init__(self, sample_rate=16000, speech_every=10.0, speech_length=4.0, seed=0):
+        self.sample_rate = sample_rate
+        self.speech_every = speech_every
+        self.speech_length = speech_length
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+
+    def read(self, num_frames, exception_on_overflow=False):
+        t = self.position / self.sample_rate
+        self.position += num_frames
+        samples = self.rng.normal(0, 3, num_frames)
+        if self.speech_every and (t % self.speech_every) < self.speech_length:
+            phase = np.arange(num_frames) / self.sample_rate + t
+            samples += 900 * np.sin(2 * np.pi * 220 * phase)
+        return samples.astype(np.int16).tobytes()
+
+    def time(self):
+        return self.position / self.sample_rate
+
+    def close(self):
+        pass
@@ -0,0 +1,108 @@
+import json
+import subprocess
+
+import browser_logger
+from browser_logger import BrowserLogger, FakeActivityBackend, ProcfsBackend
+
+
+class RecordingJournal:
+    def __init__(self):
+        self.records = []
+
+    def record(self, event_type, message, timestamp=None, **fields):
+        self.records.append((event_type, fields))
+
+
+def sample_all(steps):
+    journal = RecordingJournal()
+    logger = BrowserLogger(journal=journal, backend=FakeActivityBackend(steps))
+    for _ in steps:
+        logger.sample()
+    return logger, [event_type for event_type, _ in journal.records]
+
+
+def test_forbidden_app_reported_once_while_running():
+    steps = [
+        ({1: "bash"}, None),
+        ({1: "bash", 2: "discord"}, None),
+        ({1: "bash", 2: "discord"}, None),
+    ]
+    logger, events = sample_all(steps)
+    assert events == ["forbidden_app"]
+    assert logger.status()["forbidden_apps"] == 1
+    assert logger.status()["forbidden_app_names"] == "discord"
+
+
+def test_forbidden_app_closed():
+    steps = [
+        ({1: "bash", 2: "Zoom"}, None),
+        ({1: "bash"}, None),
+    ]
+    logger, events = sample_all(steps)
+    assert events == ["forbidden_app", "forbidden_app_closed"]
+    assert logger.status()["forbidden_apps"] == 0
+    assert logger.status()["forbidden_app_names"] == ""
+
+
+def test_allowed_apps_are_ignored():
+    logger, events = sample_all([({1: "bash"}, None), ({1: "bash", 3: "firefox"}, None)])
+    assert events == []
+    assert logger.status()["forbidden_apps"] == 0
+
+
+def test_focus_switches_are_counted():
+    processes = {10: "exam-browser", 11: "gedit"}
+    steps = [
+        (processes, ("Exam", 10)),
+        (processes, ("Exam", 10)),
+        (processes, ("notes.txt", 11)),
+        (processes, ("Exam", 10)),
+        (processes, None),  # window unknown: not a switch
+    ]
+    journal = RecordingJournal()
+    logger = BrowserLogger(journal=journal, backend=FakeActivityBackend(steps))
+    for _ in steps:
+        logger.sample()
+
+    switches = [fields for event_type, fields in journal.records if event_type == "window_switch"]
+    assert [s["title"] for s in switches] == ["notes.txt", "Exam"]
+    assert switches[0]["app"] == "gedit"
+    assert logger.status()["window_switches"] == 2
+    assert logger.samples == len(steps)
+
+
+def fake_tools(monkeypatch, tools, output):
+    monkeypatch.setattr(browser_logger.shutil, "which", lambda name: name if name in tools else None)
+    monkeypatch.setattr(browser_logger.subprocess, "run",
+                        lambda args, **kwargs: subprocess.CompletedProcess(args, 0, stdout=output))
+
+
+def test_wayland_focus_comes_from_sway(monkeypatch):
+    tree = {"nodes": [{"nodes": [
+        {"name": "Exam", "pid": 10, "focused": False},
+        {"name": "Discord", "pid": 20, "focused": True},
+    ], "floating_nodes": []}]}
+    fake_tools(monkeypatch, {"swaymsg", "xdotool"}, json.dumps(tree))
+    backend = ProcfsBackend(environ={"WAYLAND_DISPLAY": "wayland-1", "DISPLAY": ":0", "SWAYSOCK": "/run/sway"})
+    assert backend.window_tool == "swaymsg"
+    assert backend.focused_window() == ("Discord", 20)
+
+
+def test_wayland_focus_comes_from_hyprland(monkeypatch):
+    fake_tools(monkeypatch, {"hyprctl"}, json.dumps({"title": "Exam", "pid": 10}))
+    backend = ProcfsBackend(environ={"XDG_SESSION_TYPE": "wayland", "HYPRLAND_INSTANCE_SIGNATURE": "abc"})
+    assert backend.focused_window() == ("Exam", 10)
+    fake_tools(monkeypatch, {"hyprctl"}, "Invalid")
+    assert backend.focused_window() is None
+
+
+def test_unsupported_wayland_compositor_is_journaled_once(monkeypatch):
+    fake_tools(monkeypatch, {"xdotool"}, "")
+    backend = ProcfsBackend(environ={"WAYLAND_DISPLAY": "wayland-0", "DISPLAY": ":0"})
+    assert backend.window_tool is None  # xdotool would only see XWayland windows
+    assert "Wayland" in backend.window_unavailable
+
+    journal = RecordingJournal()
+    logger = BrowserLogger(journal=journal, backend=backend, interval=60.0).start()
+    logger.close()
+    assert [event_type for event_type, _ in journal.records] == ["focus_tracking_unavailable"]
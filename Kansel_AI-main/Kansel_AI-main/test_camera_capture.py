@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+import pytest
+
+import camera_capture
+from camera_capture import CameraCapture
+
+
+class FakeVideoCapture:
+    # A camera delivering a frame every 5 ms; decoding can be made to fail
+    grabs = True
+    decodes = True
+
+    def __init__(self, device):
+        self.count = 0
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        return 0.0
+
+    def grab(self):
+        time.sleep(0.005)
+        self.count += 1
+        return self.grabs
+
+    def retrieve(self, image=None):
+        if not self.decodes:
+            return False, None
+        frame = np.full((4, 4, 3), self.count % 255, dtype=np.uint8)
+        if image is not None:
+            image[:] = frame
+            return True, image
+        return True, frame
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def camera(monkeypatch):
+    monkeypatch.setattr(FakeVideoCapture, "grabs", True)
+    monkeypatch.setattr(FakeVideoCapture, "decodes", True)
+    monkeypatch.setattr(camera_capture.cv2, "VideoCapture", FakeVideoCapture)
+    cap = CameraCapture()
+    drops, skips = [], []
+    cap.on_drop, cap.on_skip = drops.append, skips.append
+    assert cap.open()
+    yield cap, drops, skips
+    cap.release()
+
+
+def test_unread_grabs_are_skips_not_drops(camera):
+    cap, drops, skips = camera
+    for _ in range(3):
+        ok, frame = cap.read()
+        assert ok and frame.shape == (4, 4, 3)
+        time.sleep(0.05)  # a busy loop: the grabber keeps flushing frames meanwhile
+    stats = cap.stats()
+    assert stats["decoded"] == 3
+    assert stats["skipped"] > 3 and len(skips) == stats["skipped"]
+    assert stats["dropped"] == 0 and drops == []
+
+
+def test_requested_frame_that_fails_to_decode_is_a_drop(camera):
+    cap, drops, _ = camera
+    FakeVideoCapture.decodes = False
+    assert cap.read() == (False, None)
+    assert cap.stats()["dropped"] == 1 and drops == [1]
+
+
+def test_requested_frame_that_never_arrives_is_a_drop(camera):
+    cap, drops, _ = camera
+    FakeVideoCapture.grabs = False
+    assert cap.read(timeout=0.05) == (False, None)
+    assert drops == [1]
+    cap.release()
+    assert cap.read() == (False, None)  # reading a released camera loses nothing
+    assert drops == [1]
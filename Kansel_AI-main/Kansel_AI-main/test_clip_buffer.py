@@ -0,0 +1,98 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+from clip_buffer import EvidenceClipBuffer, capture_clip_tail
+from frame_ring import SharedFrameRing
+
+
+def push_frames(clips, start, end, step, base):
+    # Waits for the encoder after every frame so none is dropped
+    t = start
+    while t <= end:
+        clips.push(np.zeros((48, 64, 3), dtype=np.uint8), base + t)
+        while not clips.incoming.empty():
+            time.sleep(0.001)
+        t += step
+
+
+def frame_count(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+
+def test_clip_spans_pre_and_post_seconds_around_the_event(tmp_path):
+    # Timestamps well ahead of the monotonic clock, so only the frames decide when a clip is due
+    base = float(int(time.monotonic())) + 1000.0
+    clips = EvidenceClipBuffer(pre_seconds=2.0, post_seconds=1.0, fps=4.0)
+    path = str(tmp_path / "event.mp4")
+    assert clips.request_clip(path, at=base + 3.0) == path
+    # 8 fps offered, 4 fps kept: frames at 1.0, 1.25, ... 4.0 fall in the window
+    push_frames(clips, 0.0, 5.0, 0.125, base)
+    clips.close()
+    assert clips.written == [path]
+    assert frame_count(path) == 13
+
+
+def test_clip_waits_for_its_post_event_frames(tmp_path):
+    base = float(int(time.monotonic())) + 1000.0
+    clips = EvidenceClipBuffer(pre_seconds=1.0, post_seconds=2.0, fps=4.0)
+    path = str(tmp_path / "event.mp4")
+    clips.request_clip(path, at=base + 1.0)
+    push_frames(clips, 0.0, 2.5, 0.25, base)
+    time.sleep(0.3)
+    assert clips.written == []  # the frame at 3.0 has not arrived yet
+    push_frames(clips, 2.75, 3.0, 0.25, base)
+    deadline = time.monotonic() + 5.0
+    while not clips.written and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert clips.written == [path]
+    clips.close()
+    assert frame_count(path) == 13
+
+
+class FakeCamera:
+    # Delivers a frame every 50 ms into the buffer it is handed, like CameraCapture.read
+    def __init__(self):
+        self.reads = 0
+
+    def read(self, image=None):
+        time.sleep(0.05)
+        self.reads += 1
+        image[:] = self.reads % 255
+        return True, image
+
+
+def test_tail_capture_feeds_the_last_clip_its_post_event_frames(tmp_path):
+    clips = EvidenceClipBuffer(pre_seconds=0.5, post_seconds=0.5, fps=10.0)
+    ring = SharedFrameRing(2, (48, 64, 3))
+    camera = FakeCamera()
+    try:
+        assert capture_clip_tail(clips, ring, camera) is None and camera.reads == 0  # nothing pending
+        path = clips.request_clip(str(tmp_path / "final.mp4"))
+        event_end = clips.pending_until()
+        capture_clip_tail(clips, ring, camera)
+        assert time.monotonic() >= event_end
+        assert camera.reads >= 5
+        assert ring.refcounts == [0, 0]
+        clips.close()
+        assert clips.written == [path]
+        assert frame_count(path) >= 5
+    finally:
+        ring.close()
+
+
+def test_no_clip_without_frames_in_the_window(tmp_path):
+    base = float(int(time.monotonic())) + 1000.0
+    clips = EvidenceClipBuffer(pre_seconds=1.0, post_seconds=1.0, fps=4.0)
+    path = str(tmp_path / "event.mp4")
+    clips.request_clip(path, at=base + 100.0)
+    push_frames(clips, 0.0, 1.0, 0.25, base)
+    clips.close()
+    assert clips.written == []
+    assert not os.path.exists(path)
@@ -0,0 +1,72 @@
+from detection_confirmer import DetectionConfirmer, box_iou, region_confirms
+
+
+def phone(x=100, y=100):
+    return {"label": "cell phone", "confidence": 0.9, "box": [x, y, 40, 80]}
+
+
+def person():
+    return {"label": "person", "confidence": 0.9, "box": [0, 0, 200, 400]}
+
+
+def labels(detections):
+    return [obj["label"] for obj in detections]
+
+
+def test_box_iou():
+    assert box_iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert box_iou([0, 0, 10, 10], [5, 0, 10, 10]) == 50 / 150
+    assert box_iou([0, 0, 10, 10], [20, 20, 5, 5]) == 0.0
+
+
+def test_object_needs_k_of_the_last_n_runs():
+    confirmer = DetectionConfirmer(k=3, n=5)
+    runs = [[phone()], [], [phone(102, 101)], [], [phone(104, 99)], [phone()]]
+    passed = [labels(confirmer.update(detections)) for detections in runs]
+    assert passed == [[], [], [], [], ["cell phone"], ["cell phone"]]
+
+
+def test_other_labels_pass_straight_through():
+    confirmer = DetectionConfirmer(k=3, n=5)
+    assert labels(confirmer.update([person(), phone()])) == ["person"]
+
+
+def test_boxes_that_do_not_overlap_are_separate_candidates():
+    confirmer = DetectionConfirmer(k=2, n=3, iou_threshold=0.3)
+    assert confirmer.update([phone(0, 0)]) == []
+    assert confirmer.update([phone(300, 300)]) == []  # somewhere else: a new candidate
+    assert len(confirmer.candidates) == 2
+    assert labels(confirmer.update([phone(300, 300)])) == ["cell phone"]
+
+
+def test_candidates_not_seen_for_n_runs_are_forgotten():
+    confirmer = DetectionConfirmer(k=2, n=3)
+    confirmer.update([phone()])
+    for _ in range(3):
+        confirmer.update([])
+    assert confirmer.candidates == []
+    assert confirmer.update([phone()]) == []  # starts over
+
+
+def test_recheck_is_asked_once_and_a_rejection_starts_over():
+    answers = [False, True]
+    asked = []
+
+    def recheck(label, box):
+        asked.append(label)
+        return answers[len(asked) - 1]
+
+    confirmer = DetectionConfirmer(k=2, n=5)
+    assert confirmer.update([phone()], recheck) == []
+    assert confirmer.update([phone()], recheck) == []  # k reached, recheck says no
+    assert confirmer.rejected == 1 and confirmer.candidates == []
+    assert confirmer.update([phone()], recheck) == []
+    assert labels(confirmer.update([phone()], recheck)) == ["cell phone"]
+    assert labels(confirmer.update([phone()], recheck)) == ["cell phone"]  # not asked again
+    assert asked == ["cell phone", "cell phone"]
+
+
+def test_region_confirms():
+    assert region_confirms([phone(105, 100)], "cell phone", [100, 100, 40, 80])
+    assert not region_confirms([phone(105, 100)], "book", [100, 100, 40, 80])
+    assert not region_confirms([], "cell phone", [100, 100, 40, 80])
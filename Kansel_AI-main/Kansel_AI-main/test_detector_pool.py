@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+
+from detector_pool import DetectorPool
+from frame_ring import SharedFrameRing
+
+SHAPE = (24, 32, 3)
+
+
+def poll_all(pool, count, timeout=30.0):
+    finished = []
+    deadline = time.monotonic() + timeout
+    while len(finished) < count and time.monotonic() < deadline:
+        finished += pool.poll(timeout=0.5)
+    return finished
+
+
+def test_submitted_slots_are_held_until_released():
+    ring = SharedFrameRing(4, SHAPE)
+    pool = DetectorPool(ring, processes=2, detectors=())
+    try:
+        frames = [ring.write(np.full(SHAPE, i, dtype=np.uint8)) for i in range(3)]
+        for ring_frame in frames:
+            assert pool.submit(ring_frame)
+            ring.release(ring_frame.slot)  # the loop's own reference
+        assert all(ring.refcounts[f.slot] == 1 for f in frames)
+
+        finished = poll_all(pool, len(frames))
+        assert sorted(f.frame_id for f, _ in finished) == [f.frame_id for f in frames]
+        assert pool.in_flight == 0
+        for ring_frame, _ in finished:
+            pool.release(ring_frame)
+        assert ring.refcounts == [0, 0, 0, 0]
+    finally:
+        pool.close()
+        ring.close()
+
+
+def test_frames_are_skipped_while_the_workers_are_saturated():
+    ring = SharedFrameRing(4, SHAPE)
+    pool = DetectorPool(ring, processes=1, detectors=(), max_pending=1)
+    try:
+        first = ring.write(np.zeros(SHAPE, dtype=np.uint8))
+        second = ring.write(np.zeros(SHAPE, dtype=np.uint8))
+        assert pool.submit(first)
+        assert not pool.submit(second)
+        assert pool.skipped_frames == 1
+        assert ring.refcounts[second.slot] == 1  # a skipped frame is not retained
+
+        for ring_frame, _ in poll_all(pool, 1):
+            pool.release(ring_frame)
+        assert pool.submit(second)
+        for ring_frame, _ in poll_all(pool, 1):
+            pool.release(ring_frame)
+    finally:
+        pool.close()
+        ring.close()
@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+
+from face_index import FaceIndex, register_identity
+
+DIM = 8
+
+
+def encodings(count, seed=1):
+    # Clustered like real face encodings: a few people, several photos each
+    rng = np.random.default_rng(seed)
+    people = rng.normal(size=(max(1, count // 4), DIM))
+    return (people[np.arange(count) % len(people)] + rng.normal(scale=0.05, size=(count, DIM))).astype(np.float32)
+
+
+def small_index(folder, **options):
+    options = {"dim": DIM, "probes": 4, "min_train": 64, "initial_capacity": 16, **options}
+    return FaceIndex(str(folder), **options)
+
+
+def test_query_returns_the_closest_entries_first(tmp_path):
+    index = small_index(tmp_path)
+    rows = encodings(10)
+    for i, encoding in enumerate(rows):
+        index.add(encoding, candidate=f"c{i}")
+    results = index.query(rows[3] + 0.001, k=2)
+    assert [row for _, row, _ in results][0] == 3
+    assert results[0][2] == {"candidate": "c3"}
+    assert results[0][0] <= results[1][0]
+    assert index.query(rows[3] + 10.0, k=2, max_distance=0.5) == []
+
+
+def test_index_grows_and_survives_reopening(tmp_path):
+    index = small_index(tmp_path)
+    rows = encodings(40)
+    for i, encoding in enumerate(rows):
+        index.add(encoding, candidate=f"c{i}")
+    index.close()
+    assert index.capacity == 64
+
+    reopened = small_index(tmp_path)
+    assert len(reopened) == 40
+    assert reopened.query(rows[37], k=1)[0][1:] == (37, {"candidate": "c37"})
+
+
+def test_unfinished_insert_is_dropped_on_reopen(tmp_path):
+    index = small_index(tmp_path)
+    for encoding in encodings(5):
+        index.add(encoding, candidate="a")
+    index.close()
+    with open(tmp_path / "entries.jsonl", "a") as f:
+        f.write('{"candidate": "half written"}\n')
+    reopened = small_index(tmp_path)
+    assert len(reopened) == 5
+    assert len((tmp_path / "entries.jsonl").read_text().splitlines()) == 5
+
+
+def test_trained_index_finds_the_same_rows_as_an_exact_search(tmp_path):
+    index = small_index(tmp_path)
+    rows = encodings(200)
+    for i, encoding in enumerate(rows):
+        index.add(encoding, candidate=f"c{i}")
+        index.wait_for_training()
+    assert index.centroids is not None
+    assert index.trained_at == 128  # refitted at 64 and again at 128
+    for row in (0, 63, 64, 150, 199):  # trained rows and rows added since
+        assert index.query(rows[row], k=1)[0][1] == row
+        assert index.query(rows[row], k=1) == index.query(rows[row], k=1, exact=True)
+
+
+def test_add_does_not_wait_for_a_refit_and_queries_keep_working(tmp_path, monkeypatch):
+    index = small_index(tmp_path)
+    rows = encodings(100)
+    release = threading.Event()
+    fit = index._fit
+
+    def slow_fit(matrix, count):
+        release.wait(5.0)
+        return fit(matrix, count)
+
+    monkeypatch.setattr(index, "_fit", slow_fit)
+    for i, encoding in enumerate(rows):
+        index.add(encoding, candidate=f"c{i}")  # the refit started at 64 is still held
+    assert index.training is not None and index.centroids is None
+    assert index.query(rows[80], k=1)[0][1] == 80
+
+    release.set()
+    index.wait_for_training()
+    assert index.trained_at == 64 and index.centroids is not None
+    for row in (10, 63, 64, 99):  # rows added during the refit sit in the new tail
+        assert index.query(rows[row], k=1) == index.query(rows[row], k=1, exact=True)
+    index.close()
+    assert small_index(tmp_path).trained_at == 64
+
+
+def test_register_identity_reports_other_names_and_indexes_each_photo_once(tmp_path):
+    index = small_index(tmp_path)
+    face = encodings(1)[0]
+    assert register_identity(index, face, "alice", "profiles/alice.jpg") == []
+    assert register_identity(index, face, "alice", "profiles/alice.jpg") == []
+    assert len(index) == 1
+
+    matches = register_identity(index, face + 0.01, "bob", "profiles/bob.jpg")
+    assert [entry["candidate"] for _, entry in matches] == ["alice"]
+    assert len(index) == 2
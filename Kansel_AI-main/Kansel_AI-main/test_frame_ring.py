@@ -0,0 +1,94 @@
+import numpy as np
+
+from frame_ring import SharedFrameRing
+
+SHAPE = (24, 32, 3)
+
+
+def frame(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+def test_slots_are_handed_out_in_ring_order_and_reused_once_free():
+    ring = SharedFrameRing(3, SHAPE)
+    try:
+        first = [ring.write(frame(i)) for i in range(3)]
+        assert [f.slot for f in first] == [0, 1, 2]
+        assert [f.frame_id for f in first] == [0, 1, 2]
+
+        # Every slot is reserved: the next frame is dropped, not written over a frame in use
+        assert ring.write(frame(9)) is None
+        assert ring.dropped_frames == 1
+
+        ring.release(1)
+        reused = ring.write(frame(7), timestamp=12.5)
+        assert reused.slot == 1
+        assert reused.frame_id == 3
+        assert reused.timestamp == 12.5
+        assert int(reused.bgr[0, 0, 0]) == 7
+    finally:
+        ring.close()
+
+
+def test_retained_slot_is_not_reused_until_every_holder_released_it():
+    ring = SharedFrameRing(2, SHAPE)
+    try:
+        held = ring.write(frame(1))
+        ring.retain(held.slot)  # e.g. submitted to a worker
+        ring.release(held.slot)  # the loop is done with it
+        other = ring.write(frame(2))
+        ring.release(other.slot)
+
+        assert ring.write(frame(3)).slot == other.slot
+        ring.release(other.slot)
+        ring.release(held.slot)  # the worker is done too
+        assert ring.write(frame(4)).slot == held.slot
+    finally:
+        ring.close()
+
+
+def test_frame_goes_stale_when_its_slot_is_rewritten():
+    ring = SharedFrameRing(1, SHAPE)
+    try:
+        old = ring.write(frame(1))
+        assert old.is_current()
+        ring.release(old.slot)
+        ring.write(frame(2))
+        assert not old.is_current()
+    finally:
+        ring.close()
+
+
+def test_views_are_read_only_and_derived_variants_follow_the_frame():
+    ring = SharedFrameRing(1, SHAPE)
+    try:
+        image = frame(0)
+        image[..., 2] = 200  # red in BGR
+        ring_frame = ring.write(image)
+        assert not ring_frame.bgr.flags.writeable
+        rgb = ring_frame.rgb
+        assert int(rgb[0, 0, 0]) == 200 and not rgb.flags.writeable
+        assert ring_frame.rgb is rgb  # computed once per frame
+        assert ring_frame.small.shape == (12, 16, 3)
+
+        ring.release(ring_frame.slot)
+        newer = ring.write(frame(50))
+        assert int(newer.rgb[0, 0, 0]) == 50
+    finally:
+        ring.close()
+
+
+def test_attached_ring_reads_the_same_memory():
+    ring = SharedFrameRing(2, SHAPE)
+    try:
+        written = ring.write(frame(42), timestamp=3.0)
+        attached = SharedFrameRing.attach(ring.descriptor())
+        try:
+            seen = attached.frame(written.slot)
+            assert seen.frame_id == written.frame_id
+            assert seen.timestamp == 3.0
+            assert int(seen.bgr[5, 5, 1]) == 42
+        finally:
+            attached.close()
+    finally:
+        ring.close()
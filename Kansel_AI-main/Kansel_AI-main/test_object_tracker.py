@@ -0,0 +1,73 @@
+from object_tracker import ObjectTracker
+
+
+def detection(label, x, y, w=60, h=120):
+    return {"label": label, "confidence": 0.8, "box": [x, y, w, h]}
+
+
+def test_same_object_keeps_its_id_across_runs():
+    tracker = ObjectTracker(min_hits=2)
+    assert tracker.update([detection("person", 100, 50)], now=0.0) == []  # not confirmed yet
+    confirmed = tracker.update([detection("person", 104, 52)], now=0.1)
+    assert [t.track_id for t in confirmed] == [1]
+    confirmed = tracker.update([detection("person", 108, 54)], now=0.2)
+    assert [t.track_id for t in confirmed] == [1]
+    assert confirmed[0].hits == 3
+    assert round(confirmed[0].dwell, 3) == 0.2
+
+
+def test_new_objects_get_new_ids_and_labels_do_not_mix():
+    tracker = ObjectTracker()
+    tracker.update([detection("person", 100, 50), detection("cell phone", 300, 200, 30, 60)], now=0.0)
+    # A phone where the person was is not the person
+    tracker.update([detection("cell phone", 100, 50)], now=0.1)
+    assert sorted((t.track_id, t.label) for t in tracker.tracks) == [
+        (1, "person"), (2, "cell phone"), (3, "cell phone")]
+
+
+def test_untracked_labels_are_ignored():
+    tracker = ObjectTracker()
+    tracker.update([detection("chair", 0, 0)], now=0.0)
+    assert tracker.tracks == []
+
+
+def test_track_is_retired_after_max_misses():
+    retired = []
+    tracker = ObjectTracker(max_misses=2, min_hits=2, on_retire=retired.append)
+    tracker.update([detection("book", 10, 10)], now=0.0)
+    tracker.update([detection("book", 10, 10)], now=1.0)
+    tracker.update([], now=2.0)
+    tracker.update([], now=3.0)
+    assert retired == [] and len(tracker.tracks) == 1
+    tracker.update([], now=4.0)
+    assert [t.track_id for t in retired] == [1]
+    assert retired[0].dwell == 1.0
+    assert tracker.tracks == []
+
+
+def test_unconfirmed_tracks_retire_silently():
+    retired = []
+    tracker = ObjectTracker(max_misses=0, min_hits=2, on_retire=retired.append)
+    tracker.update([detection("book", 10, 10)], now=0.0)
+    tracker.update([], now=1.0)
+    assert tracker.tracks == [] and retired == []
+
+
+def test_predict_moves_boxes_between_detector_runs():
+    tracker = ObjectTracker()
+    for i in range(5):
+        tracker.update([detection("person", 100 + 10 * i, 50)], now=i * 0.1)
+    x_before = tracker.tracks[0].box[0]
+    tracker.predict()
+    assert tracker.tracks[0].box[0] > x_before
+
+
+def test_close_hands_over_remaining_tracks_and_max_dwell():
+    retired = []
+    tracker = ObjectTracker(min_hits=1, on_retire=retired.append)
+    tracker.update([detection("cell phone", 10, 10), detection("person", 200, 10)], now=0.0)
+    tracker.update([detection("cell phone", 10, 10), detection("person", 200, 10)], now=2.5)
+    assert tracker.max_dwell({"cell phone", "book"}) == 2.5
+    tracker.close()
+    assert sorted(t.label for t in retired) == ["cell phone", "person"]
+    assert tracker.tracks == []
@@ -0,0 +1,63 @@
+import otp_manager
+from otp_manager import OTPManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wrong_code(code):
+    return str((int(code) + 1) % 10 ** len(code)).zfill(len(code))
+
+
+def test_code_is_single_use():
+    otp = OTPManager(clock=FakeClock())
+    code = otp.issue("Candidate@Example.com")
+    assert len(code) == 6 and code.isdigit()
+    assert otp.verify("candidate@example.com", code) == otp_manager.OK
+    assert otp.verify("candidate@example.com", code) == otp_manager.MISSING
+
+
+def test_code_expires():
+    clock = FakeClock()
+    otp = OTPManager(ttl=300.0, clock=clock)
+    code = otp.issue("a@example.com")
+    clock.now = 300.0
+    assert otp.verify("a@example.com", wrong_code(code)) == otp_manager.WRONG
+    clock.now = 300.5
+    assert otp.verify("a@example.com", code) == otp_manager.EXPIRED
+    assert otp.verify("a@example.com", code) == otp_manager.MISSING
+
+
+def test_lockout_after_max_attempts():
+    otp = OTPManager(max_attempts=3, clock=FakeClock())
+    code = otp.issue("a@example.com")
+    assert otp.verify("a@example.com", wrong_code(code)) == otp_manager.WRONG
+    assert otp.attempts_left("a@example.com") == 2
+    assert otp.verify("a@example.com", wrong_code(code)) == otp_manager.WRONG
+    assert otp.verify("a@example.com", wrong_code(code)) == otp_manager.LOCKED
+    # The right code is no use once the code has been withdrawn
+    assert otp.verify("a@example.com", code) == otp_manager.MISSING
+    assert otp.attempts_left("a@example.com") == 0
+
+
+def test_reissue_replaces_code_and_resets_attempts():
+    otp = OTPManager(max_attempts=2, clock=FakeClock())
+    first = otp.issue("a@example.com")
+    otp.verify("a@example.com", wrong_code(first))
+    second = otp.issue("a@example.com")
+    assert otp.attempts_left("a@example.com") == 2
+    if first != second:
+        assert otp.verify("a@example.com", first) == otp_manager.WRONG
+    assert otp.verify("a@example.com", " " + second + "\n") == otp_manager.OK
+
+
+def test_revoke():
+    otp = OTPManager(clock=FakeClock())
+    code = otp.issue("a@example.com")
+    otp.revoke("A@example.com")
+    assert otp.verify("a@example.com", code) == otp_manager.MISSING
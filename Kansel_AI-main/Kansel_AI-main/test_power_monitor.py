@@ -0,0 +1,53 @@
+from power_monitor import NORMAL, POWER_SAVING, FakePowerSource, PowerMonitor
+
+
+def reading(on_battery=False, temperature_c=50.0, max_freq_ratio=1.0, throttle_events=0):
+    return {"on_battery": on_battery, "battery_percent": 80, "temperature_c": temperature_c,
+            "max_freq_ratio": max_freq_ratio, "throttle_events": throttle_events}
+
+
+def modes(readings, interval=5.0):
+    # Mode after each reading, one reading per interval
+    monitor = PowerMonitor(FakePowerSource(readings), interval=interval)
+    result = []
+    for i in range(len(readings)):
+        monitor.observe(i * interval)
+        result.append(monitor.mode)
+    return result
+
+
+def test_temperature_hysteresis():
+    temperatures = [70, 84, 85, 80, 76, 75, 74, 84]
+    assert modes([reading(temperature_c=t) for t in temperatures]) == [
+        NORMAL, NORMAL, POWER_SAVING, POWER_SAVING, POWER_SAVING, POWER_SAVING, NORMAL, NORMAL]
+
+
+def test_battery_and_mains():
+    readings = [reading(), reading(on_battery=True), reading(on_battery=True), reading()]
+    assert modes(readings) == [NORMAL, POWER_SAVING, POWER_SAVING, NORMAL]
+
+
+def test_unplugged_but_hot_stays_saving():
+    readings = [reading(on_battery=True, temperature_c=90), reading(temperature_c=80), reading(temperature_c=70)]
+    assert modes(readings) == [POWER_SAVING, POWER_SAVING, NORMAL]
+
+
+def test_throttling():
+    readings = [reading(max_freq_ratio=0.6), reading(), reading(throttle_events=3), reading()]
+    assert modes(readings) == [POWER_SAVING, NORMAL, POWER_SAVING, NORMAL]
+
+
+def test_observe_reads_once_per_interval_and_reports_changes():
+    monitor = PowerMonitor(FakePowerSource([reading(on_battery=True), reading()]), interval=5.0)
+    assert monitor.observe(0.0) == POWER_SAVING
+    assert "on battery (80%)" in monitor.last_reason
+    assert monitor.observe(1.0) is None  # too soon, source not read
+    assert monitor.source.index == 1
+    assert monitor.observe(5.0) == NORMAL
+    assert monitor.last_reason == "plugged in and cool"
+
+
+def test_missing_readings_do_not_trigger_saving():
+    empty = {"on_battery": None, "battery_percent": None, "temperature_c": None,
+             "max_freq_ratio": None, "throttle_events": None}
+    assert modes([empty, empty]) == [NORMAL, NORMAL]
@@ -0,0 +1,63 @@
+from rules_engine import RulesEngine
+
+
+def names(hits):
+    return [hit.name for hit in hits]
+
+
+def test_fires_once_per_onset():
+    engine = RulesEngine([{"name": "phone", "when": [["object_count", ">", 0]]}])
+    assert names(engine.update({"object_count": 1}, 0.0)) == ["phone"]
+    assert names(engine.update({"object_count": 1}, 1.0)) == []
+    assert names(engine.update({"object_count": 0}, 2.0)) == []
+    assert names(engine.update({"object_count": 2}, 3.0)) == ["phone"]
+
+
+def test_for_needs_conditions_to_hold_continuously():
+    engine = RulesEngine([{"name": "face", "when": [["secondary_faces", ">", 0]], "for": 2}])
+    assert names(engine.update({"secondary_faces": 1}, 0.0)) == []
+    assert names(engine.update({"secondary_faces": 1}, 1.5)) == []
+    assert names(engine.update({"secondary_faces": 0}, 1.8)) == []  # interrupted, starts over
+    assert names(engine.update({"secondary_faces": 1}, 2.0)) == []
+    assert names(engine.update({}, 3.9)) == []
+    assert names(engine.update({}, 4.0)) == ["face"]
+    assert names(engine.update({}, 9.0)) == []
+
+
+def test_repeat_interval():
+    engine = RulesEngine([{"name": "voice", "when": [["voice", "==", True]], "repeat": 5}])
+    fired = [t for t in range(12) if engine.update({"voice": True}, float(t))]
+    assert fired == [0, 5, 10]
+
+
+def test_repeat_zero_fires_only_on_ticks_that_measure_the_signal():
+    engine = RulesEngine([{"name": "gaze", "when": [["gaze_deviated", "==", True]], "repeat": 0}])
+    assert names(engine.update({"gaze_deviated": True}, 0.0)) == ["gaze"]
+    assert names(engine.update({"gaze_deviated": True}, 0.1)) == ["gaze"]
+    # Gaze not measured this tick: the held value is not a new observation
+    assert names(engine.update({"voice": False}, 0.2)) == []
+    assert names(engine.update({"gaze_deviated": True}, 0.3)) == ["gaze"]
+
+
+def test_count_within_window():
+    engine = RulesEngine([{"name": "switch", "when": [["away", "==", True]], "count": 3, "window": 10}])
+    hits = []
+    for t, away in [(0, True), (1, False), (2, True), (3, False), (4, True), (5, True)]:
+        hits += [(t, name) for name in names(engine.update({"away": away}, float(t)))]
+    assert hits == [(4, "switch")]
+
+
+def test_count_onsets_outside_window_expire():
+    engine = RulesEngine([{"name": "switch", "when": [["away", "==", True]], "count": 2, "window": 5}])
+    assert names(engine.update({"away": True}, 0.0)) == []
+    assert names(engine.update({"away": False}, 1.0)) == []
+    assert names(engine.update({"away": True}, 7.0)) == []  # first onset is out of the window
+    assert names(engine.update({"away": False}, 8.0)) == []
+    assert names(engine.update({"away": True}, 9.0)) == ["switch"]
+
+
+def test_message_is_formatted_from_signals():
+    engine = RulesEngine()
+    hits = engine.update({"object_count": 1, "objects": "cell phone", "person_count": 1}, 0.0)
+    assert [(hit.name, hit.message, hit.terminate) for hit in hits] == [
+        ("malpractice_object", "Malpractice Object Detected: cell phone", True)]
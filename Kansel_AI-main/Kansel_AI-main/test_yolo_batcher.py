@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from yolo_batcher import YOLOBatcher
+
+
+class FakeDetector:
+    # Returns each frame back as its only detection and records the batch sizes
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+
+    def detect_batch(self, frames):
+        if self.error:
+            raise self.error
+        self.batches.append(len(frames))
+        return [[{"label": frame}] for frame in frames]
+
+
+def test_frames_from_several_streams_share_one_batch():
+    detector = FakeDetector()
+    batcher = YOLOBatcher(detector, max_batch_size=4, max_wait=5.0)
+    results = {}
+
+    def stream(name):
+        results[name] = batcher.detect(name, timeout=5.0)
+
+    threads = [threading.Thread(target=stream, args=(f"stream{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert detector.batches == [4]  # full, so flushed without waiting max_wait
+    assert results == {f"stream{i}": [{"label": f"stream{i}"}] for i in range(4)}
+
+
+def test_batches_are_split_at_max_batch_size():
+    detector = FakeDetector()
+    batcher = YOLOBatcher(detector, max_batch_size=3, max_wait=5.0)
+    futures = [batcher.submit(i) for i in range(6)]
+    assert [future.result(5.0)[0]["label"] for future in futures] == list(range(6))
+    batcher.close()
+    assert detector.batches == [3, 3]
+    assert batcher.average_batch_size() == 3.0
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    detector = FakeDetector()
+    batcher = YOLOBatcher(detector, max_batch_size=8, max_wait=0.05)
+    assert batcher.detect("only", timeout=5.0) == [{"label": "only"}]
+    batcher.close()
+    assert detector.batches == [1]
+
+
+def test_detector_errors_reach_every_frame_of_the_batch():
+    batcher = YOLOBatcher(FakeDetector(error=RuntimeError("no net")), max_batch_size=2, max_wait=5.0)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(5.0)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(0)
@@ -1,31 +1,56 @@
-import pyaudio
+import wave
 import numpy as np
 import time
 
 class VoiceActivityDetector:
-    def __init__(self, threshold=400, sample_rate=16000, chunk_size=1024, required_duration=3.0):
+    def __init__(self, threshold=400, sample_rate=16000, chunk_size=1024, required_duration=3.0, stream=None,
+                 history=512):
         self.threshold = threshold
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
         self.required_duration = required_duration
 
-        self.p = pyaudio.PyAudio()
-        self.stream = self.p.open(format=pyaudio.paInt16,
-                                  channels=1,
-                                  rate=self.sample_rate,
-                                  input=True,
-                                  frames_per_buffer=self.chunk_size)
+        # Ring of recent chunk end times and energies, read by speaker attribution
+        self.energy_times = np.full(history, -np.inf)
+        self.energy_levels = np.zeros(history)
+        self.energy_index = 0
+
+        # Any object with a pyaudio-style read() can stand in for the microphone
+        self.p = None
+        if stream is None:
+            import pyaudio
+            self.p = pyaudio.PyAudio()
+            stream = self.p.open(format=pyaudio.paInt16,
+                                 channels=1,
+                                 rate=self.sample_rate,
+                                 input=True,
+                                 frames_per_buffer=self.chunk_size)
+        self.stream = stream
 
         self.voice_start_time = None
         self.last_voice_time = None
         self.is_speaking = False
 
-    def is_voice_detected(self):
-        data = self.stream.read(self.chunk_size, exception_on_overflow=False)
+    def is_voice_detected(self, current_time=None):
+        # Reads every whole chunk the stream has buffered, so a slow loop does not
+        # fall behind the microphone. Each chunk is stamped with the time its last
+        # sample was captured: the read time minus what is still queued behind it.
+        read_available = getattr(self.stream, "get_read_available", None)
+        detected = False
+        while True:
+            data = self.stream.read(self.chunk_size, exception_on_overflow=False)
+            queued = read_available() if read_available else 0
+            now = time.monotonic() if current_time is None else current_time  # frame ring clock
+            detected = self.process_chunk(data, now - queued / self.sample_rate) or detected
+            if queued < self.chunk_size:
+                return detected
+
+    def process_chunk(self, data, current_time):
         audio_data = np.frombuffer(data, dtype=np.int16)
         volume = np.linalg.norm(audio_data)
-
-        current_time = time.time()
+        self.energy_times[self.energy_index] = current_time
+        self.energy_levels[self.energy_index] = volume
+        self.energy_index = (self.energy_index + 1) % len(self.energy_times)
 
         if volume > self.threshold:
             if self.voice_start_time is None:
@@ -45,7 +70,55 @@ class VoiceActivityDetector:
 
         return False
 
+    def energy_window(self, start, end):
+        # (times, energies) of the chunks that ended within [start, end], oldest first
+        order = np.roll(np.arange(len(self.energy_times)), -self.energy_index)
+        times = self.energy_times[order]
+        keep = (times >= start) & (times <= end)
+        return times[keep], self.energy_levels[order][keep]
+
+    def close(self):
+        if self.p is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.p.terminate()
+        elif hasattr(self.stream, "close"):
+            self.stream.close()
+
+
+# Reads a recorded WAV file as if it were the microphone stream: 16-bit samples,
+# mixed down to mono and resampled to the detector's rate.
+class WaveFileStream:
+    def __init__(self, path, sample_rate=16000):
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit PCM audio is supported")
+            channels = wav.getnchannels()
+            source_rate = wav.getframerate()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        if source_rate != sample_rate:
+            positions = np.arange(0, len(samples), source_rate / sample_rate)
+            samples = np.interp(positions, np.arange(len(samples)), samples)
+        self.samples = samples.astype(np.int16)
+        self.sample_rate = sample_rate
+        self.position = 0
+
+    def read(self, num_frames, exception_on_overflow=False):
+        chunk = self.samples[self.position:self.position + num_frames]
+        self.position += num_frames
+        if len(chunk) < num_frames:
+            chunk = np.pad(chunk, (0, num_frames - len(chunk)))
+        return chunk.tobytes()
+
+    def exhausted(self):
+        return self.position >= len(self.samples)
+
+    def time(self):
+        # Media time of the next chunk, in seconds from the start of the recording
+        return self.position / self.sample_rate
+
     def close(self):
-        self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
+        self.samples = None
@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from yolo_detector import YOLODetector
+
+
+# Collects frames from several streams (or several buffered frames of one stream)
+# and runs them through YOLO in shared batches. A batch is flushed as soon as it
+# holds max_batch_size frames or the oldest queued frame has waited max_wait seconds.
+class YOLOBatcher:
+    def __init__(self, detector=None, max_batch_size=8, max_wait=0.02):
+        self.detector = detector or YOLODetector()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.requests = queue.Queue()
+        self.running = True
+        self.batches_run = 0
+        self.frames_run = 0
+
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, frame):
+        # Returns a Future resolving to the detection list for this frame
+        if not self.running:
+            raise RuntimeError("YOLOBatcher is closed")
+        future = Future()
+        self.requests.put((frame, future))
+        return future
+
+    def detect(self, frame, timeout=None):
+        return self.submit(frame).result(timeout)
+
+    def detect_many(self, frames, timeout=None):
+        futures = [self.submit(frame) for frame in frames]
+        return [future.result(timeout) for future in futures]
+
+    def _collect_batch(self):
+        first = self.requests.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back so the loop ends after this batch
+                self.requests.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+
+            frames = [frame for frame, _ in batch]
+            try:
+                results = self.detector.detect_batch(frames)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.frames_run += len(frames)
+            for (_, future), detections in zip(batch, results):
+                future.set_result(detections)
+
+    def average_batch_size(self):
+        return self.frames_run / self.batches_run if self.batches_run else 0.0
+
+    def close(self):
+        if self.running:
+            self.running = False
+            self.requests.put(None)
+            self.worker.join()
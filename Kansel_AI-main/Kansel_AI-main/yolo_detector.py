@@ -2,49 +2,87 @@ import cv2
 import numpy as np
 
 class YOLODetector:
-    def __init__(self):
+    # Malpractice objects we want to detect
+    MALPRACTICE_OBJECTS = {"cell phone", "book"}
+
+    def __init__(self, weights_path="yolov4.weights", config_path="yolov4.cfg",
+                 names_path="coco.names", input_size=416):
         self.confidence_threshold = 0.5
         self.nms_threshold = 0.4
+        self.input_size = input_size
 
-        weights_path = "yolov4.weights"
-        config_path = "yolov4.cfg"
         self.net = cv2.dnn.readNet(weights_path, config_path)
         self.layer_names = self.net.getLayerNames()
         self.output_layers = [self.layer_names[i - 1] for i in self.net.getUnconnectedOutLayers().flatten()]
 
         # Load COCO class names
-        with open("coco.names", "r") as f:
+        with open(names_path, "r") as f:
             self.classes = [line.strip() for line in f.readlines()]
 
-        # Malpractice objects we want to detect
-        self.malpractice_objects = {"cell phone", "book"}
+        self.malpractice_objects = set(self.MALPRACTICE_OBJECTS)
 
-    def detect(self, frame):
-        height, width = frame.shape[:2]
-        blob = cv2.dnn.blobFromImage(frame, 1/255.0, (416,416), swapRB=True, crop=False)
+    def detect(self, frame, input_size=None):
+        return self.detect_batch([frame], input_size)[0]
+
+    def detect_batch(self, frames, input_size=None):
+        # One blob and one forward pass for the whole list, detections split back per frame
+        if not frames:
+            return []
+        size = input_size or self.input_size
+        blob = cv2.dnn.blobFromImages(frames, 1/255.0, (size, size), swapRB=True, crop=False)
         self.net.setInput(blob)
         outputs = self.net.forward(self.output_layers)
 
-        boxes = []
-        confidences = []
-        class_ids = []
-
-        for output in outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-                if confidence > self.confidence_threshold:
-                    center_x = int(detection[0] * width)
-                    center_y = int(detection[1] * height)
-                    w = int(detection[2] * width)
-                    h = int(detection[3] * height)
-                    x = int(center_x - w / 2)
-                    y = int(center_y - h / 2)
-
-                    boxes.append([x,y,w,h])
-                    confidences.append(float(confidence))
-                    class_ids.append(class_id)
+        results = []
+        for i, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            rows = np.concatenate([self._rows_for_frame(output, i, len(frames)) for output in outputs])
+            results.append(self._decode(rows, width, height))
+        return results
+
+    def detect_region(self, frame, box, input_size=608, margin=0.5):
+        # Re-runs detection on the area around box only, at a finer input size;
+        # returned boxes are in full-frame coordinates
+        height, width = frame.shape[:2]
+        x, y, w, h = box
+        side = int(max(w, h) * (1 + 2 * margin))
+        cx, cy = x + w // 2, y + h // 2
+        x0, y0 = max(0, cx - side // 2), max(0, cy - side // 2)
+        x1, y1 = min(width, x0 + side), min(height, y0 + side)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return []
+        detections = self.detect(frame[y0:y1, x0:x1], input_size)
+        for obj in detections:
+            obj["box"] = [obj["box"][0] + x0, obj["box"][1] + y0, obj["box"][2], obj["box"][3]]
+        return detections
+
+    @staticmethod
+    def _rows_for_frame(output, index, batch_size):
+        # Region layers return (batch, rows, 85) for batches and (rows, 85) for a single image
+        if output.ndim == 3:
+            return output[index]
+        return output.reshape(batch_size, -1, output.shape[-1])[index]
+
+    def _decode(self, rows, width, height):
+        scores = rows[:, 5:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(rows)), class_ids]
+        keep = confidences > self.confidence_threshold
+        if not keep.any():
+            return []
+
+        rows = rows[keep]
+        class_ids = class_ids[keep]
+        confidences = confidences[keep].astype(float)
+
+        center_x = (rows[:, 0] * width).astype(int)
+        center_y = (rows[:, 1] * height).astype(int)
+        w = (rows[:, 2] * width).astype(int)
+        h = (rows[:, 3] * height).astype(int)
+        x = (center_x - w / 2).astype(int)
+        y = (center_y - h / 2).astype(int)
+        boxes = np.stack([x, y, w, h], axis=1).tolist()
+        confidences = confidences.tolist()
 
         indices = cv2.dnn.NMSBoxes(boxes, confidences, self.confidence_threshold, self.nms_threshold)
 
@@ -52,29 +90,23 @@ class YOLODetector:
         if isinstance(indices, tuple) or len(indices) == 0:
             return detections
 
-        if isinstance(indices, np.ndarray):
-            indices = indices.flatten()
-        else:
-            indices = np.array(indices).flatten()
-
-        for i in indices:
-            label = self.classes[class_ids[i]]
-            box = boxes[i]
-            confidence = confidences[i]
+        for i in np.array(indices).flatten():
             detections.append({
-                "label": label,
-                "box": box,
-                "confidence": confidence
+                "label": self.classes[class_ids[i]],
+                "box": boxes[i],
+                "confidence": confidences[i]
             })
         return detections
 
-    def detect_multiple_persons(self, frame):
+    def detect_multiple_persons(self, frame, detections=None):
         # Count number of 'person' detected in the frame
-        detections = self.detect(frame)
+        if detections is None:
+            detections = self.detect(frame)
         person_count = sum(1 for obj in detections if obj["label"] == "person")
         return person_count > 1
 
-    def detect_malpractice_objects(self, frame):
-        detections = self.detect(frame)
+    def detect_malpractice_objects(self, frame, detections=None):
+        if detections is None:
+            detections = self.detect(frame)
         malpractice_detected = [obj for obj in detections if obj["label"] in self.malpractice_objects]
         return malpractice_detected